@@ -11,9 +11,11 @@
 #
 #import codecs
 from collections import OrderedDict
-from types import SimpleNamespace
+from collections.abc import ValuesView, ItemsView
+from types import SimpleNamespace, MappingProxyType
 from typing import Any, Callable, Dict, List, Union, Iterable, Tuple, IO
 import functools
+import itertools
 import unicodedata
 import re
 import logging
@@ -201,6 +203,16 @@ class NodeList(list):
             f"NodeList item #{index} out of range ({len(self)}).")
         return self[index]
 
+    def sortDocumentOrder(self) -> None:
+        """Sort the members in place into document order. If they all have
+        order labels (see Document.setOrderIndex()), those are the keys;
+        otherwise each node's child-number path is.
+        """
+        if all(node._ordStart is not None for node in self):
+            self.sort(key=lambda node: node._ordStart)
+        else:
+            self.sort(key=lambda node: node.getNodeSteps())
+
     ### list adder/multipliers should work as-is for Nodelist, but not for Node.
 
     def writexml(self, writer:IO,
@@ -215,16 +227,150 @@ class NodeList(list):
 ###############################################################################
 #
 class SiblingImpl(FlexibleEnum):
-    """Set this on Document to determine how siblings are found.  TODO
-    PARENT tests faster than LINKS due to maintenance overhead, unless the
-    trees are very wide/bushy. In theory, CHNUM should be faster when the
-    tree is not changing much (but changes are slower).
+    """Set this on Document to determine how siblings are found.
+    COUNT scans the parent, so it's O(fanout) per call and very slow on wide
+    trees. CHNUM child numbers are fixed up lazily (see _checkedChildNum()),
+    so edits are cheap too; it costs ~5% on building (see
+    tests/timeSiblings.py), and is the default. LINKS is fastest for pure
+    walking, but getChildIndex() still has to scan.
     """
     COUNT = 0   # Scan parent
-    CHNUM = 1   # Node maintain their child number
+    CHNUM = 1   # Node maintain their child number (lazily)
     LINKS = 2   # Doubly-linked siblings
 
 
+class SiblingStats:
+    """Counts kept by a Document with adaptive siblings turned on (see
+    Document.setAdaptiveSiblings()): sibling steps (previous/nextSibling),
+    child-index lookups (getChildIndex(), and so most edits-by-node), and
+    inserts/removes other than at the end, plus the total fanout of the
+    parents involved. Every 'window' events it estimates each SiblingImpl's
+    cost, and switches the Document if another one is 'factor' times
+    cheaper for 'patience' windows in a row.
+    """
+    STEP = 0
+    INDEX = 1
+    EDIT = 2
+
+    # Rough costs in units of one child visited by a scan, fitted to
+    # tests/timeSiblings.py. Re-scanning for CHNUM after an edit averages
+    # about half the fanout, at about the same cost per child.
+    CALL_COST = 50      # Overhead of a non-LINKS step or an index lookup
+    LINK_COST = 10      # Following or maintaining a LINKS pointer
+
+    __slots__ = ("doc", "window", "factor", "patience", "counts", "fanout",
+        "nEvents", "wanted", "nWanted", "switches")
+
+    def __init__(self, doc:'Document', window:int=4096, factor:float=2.0,
+        patience:int=2):
+        self.doc = doc
+        self.window = window
+        self.factor = factor
+        self.patience = patience
+        self.switches:List[SiblingImpl] = []
+        self.wanted:SiblingImpl = None
+        self.nWanted = 0
+        self.reset()
+
+    def reset(self) -> None:
+        self.counts = [ 0, 0, 0 ]
+        self.fanout = 0
+        self.nEvents = 0
+
+    def note(self, kind:int, parent:'Node') -> None:
+        self.counts[kind] += 1
+        self.fanout += len(parent)
+        self.nEvents += 1
+        if self.nEvents >= self.window: self.decide()
+
+    def costs(self) -> Dict[SiblingImpl, float]:
+        steps, indexes, edits = self.counts
+        halfFan = self.fanout / max(self.nEvents, 1) / 2
+        call, link = self.CALL_COST, self.LINK_COST
+        return {
+            SiblingImpl.COUNT: (steps + indexes) * (call + halfFan),
+            SiblingImpl.CHNUM: (steps + indexes) * call + edits * halfFan / 2,
+            SiblingImpl.LINKS: (steps + edits) * link + indexes * (call + halfFan),
+        }
+
+    def decide(self) -> None:
+        costs = self.costs()
+        cur = self.doc._siblingImpl
+        best = min(costs, key=costs.get)
+        if best == cur or costs[best] * self.factor >= costs[cur]:
+            self.wanted, self.nWanted = None, 0
+        else:
+            if best != self.wanted: self.wanted, self.nWanted = best, 0
+            self.nWanted += 1
+            if self.nWanted >= self.patience:
+                lg.info("Adaptive siblings: %s -> %s", cur.name, best.name)
+                self.doc._sibStats = None  # Don't count the switch itself
+                try:
+                    self.doc._updateChildSiblingImpl(best)
+                finally:
+                    self.doc._sibStats = self
+                self.switches.append(best)
+                self.wanted, self.nWanted = None, 0
+        self.reset()
+
+
+###############################################################################
+# Document-order labels (see Document.setOrderIndex()).
+#
+# Each connected node gets _ordStart/_ordEnd (like the positions of its start-
+# and end-tags; equal for leaves), with gaps between neighbors. So document
+# order is just _ordStart order, and x contains y iff x's range encloses y's.
+# Inserted subtrees take labels from the gap around them; when a gap runs
+# out, the nearest ancestor with room relabels just its own range.
+#
+ORDER_GAP = 1 << 16     # Spacing when the whole Document is (re)labelled
+ORDER_MIN_STEP = 8      # Min spacing left after relabelling an ancestor
+
+def _labelOrder(node:'Node', lo:int, step:int) -> int:
+    """Label node's subtree in document order at lo+step, lo+2*step,....
+    Returns the last label used.
+    """
+    label = lo
+    stack = [ (node, False) ]
+    while stack:
+        cur, closing = stack.pop()
+        label += step
+        if closing:
+            cur._ordEnd = label
+            continue
+        cur._ordStart = label
+        if len(cur) == 0:
+            cur._ordEnd = label
+            continue
+        stack.append((cur, True))
+        stack.extend((ch, False) for ch in reversed(cur))
+    return label
+
+def _countOrderLabels(node:'Node') -> int:
+    """How many labels node's subtree needs (2 per non-empty node, else 1).
+    """
+    n = 0
+    stack = [ node ]
+    while stack:
+        cur = stack.pop()
+        if len(cur) == 0:
+            n += 1
+        else:
+            n += 2
+            stack.extend(cur)
+    return n
+
+def _clearOrder(node:'Node') -> None:
+    stack = [ node ]
+    while stack:
+        cur = stack.pop()
+        cur._ordStart = cur._ordEnd = None
+        stack.extend(cur)
+
+
+noNS = MappingProxyType({})  # Shared inheritedNS for nodes that have none
+
+
 ###############################################################################
 #
 # TODO: Ditch list as a superclass here. Add NodeList as a 2nd superclass
@@ -243,7 +389,20 @@ class Yggdrasil(list):
       * "contains" is nonrecursive in Python lists, but recursive in DOM.
 
     (the int codes for nodeType are pulled in by th @mirror_enum decorator).
+
+    Nodes are numerous, so the classes use __slots__ and nodeType is a class
+    attribute. So nodes can't take arbitrary extra attributes (use userData,
+    or a subclass); Document, DocumentFragment, and outside subclasses still
+    have a regular __dict__. "eid" is a slot for sleipnir's node numbering.
+    Leaf nodes with no inherited namespaces share one read-only empty map.
+    Leaf CharacterData nodes are still (empty) list subclasses, which costs
+    the list header but no item storage. With tests/timeNodeMemory.py
+    (Element + Attr + Text records), that comes to about 370 traced bytes
+    per node; Element is 216 bytes, Attr 208, and Text 176.
     """
+    __slots__ = ("ownerDocument", "parentNode", "nodeName", "inheritedNS",
+        "userData", "prevError", "_childNum", "_previousSibling", "_nextSibling",
+        "_ordStart", "_ordEnd", "eid", "__weakref__")
     ATTRIBUTE_NODE              = NodeType.ATTRIBUTE_NODE
     CDATA_SECTION_NODE          = NodeType.CDATA_SECTION_NODE
     COMMENT_NODE                = NodeType.COMMENT_NODE
@@ -259,6 +418,8 @@ class Yggdrasil(list):
     ENTITY_REFERENCE_NODE       = NodeType.ENTITY_REFERENCE_NODE
     ENTITY_NODE                 = NodeType.ENTITY_NODE
 
+    nodeType                    = NodeType.ABSTRACT_NODE
+
     def __init__(self, ownerDocument:'Document'=None, nodeName:NMTOKEN_t=None):
         """  (and Node) shouldn't really be instantiated.
         minidom lets Node be, but with different parameters.
@@ -271,13 +432,13 @@ class Yggdrasil(list):
         super().__init__()
         self.ownerDocument = ownerDocument
         self.parentNode = None  # minidom Attr class lacks....
-        self.nodeType = Node.ABSTRACT_NODE
         if nodeName and nodeName[0] != "#" and not Rune.isXmlQName(nodeName):
             raise ICharE(f"nodeName '{nodeName}' isn't.")
         self.nodeName = nodeName
-        self.inheritedNS = {}
+        self.inheritedNS = noNS
         self.userData = None
         self.prevError:str = None  # Mainly for isEqualNode
+        self._ordStart = self._ordEnd = None  # Document order labels, if on
         # Sibling count/pointers are only set once inserted into a parentNode.
 
     @property
@@ -292,7 +453,7 @@ class Yggdrasil(list):
             x.__contains__(y) is non-recursive.
             x.contains(y) is recursive.
         """
-        return item.parentNode == self
+        return item.parentNode is self
 
     def contains(self, other:'Node') -> bool:  # Yggdrasil
         """Overridden by Branchable.
@@ -351,7 +512,11 @@ class Yggdrasil(list):
         If 'coalesceText' is set, adjacent text nodes count as 1.
         """
         if self.parentNode is None: return None
-        if hasattr(self, "_childNum"): return self._childNum
+        if self.ownerDocument is not None and self.ownerDocument._sibStats:
+            self.ownerDocument._sibStats.note(SiblingStats.INDEX, self.parentNode)
+        if hasattr(self, "_childNum"): return self._checkedChildNum()
+        if wsn and not (onlyElements or ofNodeName or coalesceText):
+            return self._scanChildIndex()
         i = 0
         for ch in self.parentNode.childNodes:
             if ch is self: return i
@@ -363,6 +528,33 @@ class Yggdrasil(list):
             i += 1
         return None
 
+    def _scanChildIndex(self) -> int:
+        """For COUNT: plain getChildIndex(), but not counted as a lookup.
+        """
+        for i, ch in enumerate(self.parentNode.childNodes):
+            if ch is self: return i
+        return None
+
+    def _checkedChildNum(self) -> int:
+        """For CHNUM. Inserts and removes don't renumber the following
+        siblings; they just cut back the parent's _numValidTo, the count of
+        leading children whose _childNum is known right. A node that got
+        shifted past there may still have a small (stale) number, hence the
+        identity check. Otherwise this extends the valid prefix only as far
+        as needed to reach self, so the cost is amortized over the calls.
+        """
+        par = self.parentNode
+        validTo = getattr(par, "_numValidTo", 0)
+        n = self._childNum
+        if n is not None and n < validTo and par.childNodes[n] is self: return n
+        for n, sib in enumerate(itertools.islice(par.childNodes, validTo, None), validTo):
+            sib._childNum = n
+            if sib is self: break
+        else:
+            raise HReqE(f"Node '{self.nodeName}' not found in its parentNode.")
+        par._numValidTo = n + 1
+        return n
+
     def getRChildIndex(self, onlyElements:bool=False, ofNodeName:bool=False,
         wsn:bool=True, coalesceText:bool=False) -> int:
         """Return the position from the end (from -1...) among
@@ -370,7 +562,7 @@ class Yggdrasil(list):
         """
         if self.parentNode is None: return None
         if hasattr(self, "_childNum"):
-            return self._childNum - len(self.parentNode.childNodes)
+            return self._checkedChildNum() - len(self.parentNode.childNodes)
         i = -1
         for ch in reversed(self.parentNode.childNodes):
             if ch is self: return i
@@ -431,11 +623,13 @@ class Yggdrasil(list):
         To change, call _updateChildSiblingImpl() on the Document.
         """
         if self.parentNode is None: return None
+        if self.ownerDocument is not None and self.ownerDocument._sibStats:
+            self.ownerDocument._sibStats.note(SiblingStats.STEP, self.parentNode)
         if hasattr(self, "_previousSibling"):
             return self._previousSibling
 
-        if hasattr(self, "_childNum"): n = self._childNum
-        else: n = self.getChildIndex()
+        if hasattr(self, "_childNum"): n = self._checkedChildNum()
+        else: n = self._scanChildIndex()
 
         if n <= 0: return None
         return self.parentNode.childNodes[n-1]
@@ -445,11 +639,13 @@ class Yggdrasil(list):
         """See also previousSibling().
         """
         if self.parentNode is None: return None
+        if self.ownerDocument is not None and self.ownerDocument._sibStats:
+            self.ownerDocument._sibStats.note(SiblingStats.STEP, self.parentNode)
         if hasattr(self, "_nextSibling"):
             return self._nextSibling
 
-        if hasattr(self, "_childNum"): n = self._childNum
-        else: n = self.getChildIndex()
+        if hasattr(self, "_childNum"): n = self._checkedChildNum()
+        else: n = self._scanChildIndex()
         if n >= len(self.parentNode.childNodes) - 1: return None
         return self.parentNode.childNodes[n+1]
 
@@ -521,7 +717,7 @@ class Yggdrasil(list):
         user should be able to just use what they have.
         """
         if isinstance(ch, Node):
-            if (ch.parentNode != self): raise HReqE(
+            if (ch.parentNode is not self): raise HReqE(
                 "Putative child node isn't.")
             return ch.getChildIndex(), ch
         if isinstance(ch, int):
@@ -636,6 +832,8 @@ class Node(Yggdrasil):
     b/c only a few subclasses need them. Those subclasses use multiple
     inheritance to bring in that stuff from Branchable and/or AttributedNode.
     """
+    __slots__ = ()
+
     def __init__(self, ownerDocument:'Document'=None, nodeName:NMTOKEN_t=None):
         super().__init__(ownerDocument=ownerDocument, nodeName=nodeName)
 
@@ -658,7 +856,7 @@ class Node(Yggdrasil):
         containment, because all empty lists are considered equal.
         Thus an element with any empty node "contains" *all* empty nodes.
         """
-        return item.parentNode == self
+        return item.parentNode is self
 
     # I'm using:
     #     << and >> for document order
@@ -677,27 +875,27 @@ class Node(Yggdrasil):
         return not self.isEqualNode(other)
 
     def __lt__(self, other:'Node') -> bool:
-        assert self.ownerDocument == other.ownerDocument
+        assert self.ownerDocument is other.ownerDocument
         return self.compareDocumentPosition(other) < 0
 
     def __le__(self, other:'Node') -> bool:
-        assert self.ownerDocument == other.ownerDocument
+        assert self.ownerDocument is other.ownerDocument
         return self.compareDocumentPosition(other) <= 0
 
     def __ge__(self, other:'Node') -> bool:
-        assert self.ownerDocument == other.ownerDocument
+        assert self.ownerDocument is other.ownerDocument
         return self.compareDocumentPosition(other) >= 0
 
     def __gt__(self, other:'Node') -> bool:
-        assert self.ownerDocument == other.ownerDocument
+        assert self.ownerDocument is other.ownerDocument
         return self.compareDocumentPosition(other) > 0
 
     def __lshift__(self, other:'Node') -> bool:
-        assert self.ownerDocument == other.ownerDocument
+        assert self.ownerDocument is other.ownerDocument
         return self.compareDocumentPosition(other) < 0
 
     def __rshift__(self, other:'Node') -> bool:
-        assert self.ownerDocument == other.ownerDocument
+        assert self.ownerDocument is other.ownerDocument
         return self.compareDocumentPosition(other) > 0
 
     def compareDocumentPosition(self, other:'Node') -> int:  # DOM3
@@ -707,9 +905,15 @@ class Node(Yggdrasil):
         equality it's enough to test identity instead of position.
 
         XPointers are good for this except that getChildIndex() can be O(fanout).
+        With the Document's order index on, it's just a label comparison.
 
         Does not apply to Attribute nodes (overridden).
         """
+        if self._ordStart is not None and other._ordStart is not None:
+            if self.ownerDocument is not other.ownerDocument:
+                raise HReqE("No common document for compareDocumentPosition")
+            return (self._ordStart > other._ordStart) - (self._ordStart < other._ordStart)
+
         self.checkNode()
         other.checkNode()
         if self.ownerDocument != other.ownerDocument:
@@ -721,8 +925,8 @@ class Node(Yggdrasil):
 
         if self is other: return 0  # Could do this even in failure cases above
 
-        t1 = self.getNodePath()
-        t2 = other.getNodePath()
+        t1 = self.getNodeSteps()
+        t2 = other.getNodeSteps()
         minLen = min(len(t1), len(t2))
         for i in range(minLen):
             if t1[i] < t2[i]: return -1
@@ -1174,7 +1378,7 @@ class Node(Yggdrasil):
                 (you can also request one event per attribute:
                     ATTRIBUTE   attrName:str attrValue:str
             (END     name:str, )
-            (CDATASTART, )
+            (CDATA, )
             (CHAR    text:str, )
             (CDATAEND, )
             (COMMENT text:str, )
@@ -1242,7 +1446,7 @@ class Node(Yggdrasil):
             yield (SaxEvent.COMMENT, self.data)
 
         elif self.nodeType == Node.CDATA_SECTION_NODE:
-            yield (SaxEvent.CDATASTART, )
+            yield (SaxEvent.CDATA, )
             yield (SaxEvent.CHAR, self.data)
             yield (SaxEvent.CDATAEND, )
 
@@ -1283,9 +1487,14 @@ class Node(Yggdrasil):
         if self.parentNode is not None:
             assert self.parentNode.isElement or self.parentNode.isDocument
             assert self in self.parentNode.childNodes
-            assert self.ownerDocument == self.parentNode.ownerDocument
+            parDoc = self.parentNode.ownerDocument
+            if self.parentNode.isDocument: parDoc = self.parentNode
+            assert self.ownerDocument is parDoc
             assert self.parentNode.childNodes[self.getChildIndex()] is self
             self.checkSiblings(self.ownerDocument._siblingImpl)
+            if self._ordStart is not None:
+                assert (self.parentNode._ordStart < self._ordStart
+                    <= self._ordEnd < self.parentNode._ordEnd)
 
         if isinstance(self, Branchable):
             if self.childNodes is not None and len(self.childNodes) > 0:
@@ -1301,11 +1510,11 @@ class Node(Yggdrasil):
             assert not hasattr(self, "_childNum")
             assert not hasattr(self, "_previousSibling")
             assert not hasattr(self, "_nextSibling")
-        elif impl == SiblingImpl.CHNUM:
-            assert hasattr(self, "_childNum")
+        elif impl == SiblingImpl.CHNUM:  # Nodes built detached just count
             assert not hasattr(self, "_previousSibling")
             assert not hasattr(self, "_nextSibling")
-            assert self.parentNode.childNodes[self._childNum] == self
+            if hasattr(self, "_childNum"):
+                assert self.parentNode.childNodes[self._checkedChildNum()] is self
         elif impl == SiblingImpl.LINKS:
             assert not hasattr(self, "_childNum")
             assert hasattr(self, "_previousSibling")
@@ -1351,7 +1560,11 @@ class Branchable(list, ElementTreeAdditions):
     have children: Document, DocumentFragment, Element.
     So only those inherit from it.
     TODO: should predicates like hasChildNodes() be on Node?
+    Mixins here have no slots of their own (that would conflict with
+    Yggdrasil's layout); the subclasses declare whatever they store.
     """
+    __slots__ = ()
+
     def __setitem__(self, picker:Union[int, slice], value: 'Node') -> None:
         """Regular list ops aren't enough, as we have to set neighbor link(s),
         prevent inserting one node in multiple places, etc.
@@ -1539,13 +1752,13 @@ class Branchable(list, ElementTreeAdditions):
 
     def insertBefore(self, newChild:'Node', oldChild:Union['Node', int]) -> None:
         oNum, oChild = self._expandChildArg(oldChild)
-        if oChild.parentNode != self: raise NotFoundError(
+        if oChild.parentNode is not self: raise NotFoundError(
             f"Node to insert before (a '{oChild.nodeName}') is not a child.")
         self.childNodes.insert(oNum, newChild)
 
     def insertAfter(self, newChild:'Node', oldChild:Union['Node', int]) -> None:
         oNum, oChild = self._expandChildArg(oldChild)
-        if oChild.parentNode != self: raise NotFoundError(
+        if oChild.parentNode is not self: raise NotFoundError(
             f"Node to insert after (a '{oChild.nodeName}') is not a child.")
         self.childNodes.insert(oNum+1, newChild)
 
@@ -1577,7 +1790,7 @@ class Branchable(list, ElementTreeAdditions):
         if newChild.isElement: self._filterOldInheritedNS(newChild)
         super().insert(i, newChild)
 
-        newChild.ownerDocument = self.ownerDocument  # Or exception?
+        newChild.ownerDocument = self if self.isDocument else self.ownerDocument
         newChild.parentNode = self
 
         # Apply to the child node, the parentNode's way of doing siblings.
@@ -1585,18 +1798,44 @@ class Branchable(list, ElementTreeAdditions):
         if hasattr(self, "_previousSibling"):
             newChild._previousSibling = newChild._nextSibling = None
             if i > 0:
-                self.childNode[i-1]._nextSibling = newChild
-                newChild._previousSibling = self.childNode[i-1]
-            if i < len(newChild)-1:
-                self.childNode[i+1]._previousSibling = newChild
-                newChild._nextSibling = self.childNode[i+1]
-        elif hasattr(self, "_childNum"):
-            newChild._childNum = i
-            for sibNum in range(i+1, len(self)):
-                self.childNodes[sibNum]._childNum = sibNum
-        else:
+                self.childNodes[i-1]._nextSibling = newChild
+                newChild._previousSibling = self.childNodes[i-1]
+            if i < len(self)-1:
+                self.childNodes[i+1]._previousSibling = newChild
+                newChild._nextSibling = self.childNodes[i+1]
+        elif hasattr(self, "_childNum") or hasattr(self, "_numValidTo"):
+            newChild._childNum = i  # Later ones get fixed on demand
+            if i <= getattr(self, "_numValidTo", 0): self._numValidTo = i + 1
+
+        if self._ordStart is not None: self._orderInsert(i, newChild)
+        if (self.ownerDocument is not None and self.ownerDocument._sibStats
+            and i < len(self) - 1):
+            self.ownerDocument._sibStats.note(SiblingStats.EDIT, self)
+
+    def _orderInsert(self, i:int, newChild:'Node') -> None:
+        """Label a just-inserted child (and subtree) from the gap between its
+        neighbors. If that's too small, relabel the nearest ancestor whose
+        range has room (the Document's range can always just grow).
+        """
+        lo = self[i-1]._ordEnd if i > 0 else self._ordStart
+        hi = self[i+1]._ordStart if i+1 < len(self) else self._ordEnd
+        need = _countOrderLabels(newChild)
+        if hi - lo > need:
+            _labelOrder(newChild, lo, (hi - lo) // (need + 1))
             return
 
+        anc = self
+        while True:
+            n = _countOrderLabels(anc) - 2  # Not counting anc's own
+            if anc._ordEnd - anc._ordStart >= (n + 1) * ORDER_MIN_STEP: break
+            if anc.parentNode is None:
+                anc._ordEnd = anc._ordStart + (n + 1) * ORDER_GAP
+                break
+            anc = anc.parentNode
+        step = (anc._ordEnd - anc._ordStart) // (n + 1)
+        label = anc._ordStart
+        for ch in anc: label = _labelOrder(ch, label, step)
+
 
     ### Removers
     #
@@ -1630,7 +1869,7 @@ class Branchable(list, ElementTreeAdditions):
         All removals end up here.
         """
         if isinstance(oldChild, Node):
-            if oldChild.parentNode != self: raise HReqE(
+            if oldChild.parentNode is not self: raise HReqE(
                 f"Node to remove (a '{oldChild.nodeName}') has wrong parent.")
         elif not isinstance(oldChild, int): raise HReqE(
             f"Child to remove is not a Node or int, but a '{oldChild.type}'.")
@@ -1638,20 +1877,20 @@ class Branchable(list, ElementTreeAdditions):
         del self.childNodes[oNum]
         oChild.parentNode = None
 
-        if hasattr(oldChild, "_nextSibling"):
-            nSib = oldChild._nextSibling
-            pSib = oldChild._previousSibling
+        if hasattr(oChild, "_nextSibling"):
+            nSib = oChild._nextSibling
+            pSib = oChild._previousSibling
             if nSib: nSib._previousSibling = pSib
             if pSib: pSib._nextSibling = nSib
-            oldChild._previousSibling = oldChild._nextSibling = None
-        elif hasattr(oldChild, "_childNum"):
-            for sibNum in range(self.oldChild, len(self.parentNode.childNodes)):
-                self.parentNode.childNodes[sibNum]._childNum -= 1
-            delattr(oldChild, "childNum")
-        else:
-            pass
+            oChild._previousSibling = oChild._nextSibling = None
+        elif oNum < getattr(self, "_numValidTo", 0):
+            self._numValidTo = oNum
 
+        if oChild._ordStart is not None: _clearOrder(oChild)
         if oChild.isElement: oChild._resetinheritedNS()
+        if (self.ownerDocument is not None and self.ownerDocument._sibStats
+            and oNum < len(self)):
+            self.ownerDocument._sibStats.note(SiblingStats.EDIT, self)
         return oChild
 
     # "del" can't just do a plain delete, 'cuz unlink. TODO: Enable del?
@@ -1899,6 +2138,8 @@ class NonBranchable:
 class Attributable:
     """Supply the methods needed for a Node subclass that supports attributes.
     """
+    __slots__ = ()
+
     def __init__(self):
         self.attributes:'NameNodeMap' = None  # Lazy creation _presetAttribute().
 
@@ -1914,8 +2155,9 @@ class Attributable:
             _nsPrefix, _colon, lname = attrName.partition(":")
         else:
             _nsPrefix = None; lname = attrName
-        for _k, attrNode in self.attributes.items():
-            if attrNode.localName != lname: continue
+        for k in self.attributes.keys():  # (items() would make every Attr)
+            if Rune.getLocalPart(k) != lname: continue
+            attrNode = self.attributes[k]
             if not ns or ns == RWord.NS_ANY: return attrNode
             if attrNode.namespaceURI == ns: return attrNode
         return None
@@ -1937,6 +2179,7 @@ class Attributable:
         return bool(self.attributes)
 
     def hasAttribute(self, attrName:NMTOKEN_t) -> bool:
+        if self.attributes and attrName in self.attributes: return True
         return self._findAttr(ns=None, attrName=attrName) is not None
 
 
@@ -1949,10 +2192,14 @@ class Attributable:
     def getAttribute(self, attrName:NMTOKEN_t, castAs:type=str, default:Any=None) -> str:
         """Normal getAttribute, but can cast and default for caller.
         """
-        attrNode = self._findAttr(ns=None, attrName=attrName)
-        if attrNode is None: return default
-        if castAs: return castAs(attrNode.nodeValue)
-        return attrNode.nodeValue
+        if self.attributes and attrName in self.attributes:  # No Attr needed
+            attrValue = self.attributes.getNamedValue(attrName)
+        else:
+            attrNode = self._findAttr(ns=None, attrName=attrName)
+            if attrNode is None: return default
+            attrValue = attrNode.nodeValue
+        if castAs: return castAs(attrValue)
+        return attrValue
 
     def removeAttribute(self, attrName:NMTOKEN_t) -> None:
         """Silent no-op if not present.
@@ -2070,6 +2317,8 @@ class Attributable:
 # Cf https://developer.mozilla.org/en-US/docs/Web/API/Document
 #
 class Document(Branchable, Node):
+    nodeType = Node.DOCUMENT_NODE
+
     def __init__(
         self,
         namespaceURI:str=None,
@@ -2079,12 +2328,13 @@ class Document(Branchable, Node):
         ):
         Node.__init__(self, ownerDocument=None, nodeName=qualifiedName)
         Branchable.__init__(self)
-        self._siblingImpl = SiblingImpl.COUNT
+        self._siblingImpl = SiblingImpl.CHNUM
+        self._numValidTo = 0  # So children get numbered
+        self._sibStats:SiblingStats = None
 
         # namespaceURI is looked up from default or prefix, not a static var.
         self.inheritedNS:Dict        = { }
         if namespaceURI: self.inheritedNS[""]   = namespaceURI
-        self.nodeType:NodeType       = Node.DOCUMENT_NODE
         self.nodeName:QName_t        = qualifiedName
         self.doctype                 = doctype
 
@@ -2169,27 +2419,70 @@ class Document(Branchable, Node):
             self._siblingImpl = SiblingImpl.LINKS
         else:
             raise DOMException(f"Unrecognized siblingImpl '{which}'.")
+        if which == SiblingImpl.CHNUM: self._numValidTo = 0
+        elif hasattr(self, "_numValidTo"): delattr(self, "_numValidTo")
+
+    def setAdaptiveSiblings(self, enable:bool=True, window:int=4096,
+        factor:float=2.0, patience:int=2) -> SiblingStats:
+        """Have this Document count sibling navigation and edits, and
+        switch its SiblingImpl when another looks clearly cheaper for the
+        current workload (see SiblingStats). Returns the stats object
+        (which has the list of 'switches' made), or None if disabling.
+        """
+        self._sibStats = (SiblingStats(self, window=window, factor=factor,
+            patience=patience) if enable else None)
+        return self._sibStats
+
+    def setOrderIndex(self, enable:bool=True) -> None:
+        """Turn document-order labels on (or off) for this Document. While on,
+        compareDocumentPosition() and the order operators (<, <<, etc.) are
+        O(1), and NodeList.sortDocumentOrder() has cheap keys. Inserts and
+        removes keep the labels up to date (mostly locally). Building a
+        large tree by appending is faster with this off, then turned on.
+        """
+        if enable:
+            _labelOrder(self, 0, ORDER_GAP)
+        elif self._ordStart is not None:
+            _clearOrder(self)
+
+    @property
+    def hasOrderIndex(self) -> bool:
+        return self._ordStart is not None
 
     def _siblingsByParent(self, node:Node) -> None:
         if hasattr(node, "_childNum"): delattr(node, "_childNum")
+        if hasattr(node, "_numValidTo"): delattr(node, "_numValidTo")
         if hasattr(node, "_previousSibling"): delattr(node, "_previousSibling")
         if hasattr(node, "_nextSibling"): delattr(node, "_nextSibling")
-        if (node.childNodes):
+        if isinstance(node, Branchable) and node.childNodes:  # (not leaves)
             for ch in node.childNodes: self._siblingsByParent(ch)
 
-    def _siblingsByChildNum(self, node:Node) -> None:
+    def _siblingsByChildNum(self, node:Node, childNum:int=None) -> None:
         if hasattr(node, "_previousSibling"): delattr(node, "_previousSibling")
         if hasattr(node, "_nextSibling"): delattr(node, "_nextSibling")
-        setattr(node, "_childNum", node.getChildIndex())
-        if (node.childNodes):
-            for ch in node.childNodes: self._siblingsByChildNum(ch)
-
-    def _siblingsByLink(self, node:Node) -> None:
+        if childNum is None:
+            if hasattr(node, "_childNum"): delattr(node, "_childNum")
+            childNum = node.getChildIndex()
+        node._childNum = childNum
+        if isinstance(node, Branchable) and node.childNodes:  # (not leaves)
+            for n, ch in enumerate(node.childNodes): self._siblingsByChildNum(ch, n)
+            node._numValidTo = len(node.childNodes)
+
+    def _siblingsByLink(self, node:Node, prev:Node=None, nxt:Node=None,
+        top:bool=True) -> None:
         if hasattr(node, "_childNum"): delattr(node, "_childNum")
-        setattr(node, "_previousSibling", node.previousSibling)
-        setattr(node, "_nextSibling", node.nextSibling)
-        if (node.childNodes):
-            for ch in node.childNodes: self._siblingsByLink(ch)
+        if hasattr(node, "_numValidTo"): delattr(node, "_numValidTo")
+        if top:
+            if hasattr(node, "_previousSibling"): delattr(node, "_previousSibling")
+            if hasattr(node, "_nextSibling"): delattr(node, "_nextSibling")
+            prev, nxt = node.previousSibling, node.nextSibling
+        node._previousSibling = prev
+        node._nextSibling = nxt
+        if isinstance(node, Branchable) and node.childNodes:  # (not leaves)
+            chs = node.childNodes
+            for n, ch in enumerate(chs):
+                self._siblingsByLink(ch, chs[n-1] if n > 0 else None,
+                    chs[n+1] if n+1 < len(chs) else None, top=False)
 
     def importNode(self, node:'Node', deep:bool=False) -> 'Node':  # WHATWG?
         myCopy = node.cloneNode(deep=deep)
@@ -2448,6 +2741,8 @@ class DocumentFragment(Branchable, Node):
     """TODO: Do the magic "insert" where if you insert a DocumentFragment,
     its children get inserted instead.
     """
+    nodeType = Node.DOCUMENT_FRAGMENT_NODE
+
     def __init__(
         self,
         namespaceURI:str=None,
@@ -2456,7 +2751,6 @@ class DocumentFragment(Branchable, Node):
         isFragment:bool=False
         ):
         super().__init__(ownerDocument=None, nodeName=qualifiedName)
-        self.nodeType = Node.DOCUMENT_FRAGMENT_NODE
 
 
 ###############################################################################
@@ -2467,12 +2761,14 @@ class Element(Branchable, Attributable, Node):
     https://www.w3.org/TR/2000/REC-DOM-Level-2-Core-20001113/core.html
     https://docs.python.org/2/library/xml.dom.html#dom-element-objects
     """
+    __slots__ = ("attributes", "declaredNS", "_numValidTo")
+    nodeType = Node.ELEMENT_NODE
+
     def __init__(self, ownerDocument:Document=None, nodeName:NMTOKEN_t=None):
         Branchable.__init__(self)
         Attributable.__init__(self)
         Node.__init__(self, ownerDocument, nodeName)
 
-        self.nodeType:int = Node.ELEMENT_NODE
         self.inheritedNS:dict = None
         self.declaredNS:dict = None
         self.prevError:str = None  # Mainly for isEqualNode
@@ -2515,7 +2811,7 @@ class Element(Branchable, Attributable, Node):
             newNode.attributes = None
         else:
             for k in self.attributes:
-                newNode.setAttribute(k, self.attributes[k].nodeValue)
+                newNode.setAttribute(k, self.attributes.getNamedValue(k))
 
         if deep and self.childNodes:
             for ch in self.childNodes:
@@ -2669,7 +2965,7 @@ class Element(Branchable, Attributable, Node):
             if "*" == tagName:
                 if not ch.isElement: continue
             elif ":" not in tagName:
-                if (tagName != ch.nodeName): continue
+                if (tagName is not ch.nodeName and tagName != ch.nodeName): continue
             elif not NameSpaces.nameMatch(ch, tagName): continue
             nodeList.append(ch)
         return nodeList
@@ -2832,9 +3128,7 @@ class Element(Branchable, Attributable, Node):
         if fo and fo.sortAttributes: attrNames = sorted(attrNames)
         attrString = ""
         for attrName in attrNames:
-            attrNode = self.attributes[attrName]
-            #print(f"\n    attribute '{a}' = {self.attributes[a]} ({type(self.attributes[a])}.")
-            attrValue = attrNode.nodeValue
+            attrValue = self.attributes.getNamedValue(attrName)
             if isinstance(attrValue, list): attrValue = ' '.join(attrValue)
             #print(f"formatAttributes[{a}] gets a {type(attrValue)}: '{attrValue}' -> "
             #    f"{FormatXml.escapeAttribute(attrValue, fo=fo)}.")
@@ -2888,7 +3182,7 @@ class Element(Branchable, Attributable, Node):
                     Node.COMMENT_NODE,
                     # docfrag??? entref???
                 ]
-                assert ch.parentNode == self
+                assert ch.parentNode is self
                 ps = ch.previousSibling
                 if i > 0: assert ps is prevChild
                 if i < len(self.childNodes)-1:
@@ -2913,7 +3207,10 @@ class CharacterData(Node):   # , NonBranchable
     but then NonBranchable can't override lisst ops. Better to take list off
     of the top, and only bring it in via Branchable < list. That also probably
     makes NonBranchable completely unnecessary.
+    Being empty lists, these allocate no item storage, just the list header.
     """
+    __slots__ = ("data",)
+
     def __init__(self, ownerDocument:Document=None, nodeName:NMTOKEN_t=None):
         super().__init__(ownerDocument, nodeName)
         self.data = None
@@ -3048,9 +3345,11 @@ class CharacterData(Node):   # , NonBranchable
 ###############################################################################
 #
 class Text(CharacterData):
+    __slots__ = ("inCDATA",)
+    nodeType = Node.TEXT_NODE
+
     def __init__(self, ownerDocument:Document=None, data:str="", inCDATA:bool=False):
         super().__init__(ownerDocument=ownerDocument, nodeName=RWord.NN_TEXT)
-        self.nodeType = Node.TEXT_NODE
         self.data = data
         self.inCDATA = inCDATA  # Allow for round-tripping
 
@@ -3096,9 +3395,11 @@ class CDATASection(CharacterData):
     That way text nodes are always just text nodes, but we can still export
     them as marked sections if desired.
     """
+    __slots__ = ()
+    nodeType = Node.CDATA_SECTION_NODE
+
     def __init__(self, ownerDocument:Document, data:str):
         super().__init__(ownerDocument=ownerDocument, nodeName="#cdata-section")
-        self.nodeType = Node.CDATA_SECTION_NODE
         self.data = data
 
     def tostring(self) -> str:  # CDATASection
@@ -3108,12 +3409,14 @@ class CDATASection(CharacterData):
 ###############################################################################
 #
 class ProcessingInstruction(CharacterData):
+    __slots__ = ("target",)
+    nodeType = Node.PROCESSING_INSTRUCTION_NODE
+
     def __init__(self, ownerDocument:Document=None,
         target:NMTOKEN_t=None, data:str=""):
         if target is not None and target!="" and not Rune.isXmlName(target):
             raise ICharE("Bad PI target '%s'." % (target))
         super().__init__(ownerDocument=ownerDocument, nodeName=target)
-        self.nodeType = Node.PROCESSING_INSTRUCTION_NODE
         self.data = data
         self.target = target
 
@@ -3142,9 +3445,11 @@ PI = ProcessingInstruction
 ###############################################################################
 #
 class Comment(CharacterData):
+    __slots__ = ()
+    nodeType = Node.COMMENT_NODE
+
     def __init__(self, ownerDocument:Document=None, data:str=""):
         super().__init__(ownerDocument=ownerDocument, nodeName="#comment")
-        self.nodeType=Node.COMMENT_NODE
         self.data = data
 
     def cloneNode(self, deep:bool=False) -> 'Comment':
@@ -3166,11 +3471,13 @@ class EntityReference(CharacterData):  # OBS DOM
         Not widely supported. This is mostly a placeholder for now. This should
     be hooked up with the schema and the entity definition, or dropped.
     """
+    __slots__ = ()
+    nodeType = Node.ENTITY_REFERENCE_NODE
+
     def __init__(self, ownerDocument:Node, name:NMTOKEN_t, data:str=""):
         super().__init__(ownerDocument=ownerDocument, nodeName=name)
         if not Rune.isXmlName(name): raise ICharE(
             f"Bad name '{name}' for EntityReference node.")
-        self.nodeType = Node.ENTITY_REFERENCE_NODE
         self.data = data
 
     def tostring(self) -> str:  # EntityReference
@@ -3198,6 +3505,10 @@ class Attr(Node):
     Element.attributes, not on Attr.node/name?
     TODO If options.attributeTypes is set, just when should casting happen?
     """
+    __slots__ = ("_nodeValue", "ownerElement", "attrTypeName", "readOrder",
+        "specified", "isId")
+    nodeType = Node.ATTRIBUTE_NODE
+
     def __init__(self, name:NMTOKEN_t, value:Any, ownerDocument:Document=None,
         nsPrefix:NMTOKEN_t=None, namespaceURI:str=None, ownerElement:Node=None,
         attrTypeName:str="string", readOrder:int=None, specified:bool=True):
@@ -3208,7 +3519,6 @@ class Attr(Node):
                 f"is node type '{ownerElement.nodeType}', not element.")
 
         super().__init__(ownerDocument=ownerDocument, nodeName=name)
-        self.nodeType = Node.ATTRIBUTE_NODE
         self._nodeValue = None
         self.ownerDocument = ownerDocument  # TODO Drop?
         self.ownerElement = ownerElement
@@ -3373,13 +3683,18 @@ class NamedNodeMap(OrderedDict):
     """This is really just a dict or OrderedDict (latter lets us retain
     order from source if desired). So let people do Python stuff with it.
 
-    TODO: Problem is, Individual attributes need to know who owns them, so
-    they kinda have to be an object so they can store that ref. Is there
-    anything else Attr actually needs, though (besides namespace stuff)?
-
-    So this stores a whole Attr instance as the value. Might be better to
-    store just the nominal value there and rig it to have the rest accessible,
-    but I don't see a way I like much better....
+    Individual attributes need to know who owns them, so they kinda have to
+    be an object so they can store that ref. But most callers only want the
+    value, so attributes set by name and (string) value are stored as just
+    the value, and the Attr is made only when someone asks for it (via
+    [], get(), values(), items(), getNamedItem(), etc.), then kept.
+    getNamedValue() gets the value either way, without making an Attr.
+    Every mapping method that hands out values goes through __getitem__,
+    so callers only ever see Attrs. values() and items() are live views
+    (collections.abc ones, not OrderedDict's, so no reversed() on them).
+
+    Setting an attribute that is an ID by name (see IdHandler.noteAttribute)
+    updates the owner document's ID index right away.
     """
     def __init__(self, ownerDocument:Document=None, parentNode:Element=None,
         attrName:NMTOKEN_t=None, attrValue:Any=None):
@@ -3387,11 +3702,69 @@ class NamedNodeMap(OrderedDict):
         """
         super(NamedNodeMap, self).__init__()
         self.ownerDocument = ownerDocument
+        self.parentNode = parentNode  # The owning Element, if any
         if attrName: self.setNamedItem(attrName, attrValue)
 
+    def __getitem__(self, name:NMTOKEN_t) -> Attr:
+        item = super().__getitem__(name)
+        if isinstance(item, Attr): return item
+        attrNode = Attr(name, item, ownerDocument=self.ownerDocument,
+            ownerElement=self.parentNode)
+        super().__setitem__(name, attrNode)
+        return attrNode
+
+    def __setitem__(self, name:NMTOKEN_t, value:Any) -> None:
+        idh = self._idHandler()
+        if idh is not None and name in self:
+            idh.forgetAttribute(self.parentNode, name, self.getNamedValue(name))
+        super().__setitem__(name, value)
+        if idh is not None:
+            idh.noteAttribute(self.parentNode, name, self.getNamedValue(name))
+
+    def __delitem__(self, name:NMTOKEN_t) -> None:
+        idh = self._idHandler()
+        if idh is not None and name in self:
+            idh.forgetAttribute(self.parentNode, name, self.getNamedValue(name))
+        super().__delitem__(name)
+
+    def _idHandler(self) -> 'IdHandler':
+        if self.parentNode is None: return None
+        return getattr(self.parentNode.ownerDocument, "idHandler", None)
+
+    def get(self, name:NMTOKEN_t, default:Any=None) -> Attr:
+        if name not in self: return default
+        return self[name]
+
+    def pop(self, name:NMTOKEN_t, *args) -> Attr:
+        if name not in self: return super().pop(name, *args)
+        attrNode = self[name]
+        del self[name]
+        return attrNode
+
+    def popitem(self, last:bool=True) -> Tuple[NMTOKEN_t, Attr]:
+        if not self: raise KeyError("popitem(): NamedNodeMap is empty.")
+        name = next(reversed(self)) if last else next(iter(self))
+        return name, self.pop(name)
+
+    def setdefault(self, name:NMTOKEN_t, default:Any=None) -> Attr:
+        if name not in self: self[name] = default
+        return self[name]
+
+    def values(self) -> ValuesView:
+        return ValuesView(self)
+
+    def items(self) -> ItemsView:
+        return ItemsView(self)
+
+    def __or__(self, other:Dict) -> 'NamedNodeMap':
+        new = self.clone()
+        new.update(other)
+        return new
+
     def __eq__(self, other:'NamedNodeMap') -> bool:
         """NOTE: Python considers OrderedDicts unequal if order differs.
         But here we want OrderedDict only for serializing, so...
+        (dict() of a NamedNodeMap gets Attrs, which compare by value.)
         """
         return dict(self) == dict(other)
 
@@ -3420,6 +3793,9 @@ class NamedNodeMap(OrderedDict):
         else:
             if not Rune.isXmlQName(attrNodeOrName): raise ICharE(
                 f"Bad item name '{attrNodeOrName}'.")
+            if attrType == "string":  # Attr made lazily, see __getitem__().
+                self[attrNodeOrName] = attrValue
+                return
             attrNode = Attr(attrNodeOrName, attrValue, attrTypeName=attrType,
                 ownerDocument=self.ownerDocument, ownerElement=None)
             self[attrNode.nodeName] = attrNode
@@ -3435,11 +3811,11 @@ class NamedNodeMap(OrderedDict):
         return theAttr
 
     def getNamedValue(self, name:NMTOKEN_t) -> Any:
-        """Returns just the actual value.
+        """Returns just the actual value (without making an Attr for it).
         """
-        if name not in self: return None
-        assert isinstance(self[name], Attr)
-        return self[name].nodeValue
+        item = OrderedDict.get(self, name)
+        if isinstance(item, Attr): return item.nodeValue
+        return item
 
     def removeNamedItem(self, name:NMTOKEN_t) -> Attr:
         #import pudb; pudb.set_trace()
@@ -3517,7 +3893,7 @@ class NamedNodeMap(OrderedDict):
             ks = sorted(ks)
         buf = ""
         for k in ks:
-            buf += f" {k}={FormatXml.escapeAttribute(self[k].nodeValue)}"
+            buf += f" {k}={FormatXml.escapeAttribute(self.getNamedValue(k))}"
         return buf
 
 
@@ -3587,5 +3963,7 @@ class NameSpaces(Dict):  # extension, sort of
         elif Tprefix:
             if (not re.match(r"^(\*|#all|#any)$", Tprefix, flags=re.I)
                 and node.prefix != Turi): return False
-        if Tname and node.nodeName != Turi: return False   # TODO cf nodeNameMatches
+        if Tname and Tname != "*":  # TODO cf nodeNameMatches
+            nodeName = node.localName if Tprefix else node.nodeName
+            if nodeName is not Tname and nodeName != Tname: return False
         return True
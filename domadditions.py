@@ -60,6 +60,8 @@ class ElementTreeAdditions:
     Or in DOM, omit the nodename (or nodeType) test and
     have the Text.textContent just return self.data.
     """
+    __slots__ = ()  # (mixed into slotted DOM nodes)
+
     def find(self, name:NmToken) -> 'Node':
         """Get first direct child of that type.
         """
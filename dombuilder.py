@@ -9,14 +9,16 @@
 import os
 import re
 import codecs
-from typing import Union, IO
+from typing import Union, IO, Callable, Iterator, Iterable, List, Tuple, Any
 import logging
+from concurrent.futures import ProcessPoolExecutor
 #from xml.parsers import expat
 #from xml.dom import minidom
 
 from ragnaroktypes import NMTOKEN_t, NCName_t, XMLParser_P, NodeType, DOMException
 from domenums import RWord
 from runeheim import XmlStrings as Rune
+from saxplayer import SaxEvent
 #import thor
 
 lg = logging.getLogger("dombuilder")
@@ -104,6 +106,25 @@ Or you can be even more explicit:
 Or you can override the built-in expat event handlers to do other stuff.
 
 
+===Many files at once===
+
+    from dombuilder import parseMany
+    results = parseMany(paths, parser="thor", output="json", workers=8)
+
+This spreads the files over a process pool, and returns a ParseResult for
+each, in order. `output` can be "dom" (the default), "xml", "json" (Bifrost),
+or "events"; or pass `mapper`, a (picklable, top-level) function to apply to
+each Document in the worker, and get back whatever it returns. A file that
+fails has its ParseResult.error set instead, and does not stop the rest.
+The same is available from the command line:
+
+    python dombuilder.py --workers 8 --output json --outDir out/ *.xml
+
+For a single huge, flat document, parseParallel(path, workers=8) instead
+splits it between children of the document element, and parses the pieces
+in parallel.
+
+
 ==The rest==
 
 The library includes its own XML parser, which can (at option) read DTDs.
@@ -199,6 +220,8 @@ class DomBuilder():
         domImpl:type,       # Typically from x.getDOMImplementation()
         wsn:bool=False,
         verbose:int=1,
+        batch:bool=False,
+        validator:'Heimdall'=None,
         ):
         """Set up an XML parser and a DOM implementation, and provide
         methods to parse XML and return DOM documents.
@@ -208,6 +231,10 @@ class DomBuilder():
         @param domImpl: a DOM implementation instance to use.
         @param wsn: Discard whitespace-only text nodes.
         @param verbose: Trace some stuff.
+        @param batch: If the parser supports it (Thor does), take events in
+        lists via BatchHandler rather than one call each.
+        @param validator: A heimdall.Heimdall, to check each event before
+        the DOM is built from it (see Heimdall.attach()).
 
         # TODO Switch to take getDOMImplementation instead of module?
         """
@@ -235,9 +262,13 @@ class DomBuilder():
 
         self.wsn = wsn          # Include whitespace-only nodes?
         self.verbose = verbose
+        self.batch = batch
+        self.validator = validator
         self.nodeStack = []     # Open Nodes, incl. Document
         self.IdIndex = {}       # Keep index to validate ID attributes  # TODO Drop?
         self.inCDATA = False    # To get parser CDATA state onto text nodes.
+        self.streamMatch = None # For iterSubtrees(): which elements to hand back
+        self.streamDone = []    # For iterSubtrees(): finished, not yet handed back
 
         self.domDoc = None
         self.domDocumentType = None
@@ -282,6 +313,71 @@ class DomBuilder():
 
     Parse = parse_string
 
+    def iterSubtrees(self, source:Union[IO, str],
+        match:Union[NMTOKEN_t, Callable], chunkSize:int=1<<16) -> Iterator['Element']:
+        """Parse, but instead of building and returning the whole Document,
+        hand back each element that matches, as soon as it is complete, and
+        then remove it from its parent. That keeps memory to about one such
+        subtree (plus ancestors and whatever is not matched), even for huge
+        record-oriented documents.
+
+        @param source: A '<'-initial string, a path, or an open binary file.
+        @param match: An element type name, or a callable that takes the
+        finished Element and returns whether to hand it back.
+        @param chunkSize: How much to feed the parser at a time. Any parser
+        that supports expat-style Parse(data, isfinal) works (expat, Thor).
+
+        Nested matches are handed back separately, innermost first (so an
+        outer one no longer contains them). Detached elements remain usable.
+        If the caller stops early, the parse is abandoned (see XSParser.close()).
+        """
+        if isinstance(match, str):
+            elemName = match
+            match = lambda node: node.nodeName == elemName
+        self.streamMatch = match
+        self.streamDone = []
+
+        fh = None
+        if isinstance(source, str) and source.startswith("<"):
+            data = source
+        elif isinstance(source, str):
+            if not os.path.isfile(source):
+                raise IOError("'%s' is not a regular file." % (source))
+            data = fh = open(source, "rb")
+        else:
+            data = source
+
+        self.parser_setup(encoding="utf-8", dcls=True)
+        self.domDoc = self.domImpl.createDocument(None, None, None)
+        self.nodeStack = [ ]
+        finished = False
+        try:
+            pos = 0
+            while True:
+                if isinstance(data, str):
+                    chunk = data[pos:pos+chunkSize]
+                    pos += chunkSize
+                else:
+                    chunk = data.read(chunkSize)
+                self.parser.Parse(chunk, not chunk)
+                for node in self.streamDone:
+                    yield node
+                    if node.parentNode is not None:
+                        node.parentNode.removeChild(node)
+                self.streamDone.clear()
+                if not chunk: break
+            finished = True
+        finally:
+            if not finished:  # Stopped early, or failed
+                try:
+                    if hasattr(self.parser, "close"): self.parser.close()
+                    else: self.parser.Parse("", True)
+                except Exception:  # (not the caller's problem by now)
+                    pass
+            if fh: fh.close()
+            self.streamMatch = None
+            self.streamDone = []
+
     def parser_setup(self, encoding:str="utf-8", dcls:bool=True) -> XMLParser_P:
         """Construct a parser instance and hook up SAX event handlers.
         """
@@ -322,6 +418,12 @@ class DomBuilder():
             p.ElementDeclHandler = self.ElementDeclHandler
             p.AttlistDeclHandler = self.AttlistDeclHandler
 
+        if self.batch and hasattr(p, "BatchHandler"):
+            p.BatchHandler = self.BatchHandler
+
+        if self.validator is not None:
+            self.validator.reset()
+            self.validator.attach(p)
         return p
 
     def tostring(self) -> str:
@@ -373,16 +475,7 @@ class DomBuilder():
                 attrDict = {}
                 for i in range(0, len(args), 2):
                     attrDict[args[i]] = args[i+1]
-
-            nsp = RWord.NS_PREFIX+":"
-            for attrName, attrValue in attrDict.items():
-                if attrName.startswith(nsp):
-                    if elemNode.declaredNS is None: elemNode.declaredNS = {}
-                    lName = attrName[len(nsp):]
-                    elemNode.declaredNS[lName] = attrValue
-                    continue
-                assert Rune.isXmlName(attrName)
-                elemNode.setAttribute(attrName, attrValue)
+            self.setAttributes(elemNode, attrDict)
 
         if self.domDoc.documentElement is None:
             if self.nodeStack: raise DOMException(
@@ -396,6 +489,20 @@ class DomBuilder():
 
         return
 
+    @staticmethod
+    def setAttributes(elemNode:'Element', attrDict:dict) -> None:
+        """Put the attributes on, except namespace declarations (see declaredNS).
+        """
+        nsp = RWord.NS_PREFIX+":"
+        for attrName, attrValue in attrDict.items():
+            if attrName.startswith(nsp):
+                if elemNode.declaredNS is None: elemNode.declaredNS = {}
+                lName = attrName[len(nsp):]
+                elemNode.declaredNS[lName] = attrValue
+                continue
+            assert Rune.isXmlName(attrName)
+            elemNode.setAttribute(attrName, attrValue)
+
     def AttributeHandler(self, attrName:NMTOKEN_t, attrValue:str) -> None:
         """Support option of parser returning attributes as separate events.
         SAX parsers generally bundle them in with start-tags, which means fewer
@@ -410,13 +517,16 @@ class DomBuilder():
         lg.info("EndElement '%s'.", elemName)
         if not self.nodeStack: raise IndexError(
             f"Endtag for element '{elemName}' but no elements open.")
-        if self.nodeStack[-1].nodeName != elemName:  # TODO use nodeNameMatches
+        topName = self.nodeStack[-1].nodeName  # (interned names are identical)
+        if topName is not elemName and topName != elemName:  # TODO use nodeNameMatches
             # TODO Report where the current element started
             raise ValueError(
                 "Endtag for element '%s' but open element is '%s'" %
                 (elemName, self.nodeStack[-1].nodeName))
 
-        self.nodeStack.pop()
+        elemNode = self.nodeStack.pop()
+        if self.streamMatch and self.streamMatch(elemNode):
+            self.streamDone.append(elemNode)
         return
 
     def CharacterDataHandler(self, data:str) -> None:
@@ -426,7 +536,7 @@ class DomBuilder():
         so we coalesce.
         """
         lg.info("CharacterData '%s'", showInvisibles(data))
-        if not re.match(r"\S", data):  # whitespace-only
+        if not data or data.isspace():  # whitespace-only
             if not self.wsn: return
         else:
             if not self.nodeStack: raise SyntaxError(
@@ -441,6 +551,62 @@ class DomBuilder():
             curNode.appendChild(tn)
         return
 
+    def BatchHandler(self, events:List[Tuple]) -> None:
+        """Build from a whole list of (SaxEvent, *args) events at once, as
+        from XSParser.BatchHandler. Elements and text (nearly all the events)
+        are built right here, without the per-event handlers' tracing or name
+        checks (the parser already checked). The rest go to those handlers.
+        """
+        START, END, CHAR = SaxEvent.START, SaxEvent.END, SaxEvent.CHAR
+        TEXT_NODE = NodeType.TEXT_NODE
+        stack = self.nodeStack
+        doc = self.domDoc
+        for ev in events:
+            typ = ev[0]
+            if typ is CHAR:
+                data = ev[1]
+                if not data or data.isspace():
+                    if not self.wsn: continue
+                elif not stack: raise SyntaxError(
+                    f"CharacterData found outside any element: '{data}'.")
+                curNode = stack[-1]
+                kids = curNode.childNodes
+                if len(kids) > 0 and kids[-1].nodeType == TEXT_NODE:
+                    kids[-1].data += data
+                else:
+                    tn = doc.createTextNode(data)
+                    if self.inCDATA: tn.inCDATA = True
+                    curNode.appendChild(tn)
+            elif typ is START:
+                elemNode = doc.createElement(ev[1])
+                if len(ev) > 2 and ev[2]: self.setAttributes(elemNode, ev[2])
+                if stack:
+                    stack[-1].appendChild(elemNode)
+                elif doc.documentElement is None:
+                    doc.appendChild(elemNode)
+                else: raise DOMException(
+                    f"Document element is '{doc.documentElement}', but no stack.")
+                stack.append(elemNode)
+            elif typ is END:
+                if not stack or (stack[-1].nodeName is not ev[1]
+                    and stack[-1].nodeName != ev[1]):
+                    self.EndElementHandler(ev[1])  # Reports the error
+                elemNode = stack.pop()
+                if self.streamMatch and self.streamMatch(elemNode):
+                    self.streamDone.append(elemNode)
+            else:
+                cb = getattr(self, typ.value, None)
+                if cb: cb(*ev[1:])
+
+    def buildFromEvents(self, events:List[Tuple]) -> 'Document':
+        """Build a whole Document from a list of (SaxEvent, *args) events,
+        as recorded by parseMany(output="dom").
+        """
+        self.domDoc = self.domImpl.createDocument(None, None, None)
+        self.nodeStack = [ ]
+        self.BatchHandler(events)
+        return self.domDoc
+
     # CDATA status is recorded on text nodes, rather than making actual DOM
     # CDATA nodes (no one expects the CDatish imposition!).
     def StartCdataSectionHandler(self, *args) -> None:
@@ -494,24 +660,211 @@ class DomBuilder():
     def EndDoctypeDeclHandler(self) -> None:
         pass
 
-    def ElementDeclHandler(self, elemName:NMTOKEN_t, model:str="ANY") -> None:
-        self.domDocumentType.ElementDef(elemName, aliasFor=None, model=model)
+    def dropDcl(self, kind:str, name:Any) -> None:
+        """DomBuilder doesn't build a DOM DocumentType, so the declaration
+        handlers just say what isn't being kept. (Heimdall and, for Thor,
+        XSParser.sr.doctype have them, for validation.) 'name' may be Thor's
+        whole declaration tuple.
+        """
+        if isinstance(name, tuple): name = name[0]
+        lg.info("No DocumentType, dropping %s declaration for %s.", kind, name)
 
-    def AttlistDeclHandler(self, elemName:NMTOKEN_t,
-        attrName:NMTOKEN_t, attrType:str, attrDefault:str) -> None:
-        self.domDocumentType.AttrDef(elemName, attrName, attrType, attrDefault)
+    # These take expat's arguments, or Thor's single declaration tuple.
+    def ElementDeclHandler(self, elemName:Union[NMTOKEN_t, Tuple], *_args) -> None:
+        self.dropDcl("ELEMENT", elemName)
 
-    def EntityDeclHandler(self, entName:NMTOKEN_t,
-        literal:str=None, publicId:str=None, systemId:str=None) -> None:
-        self.domDocumentType.EntityDef(entName, literal, publicId, systemId)
+    def AttlistDeclHandler(self, elemName:Union[NMTOKEN_t, Tuple], *_args) -> None:
+        self.dropDcl("ATTLIST", elemName)
 
-    def UnparsedEntityDeclHandler(self, entName:NMTOKEN_t,
-        literal:str=None, publicId:str=None, systemId:str=None) -> None:
-        self.domDocumentType.EntityDef(entName, literal, publicId, systemId)
+    def EntityDeclHandler(self, entName:Union[NMTOKEN_t, Tuple], *_args) -> None:
+        self.dropDcl("ENTITY", entName)
 
-    def SDATAEntityDeclHandler(self, entName:NMTOKEN_t, literal:str=None) -> None:
-        self.domDocumentType.EntityDef(entName, literal)
+    def UnparsedEntityDeclHandler(self, entName:Union[NMTOKEN_t, Tuple], *_args) -> None:
+        self.dropDcl("ENTITY", entName)
 
-    def NotationDeclHandler(self, notationName:NMTOKEN_t,
-        literal:str=None, publicId:str=None, systemId:str=None) -> None:
-        self.domDocumentType.NotationDef(notationName, literal, publicId, systemId)
+    def SDATAEntityDeclHandler(self, entName:Union[NMTOKEN_t, Tuple], *_args) -> None:
+        self.dropDcl("ENTITY", entName)
+
+    def NotationDeclHandler(self, notationName:Union[NMTOKEN_t, Tuple], *_args) -> None:
+        self.dropDcl("NOTATION", notationName)
+
+###############################################################################
+# Parse many files over a process pool.
+#
+class ParseResult:
+    """What parseMany() returns for each file. 'value' is set if it worked,
+    else 'error' (as a string, since not all exceptions pickle).
+    """
+    def __init__(self, path:str, value:Any=None, error:str=None):
+        self.path = path
+        self.value = value
+        self.error = error
+
+    def __bool__(self) -> bool:
+        return self.error is None
+
+    def __repr__(self) -> str:
+        if self.error is not None: return f"ParseResult({self.path}: {self.error})"
+        return f"ParseResult({self.path}: {type(self.value).__name__})"
+
+parseManyOutputs = [ "dom", "events", "xml", "json" ]
+
+def getParserModule(name:str) -> Any:
+    """Map a parser name to something with ParserCreate().
+    """
+    if name == "thor":
+        import thor
+        return thor
+    if name == "expat":
+        from xml.parsers import expat
+        return expat
+    raise ValueError(f"Unknown parser '{name}' (expected 'thor' or 'expat').")
+
+workerSetup = {}  # Set in each worker process, by initParseWorker()
+
+def initParseWorker(parserName:str, output:str, mapper:Callable) -> None:
+    """Runs once in each worker process (which is then reused for many files).
+    """
+    lg.setLevel(logging.ERROR)  # Per-event tracing would swamp the workers
+    import basedom
+    workerSetup["parser"] = getParserModule(parserName)
+    workerSetup["domImpl"] = basedom.getDOMImplementation()
+    workerSetup["output"] = output
+    workerSetup["mapper"] = mapper
+
+def recordEvents(path:str) -> List[Tuple]:
+    """Just parse, keeping the (SaxEvent, *args) events DomBuilder needs.
+    Shipping those back is cheaper than a DOM (which does not pickle anyway).
+    """
+    events = []
+    p = workerSetup["parser"].ParserCreate()
+    if hasattr(p, "BatchHandler"):
+        p.BatchHandler = events.extend
+    else:
+        def recorder(typ:SaxEvent) -> Callable:
+            return lambda *args: events.append((typ, *args))
+        for typ in [ SaxEvent.START, SaxEvent.END, SaxEvent.CHAR,
+            SaxEvent.PROC, SaxEvent.COMMENT, SaxEvent.CDATA, SaxEvent.CDATAEND ]:
+            setattr(p, typ.value, recorder(typ))
+    with open(path, "rb") as ifh:
+        p.ParseFile(ifh)
+    return events
+
+def parseOneInWorker(path:str) -> ParseResult:
+    try:
+        if workerSetup["output"] in [ "dom", "events" ] and not workerSetup["mapper"]:
+            return ParseResult(path, value=recordEvents(path))
+        db = DomBuilder(workerSetup["parser"], workerSetup["domImpl"])
+        domDoc = db.parse(path)
+        if workerSetup["mapper"]:
+            return ParseResult(path, value=workerSetup["mapper"](domDoc))
+        if workerSetup["output"] == "json":
+            from bifrost import Saver
+            return ParseResult(path, value=Saver(domDoc).tostring())
+        return ParseResult(path, value=domDoc.documentElement.toxml())
+    except Exception as e:  # Report, and go on to the next file
+        return ParseResult(path, error=f"{type(e).__name__}: {e}")
+
+def parseMany(paths:Iterable[str], parser:str="thor", output:str="dom",
+    mapper:Callable=None, workers:int=None, chunkSize:int=None) -> List[ParseResult]:
+    """Parse a lot of files, spread over a pool of worker processes, and
+    return a ParseResult for each, in the same order as 'paths'.
+
+    @param parser: "thor" or "expat".
+    @param output: What to return as each ParseResult.value:
+        "dom"    -- a Document (the parsing is done in the workers, but the
+                    tree is built here, from the events they return);
+        "events" -- the list of (SaxEvent, *args) events itself;
+        "xml"    -- the Document serialized back to XML;
+        "json"   -- the Document as Bifrost JSON.
+    @param mapper: If given, this is applied to each Document in the worker,
+        and what it returns is the value (so it and that must pickle).
+    @param workers: Number of processes (default: one per core). 0 means
+        just do it all in this process.
+    @param chunkSize: Files sent to a worker at a time (default spreads the
+        files about 4 chunks per worker).
+    """
+    if output not in parseManyOutputs: raise ValueError(
+        f"Unknown output '{output}' (expected one of {parseManyOutputs}).")
+    paths = list(paths)
+    setup = (parser, output, mapper)
+    if workers == 0:
+        initParseWorker(*setup)
+        results = [ parseOneInWorker(path) for path in paths ]
+    else:
+        workers = workers or os.cpu_count() or 1
+        if not chunkSize: chunkSize = max(1, len(paths) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers,
+            initializer=initParseWorker, initargs=setup) as executor:
+            results = list(executor.map(parseOneInWorker, paths, chunksize=chunkSize))
+
+    if output == "dom" and not mapper:
+        import basedom
+        domImpl = basedom.getDOMImplementation()
+        for res in results:
+            if res: res.value = DomBuilder(None, domImpl).buildFromEvents(res.value)
+    return results
+
+
+def parseParallel(source:Union[str, IO], workers:int=None,
+    minPieceSize:int=1<<20) -> 'Document':
+    """Parse one big document with Thor, spreading the children of its
+    document element over a pool of worker processes (see
+    thor.parseEventsParallel(), which also says when it won't), then build
+    the Document here. The result is the same as parsing it straight through.
+
+    @param source: A '<'-initial string, a path, or an open binary file.
+    """
+    import thor
+    import basedom
+    if isinstance(source, str) and not source.startswith("<"):
+        with codecs.open(source, "rb", encoding="utf-8") as ifh:
+            source = ifh.read()
+    elif not isinstance(source, str):
+        source = source.read().decode("utf-8")
+    events = thor.parseEventsParallel(source, workers=workers,
+        minPieceSize=minPieceSize)
+    return DomBuilder(thor, basedom.getDOMImplementation()).buildFromEvents(events)
+
+
+###############################################################################
+#
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    def processOptions() -> argparse.Namespace:
+        parser = argparse.ArgumentParser(
+            description="Parse many XML files over a process pool.")
+        parser.add_argument("--parser", type=str, default="thor",
+            choices=[ "thor", "expat" ], help="Which parser to use.")
+        parser.add_argument("--output", type=str, default="xml",
+            choices=[ "xml", "json" ], help="Form to write results in.")
+        parser.add_argument("--outDir", type=str, default=None,
+            help="Write each result here (as name.xml or name.json).")
+        parser.add_argument("--workers", type=int, default=None,
+            help="Number of worker processes (default: one per core).")
+        parser.add_argument("--chunkSize", type=int, default=None,
+            help="Files to hand a worker at a time.")
+        parser.add_argument("files", type=str, nargs="+",
+            help="Path(s) to input file(s).")
+        return parser.parse_args()
+
+    args = processOptions()
+    logging.basicConfig(level=logging.WARNING)
+    lg.setLevel(logging.WARNING)
+    nErrors = 0
+    for res in parseMany(args.files, parser=args.parser, output=args.output,
+        workers=args.workers, chunkSize=args.chunkSize):
+        if not res:
+            nErrors += 1
+            print(f"{res.path}\tERROR\t{res.error.splitlines()[0]}")
+        elif args.outDir:
+            base = os.path.splitext(os.path.basename(res.path))[0]
+            with codecs.open(os.path.join(args.outDir, f"{base}.{args.output}"),
+                "wb", encoding="utf-8") as ofh:
+                ofh.write(res.value)
+        else:
+            print(f"{res.path}\tOK\t{len(res.value)} chars")
+    print(f"Parsed {len(args.files)} files, {nErrors} errors.", file=sys.stderr)
+    sys.exit(1 if nErrors else 0)
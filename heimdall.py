@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+#
+# heimdall: Streaming validation, as a filter between any SAX event source
+# (Thor, Loki, expat, Node.eachSaxEvent()) and any consumer.
+#
+import logging
+from collections import namedtuple
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
+
+from ragnaroktypes import NMTOKEN_t
+from runeheim import XmlStrings as Rune
+from saxplayer import SaxEvent
+from schemera import (DocumentType, ElementDef, AttrDef, DftType,
+    attrDefFromExpat, expatModelToString)
+import xsdtypes
+
+lg = logging.getLogger("heimdall")
+
+__metadata__ = {
+    "title"        : "heimdall",
+    "description"  : "Streaming validation of SAX events against a DocumentType.",
+    "rightsHolder" : "Steven J. DeRose",
+    "creator"      : "http://viaf.org/viaf/50334488",
+    "type"         : "http://purl.org/dc/dcmitype/Software",
+    "language"     : "Python 3.11",
+    "created"      : "2025-06-01",
+    "modified"     : "2025-06-01",
+    "publisher"    : "http://github.com/sderose",
+    "license"      : "https://creativecommons.org/licenses/by-sa/3.0/"
+}
+__version__ = __metadata__['modified']
+
+
+ValidityError = namedtuple("ValidityError", [ "msg", "lineNum", "colNum", "path" ])
+
+nameListTypes = { "IDREFS", "ENTITIES", "NMTOKENS" }
+nameTypes = { "ID", "IDREF", "ENTITY", "NOTATION", "IDREFS", "ENTITIES" }
+nmtokenTypes = { "NMTOKEN", "NMTOKENS" }
+
+
+###############################################################################
+#
+class Heimdall:
+    """Check SAX events against a DocumentType as they stream past: content
+    models (via ContentAutomaton), attribute presence, #FIXED values and
+    types, ID uniqueness, and IDREF resolution. No tree is built, so memory
+    is the open-element stack plus the IDs seen (and any IDREFs not yet
+    resolved), however large the document.
+
+    There are three ways to put it in front of a consumer:
+        * hv.attach(parser) -- after the consumer has hooked up its handlers
+          (e.g. DomBuilder.parser_setup()). Heimdall wraps them (and
+          BatchHandler if set), so it sees each event first.
+        * hv.filter(events) -- pass through an iterable of (SaxEvent, *args)
+          tuples, such as from Node.eachSaxEvent() or XSParser.iterparse().
+        * Call its handler methods (StartElementHandler, etc.) directly.
+
+    The DocumentType comes from the constructor; or, for Thor and Loki, from
+    the parser itself; or, for expat, from the declaration events.
+    Errors are kept (up to maxErrors) in self.errors as ValidityErrors,
+    unless raiseErrors is set, in which case the first raises SyntaxError.
+    Sources that have no document-end event (e.g. expat) should be followed
+    by a call to finish(), which reports unresolved IDREFs.
+    """
+    checkerCacheSize = 256  # Recent results kept per XSD type (values repeat)
+
+    def __init__(self, doctype:DocumentType=None,
+        models:bool=True, attributes:bool=True, ids:bool=True,
+        raiseErrors:bool=False, maxErrors:int=1000):
+        self.givenDoctype = doctype
+        self.doctype = doctype
+        self.getDoctype:Callable = None     # Fetch doctype at first START
+        self.locator:Callable = None        # Returns (lineNum, colNum)
+        self.models = models
+        self.attributes = attributes
+        self.ids = ids
+        self.raiseErrors = raiseErrors
+        self.maxErrors = maxErrors
+
+        self.errors:List[ValidityError] = []
+        self.nErrors = 0
+        self.stack:List[List] = []          # [ elemName, automaton, state ]
+        self.idValues = set()
+        self.pendingRefs:Dict[str, ValidityError] = {}  # Forward IDREFs
+        self.pendingStart:Tuple = None      # (elemName, attrs) w/ ATTRIBUTE events
+
+        self.eventMethods = {
+            SaxEvent.START:      self.StartElementHandler,
+            SaxEvent.ATTRIBUTE:  self.AttributeHandler,
+            SaxEvent.END:        self.EndElementHandler,
+            SaxEvent.CHAR:       self.CharacterDataHandler,
+            SaxEvent.DOCEND:     self.DocumentEndHandler,
+            SaxEvent.ELEMENTDCL: self.ElementDeclHandler,
+            SaxEvent.ATTLISTDCL: self.AttlistDeclHandler,
+        }
+
+    def reset(self) -> None:
+        """Forget everything about the last document (except a doctype
+        passed to the constructor), to validate another.
+        """
+        self.doctype = self.givenDoctype
+        self.getDoctype = None
+        self.errors = []
+        self.nErrors = 0
+        self.stack = []
+        self.idValues = set()
+        self.pendingRefs = {}
+        self.pendingStart = None
+
+    @property
+    def isValid(self) -> bool:
+        return self.nErrors == 0
+
+    def error(self, msg:str) -> None:
+        lineNum = colNum = None
+        if self.locator is not None:
+            try:
+                lineNum, colNum = self.locator()
+            except AttributeError:  # (e.g. the parser has no input open)
+                pass
+        path = "/" + "/".join(entry[0] for entry in self.stack)
+        self.nErrors += 1
+        if self.raiseErrors: raise SyntaxError(
+            f"Validation error: {msg} at {path} (line {lineNum})")
+        if len(self.errors) < self.maxErrors:
+            self.errors.append(ValidityError(msg, lineNum, colNum, path))
+
+    ### Hooking up ############################################################
+    #
+    def attach(self, parser:Any) -> Any:
+        """Put this validator in front of whatever handlers 'parser' has now.
+        Works with XSParser (Thor, Loki, and the expat engine) and pyexpat.
+        """
+        # (ExpatParser has an 'sr' too, but its doctype stays empty)
+        if (self.doctype is None and getattr(parser, "sr", None) is not None
+            and not hasattr(parser, "expatParser")):
+            self.getDoctype = lambda: parser.sr.doctype
+        elif self.doctype is None:  # Build one from declaration events
+            self.chain(parser, SaxEvent.ELEMENTDCL)
+            self.chain(parser, SaxEvent.ATTLISTDCL)
+        if "CurrentLineNumber" in dir(parser):  # (may not work until parsing)
+            self.locator = lambda: (
+                parser.CurrentLineNumber, parser.CurrentColumnNumber)
+
+        if getattr(parser, "BatchHandler", None):
+            # Batches are checked after the parser has read past them, so
+            # its location would be wrong; errors get no line numbers.
+            self.locator = None
+            downstream = parser.BatchHandler
+            def batchFilter(events:List[Tuple]) -> None:
+                eventMethods = self.eventMethods
+                for ev in events:
+                    if (m := eventMethods.get(ev[0])) is not None: m(*ev[1:])
+                downstream(events)
+            parser.BatchHandler = batchFilter
+            return parser
+
+        for typ in [ SaxEvent.START, SaxEvent.ATTRIBUTE, SaxEvent.END,
+            SaxEvent.CHAR, SaxEvent.DOCEND ]:
+            self.chain(parser, typ)
+        return parser
+
+    def chain(self, parser:Any, typ:SaxEvent) -> None:
+        """Set parser's handler for 'typ' to ours, followed by the old one.
+        """
+        if typ.value not in dir(parser): return  # (e.g. AttributeHandler in expat)
+        mine = self.eventMethods[typ]
+        downstream = getattr(parser, typ.value, None)
+        if downstream is None:
+            setattr(parser, typ.value, mine)
+            return
+        def both(*args) -> None:
+            mine(*args)
+            downstream(*args)
+        setattr(parser, typ.value, both)
+
+    def filter(self, events:Iterable[Tuple]) -> Iterator[Tuple]:
+        """Check each (SaxEvent, *args) tuple, and pass it on.
+        """
+        eventMethods = self.eventMethods
+        for ev in events:
+            if (m := eventMethods.get(ev[0])) is not None: m(*ev[1:])
+            yield ev
+
+    ### Handlers ##############################################################
+    #
+    def StartElementHandler(self, elemName:NMTOKEN_t, *args) -> None:
+        """Attributes can come as a dict, as a list of alternating names
+        and values (expat's ordered_attributes), as alternating varargs
+        (eachSaxEvent()'s "PAIRS"), or as following ATTRIBUTE events (in
+        which case args[0] is None, as from XSParser with saxAttribute).
+        """
+        if self.pendingStart is not None: self.flushStart()
+        if not args or isinstance(args[0], dict): attrs = args[0] if args else {}
+        elif args[0] is None:
+            self.pendingStart = (elemName, {})
+            return
+        else:
+            pairs = args[0] if isinstance(args[0], list) else args
+            attrs = dict(zip(pairs[0::2], pairs[1::2]))
+        self.startElement(elemName, attrs)
+
+    def AttributeHandler(self, attrName:NMTOKEN_t, attrValue:str) -> None:
+        if self.pendingStart is not None:
+            self.pendingStart[1][attrName] = attrValue
+
+    def flushStart(self) -> None:
+        elemName, attrs = self.pendingStart
+        self.pendingStart = None
+        self.startElement(elemName, attrs)
+
+    def EndElementHandler(self, elemName:NMTOKEN_t=None) -> None:
+        if self.pendingStart is not None: self.flushStart()
+        if not self.stack: return
+        entry = self.stack[-1]
+        if self.models and entry[1] is not None and not entry[1].isFinal(entry[2]):
+            self.error(f"Element '{entry[0]}' ended too soon"
+                f" (expected {entry[1].expected(entry[2])}).")
+        self.stack.pop()
+
+    def CharacterDataHandler(self, data:str) -> None:
+        if self.pendingStart is not None: self.flushStart()
+        if not self.models or not self.stack or data.isspace(): return
+        entry = self.stack[-1]
+        if entry[1] is not None and not entry[1].allowText:
+            self.error(f"Text not allowed in element '{entry[0]}'.")
+
+    def DocumentEndHandler(self) -> None:
+        self.finish()
+
+    def finish(self) -> None:
+        """At the end of a document, report IDREFs to IDs that never showed.
+        """
+        if self.pendingStart is not None: self.flushStart()
+        for idRef, firstUse in self.pendingRefs.items():
+            self.nErrors += 1
+            msg = f"IDREF '{idRef}' does not match any ID."
+            if self.raiseErrors: raise SyntaxError(f"Validation error: {msg}"
+                f" at {firstUse.path} (line {firstUse.lineNum})")
+            if len(self.errors) < self.maxErrors:
+                self.errors.append(firstUse._replace(msg=msg))
+        self.pendingRefs = {}
+
+    def ElementDeclHandler(self, elemName:NMTOKEN_t, model:Any=None) -> None:
+        """Add an element to the doctype, from expat's (name, model) or
+        from XSParser's (names, model, ...) tuple.
+        """
+        if (doctype := self.dclDoctype()) is None: return
+        if isinstance(elemName, tuple): elemName, model = elemName[0], elemName[1]
+        if isinstance(model, tuple): model = expatModelToString(model)
+        for name in (elemName if isinstance(elemName, list) else [ elemName ]):
+            if name in doctype.elementDefs:
+                doctype.elementDefs[name].model = model
+            else:
+                doctype.elementDefs[name] = ElementDef(
+                    name, model=model, ownerSchema=doctype)
+
+    def AttlistDeclHandler(self, elemName:NMTOKEN_t, attrName:NMTOKEN_t=None,
+        attrType:str=None, default:str=None, required:bool=False) -> None:
+        """Add an attribute to the doctype, as expat reports them (one
+        attribute per call), or from XSParser's (elemNames, attrDefs) tuple.
+        """
+        if self.dclDoctype() is None: return
+        if isinstance(elemName, tuple):
+            for name in elemName[0]:
+                for attrDef in elemName[1]: self.addAttrDef(name, attrDef)
+            return
+        self.addAttrDef(elemName,
+            attrDefFromExpat(elemName, attrName, attrType, default, required))
+
+    def dclDoctype(self) -> DocumentType:
+        """Get the doctype that declaration events should be added to, or
+        None if one was passed in or the parser keeps its own.
+        """
+        if self.givenDoctype is not None or self.getDoctype is not None: return None
+        if self.doctype is None: self.doctype = DocumentType()
+        return self.doctype
+
+    def addAttrDef(self, elemName:NMTOKEN_t, attrDef:AttrDef) -> None:
+        elementDefs = self.doctype.elementDefs
+        if elemName not in elementDefs:
+            elementDefs[elemName] = ElementDef(
+                elemName, model=None, ownerSchema=self.doctype)
+        elDef = elementDefs[elemName]
+        if elDef.attrDefs is None: elDef.attrDefs = {}
+        if attrDef.attrName not in elDef.attrDefs:  # First one wins
+            elDef.attrDefs[attrDef.attrName] = attrDef
+
+    ### Checking ##############################################################
+    #
+    def startElement(self, elemName:NMTOKEN_t, attrs:Dict) -> None:
+        if self.getDoctype is not None:
+            self.doctype = self.getDoctype()
+            self.getDoctype = None
+        elementDefs = self.doctype.elementDefs if self.doctype is not None else {}
+
+        if self.models and self.stack:
+            parent = self.stack[-1]
+            if parent[1] is not None:
+                nxt = parent[1].step(parent[2], elemName)
+                if nxt is None: self.error(f"Element '{elemName}' not allowed here"
+                    f" in '{parent[0]}' (expected {parent[1].expected(parent[2])}).")
+                else: parent[2] = nxt
+
+        elDef = elementDefs.get(elemName)
+        self.stack.append([ elemName,
+            elDef.getAutomaton() if elDef is not None and self.models else None, 0 ])
+        if elDef is None:
+            if elementDefs: self.error(f"Undeclared element '{elemName}'.")
+            return
+        if self.attributes or self.ids: self.checkAttributes(elDef, attrs)
+
+    def checkAttributes(self, elDef:ElementDef, attrs:Dict) -> None:
+        attrDefs = elDef.attrDefs or {}
+        if self.attributes:
+            for attrName in attrs:
+                if attrName not in attrDefs and not attrName.startswith("xmlns"):
+                    self.error(f"Undeclared attribute '{attrName}'"
+                        f" for element '{elDef.name}'.")
+        for attrName, attrDef in attrDefs.items():
+            attrDft = attrDef.attrDft
+            if attrDft is not None and not isinstance(attrDft, DftType):
+                attrDft = DftType(attrDft)
+            if attrName not in attrs:
+                if self.attributes and attrDft == DftType.REQUIRED:
+                    self.error(f"Required attribute '{attrName}' missing"
+                        f" for element '{elDef.name}'.")
+                continue
+            value = attrs[attrName]
+            if self.attributes:
+                if attrDft == DftType.FIXED and value != attrDef.literal:
+                    self.error(f"Attribute '{attrName}' must be"
+                        f" '{attrDef.literal}', not '{value}'.")
+                self.checkType(attrDef, value)
+            if self.ids: self.checkIds(attrDef, value)
+
+    def checkType(self, attrDef:AttrDef, value:str) -> None:
+        attrType = attrDef.attrType
+        if attrDef.enumValues:
+            if value not in attrDef.enumValues: self.error(
+                f"Attribute '{attrDef.attrName}' value '{value}' is not"
+                f" one of {list(attrDef.enumValues)}.")
+        elif attrType == "CDATA":
+            pass
+        elif attrType in nameTypes or attrType in nmtokenTypes:
+            tokens = value.split() if attrType in nameListTypes else [ value ]
+            test = Rune.isXmlNMTOKEN if attrType in nmtokenTypes else Rune.isXmlName
+            if not tokens or not all(test(t) for t in tokens): self.error(
+                f"Attribute '{attrDef.attrName}' value '{value}' is not a {attrType}.")
+            elif attrType in ("ENTITY", "ENTITIES") and self.doctype is not None:
+                for t in tokens:
+                    if t not in self.doctype.entityDefs: self.error(
+                        f"Attribute '{attrDef.attrName}' names undeclared entity '{t}'.")
+        elif isinstance(attrType, str) and attrType in xsdtypes.XSDDatatypes:
+            checker = xsdtypes.XSDDatatypes[attrType].getChecker(self.checkerCacheSize)
+            if badFacet := checker(value): self.error(
+                f"Attribute '{attrDef.attrName}' value '{value}' violates"
+                f" facet {badFacet} of type {attrType}.")
+
+    def checkIds(self, attrDef:AttrDef, value:str) -> None:
+        attrType = attrDef.attrType
+        if attrType == "ID":
+            if value in self.idValues:
+                self.error(f"Duplicate ID value '{value}'.")
+            else:
+                self.idValues.add(value)
+                self.pendingRefs.pop(value, None)
+        elif attrType == "IDREF" or attrType == "IDREFS":
+            for idRef in value.split():
+                if idRef in self.idValues or idRef in self.pendingRefs: continue
+                lineNum = colNum = None
+                if self.locator is not None:
+                    try:
+                        lineNum, colNum = self.locator()
+                    except AttributeError:
+                        pass
+                self.pendingRefs[idRef] = ValidityError(None, lineNum, colNum,
+                    "/" + "/".join(entry[0] for entry in self.stack))
+
@@ -155,6 +155,42 @@ class IdHandler:
         #print("Choices:\n" + self.choicestostring())
         return self.theIndex
 
+    def isIdAttrName(self, node:'Element', attrName:NMTOKEN_t) -> bool:
+        """Is the attribute an ID on this element, going just by names?
+        That covers xml:id and AttributeChoices with no particular namespaces;
+        others need the Attr (see getIdAttrNode() and buildIdIndex()).
+        """
+        if attrName == "xml:id": return True
+        for ac in self.attributeChoices:
+            if (ac.attrName == attrName
+                and ac.attrNS in [ NS_ANY, None, "" ]
+                and ac.elemNS in [ NS_ANY, None, "" ]
+                and ac.elemName in [ EL_ANY, None, "", node.nodeName ]):
+                return True
+        return False
+
+    def _attrIdVal(self, node:'Element', attrName:NMTOKEN_t, value:Any) -> Any:
+        if not self.isIdAttrName(node, attrName): return None
+        if self.valgen: val = self.valgen(node.getAttributeNode(attrName))
+        elif value is None: return None
+        else: val = str(value).strip()
+        if self.caseHandler and val is not None: val = self.caseHandler.normalize(val)
+        return val
+
+    def noteAttribute(self, node:'Element', attrName:NMTOKEN_t, value:Any) -> None:
+        """Called (by NamedNodeMap) when an attribute is set, so an ID gets
+        into the index without a rebuild. Only the name and (plain) value
+        are needed, so this doesn't make Attrs for the other attributes.
+        """
+        idVal = self._attrIdVal(node, attrName, value)
+        if idVal: self.theIndex[idVal] = node
+
+    def forgetAttribute(self, node:'Element', attrName:NMTOKEN_t, value:Any) -> None:
+        """Undo noteAttribute(), when the attribute changes or goes away.
+        """
+        idVal = self._attrIdVal(node, attrName, value)
+        if idVal and self.theIndex.get(idVal) is node: del self.theIndex[idVal]
+
     def removeElementFromIndex(self, node:'Element') -> None:
         idVal = self.getIdVal(node)
         if self.caseHandler: idVal = self.caseHandler.normalize(idVal)
@@ -284,8 +284,7 @@ class FormatXml:
         if fo and fo.sortAttributes: attrNames = sorted(attrNames)
         attrString = ""
         for a in (attrNames):
-            attrNode = theNode.attributes[a]
-            v = attrNode.nodeValue
+            v = theNode.attributes.getNamedValue(a)
             if isinstance(v, list): v = ' '.join(v)
             if fo and fo.normAttributes: v = Rune.normalizeSpace(v)
             attrString += f"{ws}{a}={FormatXml.escapeAttribute(v)}"
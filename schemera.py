@@ -13,7 +13,7 @@ from ragnaroktypes import (NMTOKEN_t, QName_t, FlexibleEnum,
 from domenums import RWord
 from runeheim import XmlStrings as Rune, CaseHandler #, UNormHandler, WSHandler
 from basedom import Node
-from xsdtypes import XSDDatatypes
+from xsdtypes import XSDDatatypes, XsdType, deriveXsdType
 from prettyxml import FormatXml
 
 lg = logging.getLogger("documenttype")
@@ -125,6 +125,9 @@ class AttrDef:
 
         if not Rune.isXmlQName(attrName): raise ICharE(
              f"Bad name '{attrName}' for attribute.")
+        if isinstance(attrType, (list, tuple)):  # Enumerated, as model tokens
+            self.enumValues = { t: True for t in attrType if t not in "(|)" }
+            self.attrType = attrType = "NMTOKEN"
         if attrType not in XSDDatatypes and not isinstance(attrType, type): raise TypeError(
             f"Unrecognized type '{attrType}' for attribute '{attrName}' for '{self.elemName}'.")
         if attrDft is not None:
@@ -142,6 +145,18 @@ class AttrDef:
         return AttrKey(self.elemNS, self.elemName, self.attrNS, self.attrName)
 
 
+def attrDefFromExpat(elemName:NMTOKEN_t, attrName:NMTOKEN_t, attrType:str,
+    default:str=None, required:bool=False) -> AttrDef:
+    """Make an AttrDef from expat's AttlistDeclHandler arguments (one
+    attribute per call, with enumerations as "(a|b)").
+    """
+    if attrType.startswith("("): attrType = attrType.strip("()").split("|")
+    if required: attrDft = DftType.FIXED if default is not None else DftType.REQUIRED
+    else: attrDft = DftType.IMPLIED if default is None else None
+    return AttrDef(elemNS=None, elemName=elemName, attrNS=None,
+        attrName=attrName, attrType=attrType, attrDft=attrDft, literal=default)
+
+
 ###########################################################################
 class AttlistDef(dict):
     """Represent an entire ATTLIST declaration.
@@ -216,6 +231,17 @@ class SimpleType(dict):
         self.restrictions = {}
         self.memberTypes = None  # For list and union types
         self.caseTx = CaseHandler.NONE
+        self.xsdType = None
+
+    def getXsdType(self, types:Dict[str, XsdType]=None) -> XsdType:
+        """Build (once) the XsdType for this restriction of baseType, so
+        values can be checked by its compiled checker. 'types' must be
+        able to find baseType (default: the built-in XSDDatatypes).
+        """
+        if self.xsdType is None:
+            self.xsdType = deriveXsdType(self.baseType, self.restrictions,
+                types=types, name=self.name)
+        return self.xsdType
 
 
 ###############################################################################
@@ -432,16 +458,328 @@ class Model(ModelGroup):
         else:
             return super().tostring(indent=indent)
 
+###############################################################################
+# Compiling content models to automata
+#
+# Model expressions are hashable tuples, kept in a canonical form by the
+# mk* functions below, so that equal languages usually get equal tuples:
+#     ("0",)                   matches nothing
+#     ("e",)                   matches only the empty sequence
+#     ("n", name)              one element of the given type
+#     ("s", (x, y, ...))       sequence
+#     ("a", frozenset(...))    choice
+#     ("&", frozenset(...))    SGML "&" (any order), as (item, count) pairs
+#     ("r", x, min, max)       repetition (max UNLIMITED for no limit)
+#
+X_NONE = ("0",)
+X_EPS = ("e",)
+
+def mkSeq(items:List) -> tuple:
+    flat = []
+    for x in items:
+        if x == X_NONE: return X_NONE
+        if x == X_EPS: continue
+        if x[0] == "s": flat.extend(x[1])
+        else: flat.append(x)
+    if not flat: return X_EPS
+    if len(flat) == 1: return flat[0]
+    return ("s", tuple(flat))
+
+def mkAlt(items:List) -> tuple:
+    flat = set()
+    for x in items:
+        if x == X_NONE: continue
+        if x[0] == "a": flat.update(x[1])
+        else: flat.add(x)
+    if not flat: return X_NONE
+    if len(flat) == 1: return flat.pop()
+    return ("a", frozenset(flat))
+
+def mkAll(items:List) -> tuple:
+    counts = defaultdict(int)
+    for x in items:
+        if x == X_NONE: return X_NONE
+        if x == X_EPS: continue
+        if x[0] == "&":
+            for sub, n in x[1]: counts[sub] += n
+        else: counts[x] += 1
+    if not counts: return X_EPS
+    if len(counts) == 1:
+        x, n = next(iter(counts.items()))
+        if n == 1: return x
+    return ("&", frozenset(counts.items()))
+
+def mkRep(x:tuple, minOccurs:int, maxOccurs:int) -> tuple:
+    if maxOccurs == 0 or x == X_EPS: return X_EPS
+    if x == X_NONE: return X_EPS if minOccurs == 0 else X_NONE
+    if minOccurs == 1 and maxOccurs == 1: return x
+    if x[0] == "r" and x[2] in (0, 1) and x[3] == UNLIMITED and maxOccurs == UNLIMITED:
+        return ("r", x[1], minOccurs if x[2] else 0, UNLIMITED)  # (x*)+ etc.
+    return ("r", x, minOccurs, maxOccurs)
+
+def repBounds(rep:RepType) -> (int, int):
+    """Get (minOccurs, maxOccurs) for a RepType.
+    """
+    if rep is None or rep == RepType.NOREP: return (1, 1)
+    if rep == RepType.STAR: return (0, UNLIMITED)
+    if rep == RepType.PLUS: return (1, UNLIMITED)
+    if rep == RepType.QUEST: return (0, 1)
+    return (rep.minOccurs, rep.maxOccurs)
+
+
+class ContentAutomaton:
+    """A deterministic automaton for one content model, so checking element
+    content costs one dict lookup per child. States are ints, 0 is the start,
+    and stepping on a name the model doesn't allow there gives None.
+
+    The states are built once, by taking Brzozowski derivatives of the model
+    with respect to each element type it names (one state per distinct
+    derivative), so sequences, choices, repetition bounds, and "&" groups all
+    come out as plain transitions, even for models that are not
+    deterministic in the XML sense.
+    #PCDATA only sets allowText (text never changes the state).
+    """
+    maxStates = 10000
+
+    modelToken_re = re.compile(
+        r"\s*(#PCDATA|\{\s*\d*\s*[,:]\s*-?\d*\s*\}|[()|,&*+?]|[^\s()|,&*+?{}]+)")
+
+    def __init__(self, model:Union[Model, ContentType, str]=None):
+        self.allowText = False
+        self.anyContent = False
+        self.transitions:List[Dict[str, int]] = []
+        self.final:List[bool] = []
+        self.names:Set = set()
+
+        if isinstance(model, Model) and model.contentType != ContentType.X_MODEL:
+            model = model.contentType
+        elif isinstance(model, str) and not model.lstrip().startswith("("):
+            model = ContentType(model.strip().lstrip("#"))
+        if model is None or model == ContentType.ANY:
+            self.allowText = self.anyContent = True
+            self.transitions.append({})
+            self.final.append(True)
+            return
+        if model == ContentType.EMPTY:
+            expr = X_EPS
+        elif model == ContentType.PCDATA:
+            self.allowText = True
+            expr = X_EPS
+        elif isinstance(model, str):
+            expr = self.fromTokens(self.modelToken_re.findall(model))
+        elif isinstance(model, (ModelGroup, ModelItem)):
+            expr = self.fromGroup(model)
+        else:
+            raise TypeError(f"Can't compile model of type '{type(model)}'.")
+        self.compile(expr)
+
+    def fromTokens(self, tokens:List[str]) -> tuple:
+        """Make an expression from model tokens as read from a DTD,
+        such as [ "(", "a", ",", "b", "*", ")" ].
+        """
+        pos = 0
+
+        def getRep(x:tuple) -> tuple:
+            nonlocal pos
+            if pos >= len(tokens): return x
+            t = tokens[pos]
+            if t == "*": bounds = (0, UNLIMITED)
+            elif t == "+": bounds = (1, UNLIMITED)
+            elif t == "?": bounds = (0, 1)
+            elif t.startswith("{"):
+                lims = re.split(r"[,:]", t.strip("{} "))
+                bounds = (int(lims[0] or 0), int(lims[1]) if lims[1].strip() else UNLIMITED)
+            else: return x
+            pos += 1
+            return mkRep(x, *bounds)
+
+        def getGroup() -> tuple:
+            nonlocal pos
+            pos += 1  # "("
+            items = []
+            connector = None
+            while pos < len(tokens):
+                t = tokens[pos]
+                if t == ")":
+                    pos += 1
+                    if connector == "|": x = mkAlt(items)
+                    elif connector == "&": x = mkAll(items)
+                    else: x = mkSeq(items)
+                    return getRep(x)
+                if t in "|,&":
+                    if connector and t != connector: raise SyntaxError(
+                        f"Inconsistent connector '{t}' vs. '{connector}' in model.")
+                    connector = t
+                    pos += 1
+                elif t == "(":
+                    items.append(getGroup())
+                elif t == ContentType.PCDATA.value:
+                    self.allowText = True
+                    pos += 1
+                    items.append(getRep(X_EPS))
+                else:
+                    pos += 1
+                    items.append(getRep(("n", t)))
+            raise SyntaxError(f"Unclosed () group in model: {tokens}.")
+
+        if not tokens or tokens[0] != "(":
+            raise SyntaxError(f"Model does not start with '(': {tokens}.")
+        expr = getGroup()
+        if pos != len(tokens): raise SyntaxError(
+            f"Extra tokens after model: {tokens[pos:]}.")
+        return expr
+
+    def fromGroup(self, mg:Union[ModelGroup, ModelItem]) -> tuple:
+        """Make an expression from a Model/ModelGroup/ModelItem AST.
+        """
+        if isinstance(mg, ModelItem):
+            if mg.name == ContentType.PCDATA.value:
+                self.allowText = True
+                x = X_EPS
+            else:
+                x = ("n", mg.name)
+        else:
+            items = [ self.fromGroup(ch) for ch in mg.childItems ]
+            if mg.seq == SeqType.CHOICE: x = mkAlt(items)
+            elif mg.seq == SeqType.ALL: x = mkAll(items)
+            else: x = mkSeq(items)
+        return mkRep(x, *repBounds(mg.rep))
+
+    def compile(self, expr:tuple) -> None:
+        """Build all the states reachable from 'expr'.
+        """
+        nullCache = {}
+        derivCache = {}
+
+        def nullable(x:tuple) -> bool:
+            if x in nullCache: return nullCache[x]
+            k = x[0]
+            if k == "e": rc = True
+            elif k in "0n": rc = False
+            elif k == "s": rc = all(nullable(sub) for sub in x[1])
+            elif k == "a": rc = any(nullable(sub) for sub in x[1])
+            elif k == "&": rc = all(nullable(sub) for sub, _n in x[1])
+            else: rc = x[2] == 0 or nullable(x[1])
+            nullCache[x] = rc
+            return rc
+
+        def deriv(x:tuple, name:str) -> tuple:
+            key = (x, name)
+            if key in derivCache: return derivCache[key]
+            k = x[0]
+            if k in "0e": rc = X_NONE
+            elif k == "n": rc = X_EPS if x[1] == name else X_NONE
+            elif k == "s":
+                head, tail = x[1][0], x[1][1:]
+                rc = mkSeq([ deriv(head, name), *tail ])
+                if nullable(head): rc = mkAlt([ rc, deriv(mkSeq(tail), name) ])
+            elif k == "a":
+                rc = mkAlt([ deriv(sub, name) for sub in x[1] ])
+            elif k == "&":
+                alts = []
+                for sub, n in x[1]:
+                    rest = [ s2 for s2, n2 in x[1] for _i in range(n2 if s2 != sub else n-1) ]
+                    alts.append(mkAll([ deriv(sub, name), *rest ]))
+                rc = mkAlt(alts)
+            else:
+                _k, sub, minO, maxO = x
+                rc = mkSeq([ deriv(sub, name), mkRep(sub, max(minO-1, 0),
+                    UNLIMITED if maxO == UNLIMITED else maxO-1) ])
+            derivCache[key] = rc
+            return rc
+
+        def collectNames(x:tuple) -> None:
+            k = x[0]
+            if k == "n": self.names.add(x[1])
+            elif k in "sa": [ collectNames(sub) for sub in x[1] ]
+            elif k == "&": [ collectNames(sub) for sub, _n in x[1] ]
+            elif k == "r": collectNames(x[1])
+
+        collectNames(expr)
+        stateNums = { expr: 0 }
+        todo = [ expr ]
+        self.transitions.append({})
+        self.final.append(nullable(expr))
+        while todo:
+            x = todo.pop()
+            trans = self.transitions[stateNums[x]]
+            for name in self.names:
+                nxt = deriv(x, name)
+                if nxt == X_NONE: continue
+                if nxt not in stateNums:
+                    if len(stateNums) >= self.maxStates: raise NSuppE(
+                        f"Content model needs over {self.maxStates} states.")
+                    stateNums[nxt] = len(self.transitions)
+                    self.transitions.append({})
+                    self.final.append(nullable(nxt))
+                    todo.append(nxt)
+                trans[name] = stateNums[nxt]
+
+    def step(self, state:int, name:NMTOKEN_t) -> int:
+        """Return the state after a child of type 'name', or None if the
+        model doesn't allow one there.
+        """
+        if self.anyContent: return state
+        return self.transitions[state].get(name)
+
+    def isFinal(self, state:int) -> bool:
+        """Can the element end in this state?
+        """
+        return self.final[state]
+
+    def expected(self, state:int) -> List[str]:
+        """What could come next (for error messages).
+        """
+        exp = sorted(self.transitions[state])
+        if self.final[state]: exp.append("(end)")
+        return exp
+
+    def accepts(self, names:List[NMTOKEN_t]) -> bool:
+        """Check a whole sequence of child element type names.
+        """
+        state = 0
+        for name in names:
+            state = self.step(state, name)
+            if state is None: return False
+        return self.final[state]
+
+# expat's content model tuples: (type, quant, name, children)
+# (see xml.parsers.expat.model)
+expatQuants = [ "", "?", "*", "+" ]
+expatConnectors = { 5: "|", 6: "," }
+
+def expatModelToString(model:tuple) -> str:
+    """Turn an expat ElementDeclHandler model tuple into DTD model syntax
+    (which ContentAutomaton takes).
+    """
+    mtype, quant, name, children = model
+    if mtype == 1: return "EMPTY"
+    if mtype == 2: return "ANY"
+    if mtype == 3:  # Mixed
+        return "(%s)%s" % (" | ".join([ "#PCDATA" ]
+            + [ ch[2] for ch in children ]), expatQuants[quant])
+    if mtype == 4: return name + expatQuants[quant]
+    return "(%s)%s" % (f" {expatConnectors[mtype]} ".join(
+        expatModelToString(ch) for ch in children), expatQuants[quant])
+
 class ElementDef(ComplexType):
     def __init__(self, name:NMTOKEN_t, model:Model,
         ownerSchema:'DocumentType'=None, readOrder:int=0):
-        super().__init__(name, model)
+        super().__init__(name, model=model)
         self.ownerSchema:'DocumentType' = ownerSchema
         self.readOrder:int = readOrder
         self.attrDefs:Dict = None
         self.allowText:bool = True
         self.inclusions = None
         self.exclusions = None
+        self.automaton:ContentAutomaton = None
+
+    def getAutomaton(self) -> ContentAutomaton:
+        """Compile the content model the first time it's needed.
+        """
+        if self.automaton is None:
+            self.automaton = ContentAutomaton(self.model)
+        return self.automaton
 
     def attachAttr(self, attrDef:AttrDef) -> None:
         if attrDef.attrName not in self.attrDefs:
@@ -459,8 +797,6 @@ class ElementDef(ComplexType):
         # TODO Issue attlist alongside element dcl?
         return buf
 
-    # Integrate the validator
-
 
 ###############################################################################
 #
@@ -7,9 +7,14 @@
 #
 #import codecs
 import sys
+import os
 import re
+import codecs
+import mmap
+import threading
 import logging
-from typing import Union, List, Dict, Iterable, IO, Callable
+from typing import Union, List, Dict, Iterable, IO, Callable, Tuple
+from collections import OrderedDict
 from types import SimpleNamespace
 import inspect
 
@@ -142,6 +147,60 @@ def uname2codepoint(name:str) -> int:
             % (", ".join(unicodedata.name(chr(cp)) for cp in matches)))
 
 
+###############################################################################
+#
+class EntityTextCache:
+    """Keep the (decoded) text of external entity files, so the same
+    boilerplate chapter, shared fragment, or parameter entity doesn't get
+    re-read for every reference and every document. Entries are keyed by
+    real path, mtime, size, and encoding (so an edited file is just a miss),
+    and the least-recently used are dropped once more than maxChars are held.
+    One instance (entityTextCache) is shared by the whole process.
+    """
+    def __init__(self, maxChars:int=1<<24):
+        self.maxChars = maxChars
+        self.texts:OrderedDict = OrderedDict()
+        self.nChars = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()  # iterparse() et al. parse on threads
+
+    @staticmethod
+    def makeKey(path:str, encoding:str) -> Tuple:
+        st = os.stat(path)
+        return (os.path.realpath(path), st.st_mtime_ns, st.st_size, encoding)
+
+    def getText(self, path:str, encoding:str="utf-8") -> str:
+        """Return the whole text of the file, from the cache if possible.
+        """
+        key = EntityTextCache.makeKey(path, encoding)
+        with self.lock:
+            text = self.texts.get(key)
+            if text is not None:
+                self.texts.move_to_end(key)
+                self.hits += 1
+                return text
+        with open(path, "r", encoding=encoding, newline="") as ifh:
+            text = ifh.read()
+        with self.lock:
+            self.misses += 1
+            if len(text) > self.maxChars: return text  # Too big to keep
+            if key not in self.texts:
+                self.texts[key] = text
+                self.nChars += len(text)
+            while self.nChars > self.maxChars:
+                _oldKey, oldText = self.texts.popitem(last=False)
+                self.nChars -= len(oldText)
+        return text
+
+    def clear(self) -> None:
+        with self.lock:
+            self.texts.clear()
+            self.nChars = self.hits = self.misses = 0
+
+entityTextCache = EntityTextCache()
+
+
 ###############################################################################
 #
 class InputFrame:
@@ -171,9 +230,12 @@ class InputFrame:
         self.entDef = None          # If source is an entity, the definition
         self.path:str = None        # If a file, the path
         self.ifh:IO = None          # Open file handle if any
+        self.decoder = codecs.getincrementaldecoder(encoding)()
 
         self.noMoreToRead = False
         self._oldWay = True         # Config case-handling method
+        self.nRefills = 0           # Times more source was loaded (stats)
+        self.nRead = 0              # Bytes (or chars) loaded from source
 
     def frameLoc(self) -> str:
         """Return a description of the location in this frame.
@@ -195,15 +257,35 @@ class InputFrame:
         else:
             return "string"
 
-    def addEntity(self, entDef:EntityDef) -> None:
+    def addEntity(self, entDef:EntityDef, baseDirs:List[str]=None) -> None:
+        """Attach an entity's text. An external one's system ID is tried as
+        given, then in 'baseDirs' (such as the referencing document's), then
+        in options.entityDirs.
+        """
         self.entDef = entDef
-        if entDef.literal is not None:
-            if self.buf: self.buf += entDef.literal
-            else: self.buf = entDef.literal
+        literal = entDef.source.literal
+        if literal is not None:
+            if self.buf: self.buf += literal
+            else: self.buf = literal
             return
         # Find the system object and attach
-        path = self.entDef.source.findLocalPath(entDef=entDef)
-        self.addFile(path)
+        if not entDef.localPath:
+            dirs = (baseDirs or []) + (getattr(self.options, "entityDirs", None) or [])
+            entDef.localPath = entDef.source.findLocalPath(entDef=entDef,
+                dirs=dirs, trace=0)
+        if getattr(self.options, "entityCache", True):
+            # Same checks as topOff(); they depend on this parser's options,
+            # so they aren't something the shared cache could do once.
+            if (self.encoding != "utf-8"):
+                raise NSuppE(f"Unsupported encoding '{self.encoding}' (for now).")
+            self.path = entDef.localPath
+            newChars = entityTextCache.getText(self.path, entDef.encoding)
+            self.checkChars(newChars)
+            self.nRead += len(newChars)
+            self.buf += newChars
+            self.noMoreToRead = True
+        else:
+            self.addFile(entDef.localPath)
 
     def addFile(self, theFile:Union[str, IO]) -> None:
         if isinstance(theFile, str):
@@ -247,7 +329,7 @@ class InputFrame:
     def fullLineNum(self) -> int:
         """The global line number to the read point.
         """
-        return self.lineNum + self.buf[0:self.bufPos].count(self.newlineDef)
+        return self.lineNum + self.buf[0:self.bufPos].count("\n")
 
     def __bool__(self) -> bool:
         return self.bufLeft > 0
@@ -301,21 +383,29 @@ class InputFrame:
         newChars = self.ifh.read(self.bufSize)
         if not newChars:  # EOF reached
             self.noMoreToRead = True
+            self.decoder.decode(b"", final=True)  # Raise if partial char left
             if not self.buf:  # No more data at all
                 self.ifh.close()
             return self.bufLeft
-        if isinstance(newChars, bytes):
-            newChars = newChars.decode(self.encoding)
+        self.nRefills += 1
+        self.nRead += len(newChars)
+        if isinstance(newChars, bytes):  # Chunk may end mid-character
+            newChars = self.decoder.decode(newChars)
         if (self.encoding != "utf-8"):
             raise NSuppE(f"Unsupported encoding '{self.encoding}' (for now).")
+        self.checkChars(newChars)
+        self.buf += newChars
+        return self.bufLeft
+
+    def checkChars(self, newChars:str) -> None:
+        """Apply any charset restrictions to newly-loaded data.
+        """
         if self.options.noC0 and re.search(Rune.c0NonXml_re, newChars):
             raise ICharE("C0 control characters are disabled.")
         if self.options.noC1 and re.search(Rune.c1_re, newChars):
             raise ICharE("C1 control characters are disabled. Is this CP1252?")
         if self.options.noPrivateUse and re.search(Rune.privateUse_re, newChars):
             raise ICharE("Private use characters are disabled.")
-        self.buf += newChars
-        return self.bufLeft
 
     def dropUsedPart(self, allow:int=100) -> None:
         """Discard some buffer, AND move the offset of the start.
@@ -348,11 +438,12 @@ class InputFrame:
                 if self.buf[self.bufPos] == self.newlineDef: self.lineNum += 1
                 self.bufPos += 1
             elif entOpener and c in "%&":
+                pos = self.bufPos
                 entOpener()            # TODO How to switch between & and %?
+                if self.bufPos == pos: return  # Not a reference ("&" in a model)
             elif allowComments and self.peek(2) == "--":  # TODO emComments
-                mat = self.readRegex(StackReader.commExpr, self.buf[self.bufPos:])
+                mat = self.readRegex(StackReader.commExpr, ss=False)
                 if not mat: return None
-                self.bufPos += len(mat.group())
                 self.lineNum += mat.group().count(self.newlineDef)
                 _comText = mat.group(1)
             else:
@@ -414,10 +505,15 @@ class InputFrame:
             self.topOff()
             if self.bufLeft < len(const): return None
 
+        if not folder:  # Compare in place, no slice
+            if not self.buf.startswith(const, self.bufPos): return None
+            if thenSp and not self.buf[self.bufPos+len(const)].isspace():
+                return None
+            self.bufPos += len(const)
+            return const
         if self._oldWay:
-            if folder: const = folder.normalize(const)
-            rc = self.peek(len(const))  # TODO could be faster
-            if folder: rc = folder.normalize(rc)
+            const = folder.normalize(const)
+            rc = folder.normalize(self.peek(len(const)))
             if rc != const: return None
             if thenSp and not self.buf[self.bufPos+len(const)].isspace():
                 return None
@@ -447,16 +543,17 @@ class InputFrame:
                 self.topOff()
                 if not self.bufLeft: return None  # TODO Raise SE on readToString fail?
             where = self.buf.find(ender, self.bufPos)
-            if where < 0:  # Keep going
-                rbuf.extend(self.buf[self.bufPos:])
-                self.discard(self.bufLeft)
-                self.dropUsedPart()
-                self.topOff()
+            if where < 0:  # Keep going, but hold back a possible partial ender
+                keepFrom = max(self.bufPos, len(self.buf) - len(ender) + 1)
+                rbuf.append(self.buf[self.bufPos:keepFrom])
+                self.bufPos = keepFrom
+                had = self.bufLeft
+                if self.topOff(had) <= had:  # EOF
+                    self.bufPos = len(self.buf)
+                    return None
             else:
                 rbuf.extend(self.buf[self.bufPos:where])
-                moveTo = where + (len(ender) if consumeEnder else 0)
-                self.buf = self.buf[moveTo:]
-                self.bufPos = 0
+                self.bufPos = where + (len(ender) if consumeEnder else 0)
                 break
         return ''.join(rbuf) or None
 
@@ -598,6 +695,33 @@ class InputFrame:
 
     firstDelims = "<&%]\\"
     allDelims = "<>[]\\/!?#|-+\u2014"  # & and % not ok in non-first pos.
+    delimPlus_re = re.compile("[%s][%s]*" % (re.escape(firstDelims), re.escape(allDelims)))
+
+    # Runs of plain text, up to the next firstDelim (or also \n, for callers
+    # that want to break there like expat does).
+    textRun_re = re.compile("[^%s]+" % (re.escape(firstDelims)))
+    textRunNL_re = re.compile("[^%s\n]+" % (re.escape(firstDelims)))
+
+    def readTextRun(self, stopper:re.Pattern=None) -> str:
+        """Consume and return the longest run of characters not matching
+        any of the firstDelims (or whatever 'stopper' excludes), topping off
+        as needed. This replaces char-by-char peek()/consume() for content.
+        Returns "" (not None) if we're already at a delimiter or EOF.
+        """
+        if stopper is None: stopper = InputFrame.textRun_re
+        run = ""
+        while True:
+            if self.bufLeft < 1:
+                self.topOff()
+                if self.bufLeft < 1: break
+            mat = stopper.match(self.buf, self.bufPos)
+            if not mat: break
+            end = mat.end()
+            if run: run += self.buf[self.bufPos:end]
+            else: run = self.buf[self.bufPos:end]
+            self.bufPos = end
+            if end < len(self.buf): break  # Hit a delimiter
+        return run
 
     def peekDelimPlus(self, ss:bool=True) -> (str, str):  # TODO To parser
         """Return initial punctuation marks, and following character.
@@ -609,18 +733,10 @@ class InputFrame:
         self.topOff(100)
         if self.bufLeft < 1: return None, None
 
-        i = self.bufPos
-
-        c = self.buf[i]
-        if c not in self.firstDelims: return None, None
-
-        delimString = ""
-        while (True):
-            delimString += c
-            i += 1
-            c = self.buf[i]
-            if c not in self.allDelims: break
-        return delimString, c
+        mat = InputFrame.delimPlus_re.match(self.buf, self.bufPos)
+        if not mat: return None, None
+        end = mat.end()
+        return mat.group(), (self.buf[end] if end < len(self.buf) else None)
 
     def readName(self, ss:bool=True) -> str:
         """
@@ -632,8 +748,10 @@ class InputFrame:
         #lg.info("*** %s, buf '%s'.", callerNames(), self.bufSample)
         #lg.warning(f"readName: buf has '{self.buf[self.bufPos:]}'.\n")
         # Not re.fullmatch here!
-        mat = self.readRegex(Rune.QName_re, ss=ss)
+        self.topOff()
+        mat = InputFrame.QName_cre.match(self.buf, self.bufPos)
         if not mat: return None
+        self.bufPos = mat.end()
         return mat.group()
 
     def readEnumName(self, names:Iterable, ss:bool=True) -> str:
@@ -646,22 +764,205 @@ class InputFrame:
             if self.readConst(name): return name
         return None
 
+    QName_cre = re.compile(Rune.QName_re, flags=re.I)
+    _regexCache:Dict = {}
+
+    @staticmethod
+    def compileRegex(regex:Union[str, re.Pattern], fold:bool=True) -> re.Pattern:
+        """Get a compiled version of the regex, cached by (regex, fold).
+        Since we match at bufPos (not at the start of a string), a leading
+        "^" would never match, so it is dropped.
+        """
+        if isinstance(regex, re.Pattern): return regex
+        key = (regex, fold)
+        if key not in InputFrame._regexCache:
+            InputFrame._regexCache[key] = re.compile(
+                regex[1:] if regex.startswith("^") else regex,
+                flags=re.I if fold else 0)
+        return InputFrame._regexCache[key]
+
     def readRegex(self, regex:Union[str, re.Pattern], ss:bool=True,
         fold:bool=True) -> re.Match:
         """Check if the regex matches immediately and return the match object
         (so captures can be distinguished) and consume the matched text.
         If no match, return None and consume nothing.
+        Matching is done in place at bufPos, so doesn't copy the buffer.
+        A pre-compiled regex is used as-is ('fold' doesn't apply).
         TODO Won't match across buffer topOffs or entities.
         Used for QName, SGML embedded comments, declared content, repetition flags.
         """
         if ss: self.skipSpaces()
         self.topOff()
-        mat = re.match(regex, self.buf[self.bufPos:], flags=re.I if fold else 0)
+        mat = InputFrame.compileRegex(regex, fold).match(self.buf, self.bufPos)
         if not mat: return None
-        self.bufPos += len(mat.group())
+        self.bufPos = mat.end()
         return(mat)
 
 
+###############################################################################
+#
+class MMapInputFrame(InputFrame):
+    """An InputFrame for (large) local files, which maps the file into memory
+    instead of read()ing it in small chunks. Decoding is still lazy, but
+    done a window (of 'bufSize' bytes, default 4MB) at a time, so there are
+    few refills and few copies of the remaining buffer.
+    Offsets and line numbers are kept (in characters) as for InputFrame.
+
+    Use canMap() to check whether a given path or file handle can be mapped
+    (for example, pipes and in-memory files cannot).
+    """
+    def __init__(self, encoding:str="utf-8", bufSize:int=1<<22,
+        options:SimpleNamespace=None):
+        super().__init__(encoding=encoding, bufSize=bufSize, options=options)
+        self.mm:mmap.mmap = None    # The mapped file
+        self.bytePos:int = 0        # Next byte of mm to decode
+
+    @staticmethod
+    def canMap(theFile:Union[str, IO]) -> bool:
+        if isinstance(theFile, str): return os.path.isfile(theFile)
+        try:
+            theFile.fileno()
+        except (AttributeError, OSError, ValueError):
+            return False
+        return True
+
+    def addFile(self, theFile:Union[str, IO]) -> None:
+        if isinstance(theFile, str):
+            self.path = theFile
+            self.ifh = open(theFile, "rb")
+        else:
+            self.ifh = theFile
+            self.path = getattr(theFile, "name", None)
+        if os.fstat(self.ifh.fileno()).st_size == 0:  # Can't map empty files
+            self.noMoreToRead = True
+            return
+        self.mm = mmap.mmap(self.ifh.fileno(), 0, access=mmap.ACCESS_READ)
+        self.topOff(n=self.bufSize)
+
+    def close(self) -> None:
+        if self.mm is not None:
+            self.mm.close(); self.mm = None
+        super().close()
+
+    def topOff(self, n:int=0) -> int:
+        """Like InputFrame.topOff(), but decode the next window of the map.
+        The incremental decoder holds back any partial multi-byte sequence
+        at the end of a window, until the next one.
+        """
+        if self.mm is None: return self.bufLeft
+        if not n: n = self.bufSize / 4
+        if self.bufLeft > n or self.noMoreToRead:
+            return self.bufLeft
+
+        self.dropUsedPart()
+        end = min(self.bytePos + self.bufSize, len(self.mm))
+        self.nRefills += 1
+        self.nRead += end - self.bytePos
+        newChars = self.decoder.decode(self.mm[self.bytePos:end], final=(end == len(self.mm)))
+        self.bytePos = end
+        if end == len(self.mm): self.noMoreToRead = True
+        self.checkChars(newChars)
+        self.buf += newChars
+        return self.bufLeft
+
+
+###############################################################################
+#
+class FeedAborted(Exception):
+    """Raised on the parser thread when an incremental parse is abandoned
+    (see FeedInputFrame.abort()).
+    """
+
+class FeedInputFrame(InputFrame):
+    """An InputFrame whose data is pushed in, a chunk at a time (say, as it
+    arrives from a socket or decompressor), rather than pulled from a file.
+
+    The parser reads from this on its own thread. When topOff() needs more
+    than has been fed, it hands control back to the feeding thread and
+    waits. feed() does the reverse: it queues a chunk, then waits until the
+    parser has used up what it can (or has finished). So only one side runs
+    at a time, and handlers run while the feeder is blocked in feed().
+
+    Like any frame, topOff() tries to keep at least bufSize/4 characters
+    ahead of the read point, so tokens split across chunks (partial tags,
+    entity references, multi-byte sequences) are reassembled before the
+    parser looks at them.
+
+    If the feeder gives up, abort() wakes the parser thread, which then
+    raises FeedAborted out of whatever it was reading.
+    """
+    def __init__(self, encoding:str="utf-8", bufSize:int=1024,
+        options:SimpleNamespace=None):
+        super().__init__(encoding=encoding, bufSize=bufSize, options=options)
+        self.pending:List[Union[str, bytes]] = []  # Fed but not yet loaded
+        self.isFinal = False            # Has the last chunk been fed?
+        self.isDone = False             # Has the parser finished?
+        self.isAborted = False          # Has the feeder given up?
+        self._toParser = threading.Semaphore(0)
+        self._toFeeder = threading.Semaphore(0)
+
+    def __bool__(self) -> bool:
+        """An empty buffer doesn't mean we're done, if more may be fed.
+        """
+        return self.bufLeft > 0 or not self.noMoreToRead
+
+    def feed(self, data:Union[str, bytes], isFinal:bool=False) -> None:
+        """Called from the feeding thread. Returns once the parser is waiting
+        for more data, or is done.
+        """
+        if self.isDone or self.isFinal:
+            raise SyntaxError("Data fed after the final chunk.")
+        if data: self.pending.append(data)
+        self.isFinal = isFinal
+        self._toParser.release()
+        self._toFeeder.acquire()
+
+    def abort(self) -> None:
+        """Called from the feeding thread (instead of feed()), to make the
+        waiting parser thread give up. The caller should then join it.
+        """
+        if self.isDone: return
+        self.isAborted = True
+        self._toParser.release()
+
+    def waitForFeed(self) -> None:
+        """Called from the parser thread, to wait for the first chunk.
+        """
+        self._toParser.acquire()
+        if self.isAborted: raise FeedAborted()
+
+    def parserDone(self) -> None:
+        """Called from the parser thread when it finishes (or fails).
+        """
+        self.isDone = True
+        self._toFeeder.release()
+
+    def topOff(self, n:int=0) -> int:
+        if not n: n = self.bufSize / 4
+        if self.bufLeft > n or self.noMoreToRead:
+            return self.bufLeft
+
+        self.dropUsedPart()
+        while self.bufLeft <= n:
+            if not self.pending:
+                if self.isFinal:
+                    self.noMoreToRead = True
+                    self.decoder.decode(b"", final=True)  # Raise if partial char left
+                    break
+                self._toFeeder.release()  # Let the feeder get us more
+                self._toParser.acquire()
+                if self.isAborted: raise FeedAborted()
+                continue
+            newChars = self.pending.pop(0)
+            self.nRefills += 1
+            self.nRead += len(newChars)
+            if isinstance(newChars, bytes):
+                newChars = self.decoder.decode(newChars)
+            self.checkChars(newChars)
+            self.buf += newChars
+        return self.bufLeft
+
+
 ###############################################################################
 #
 class StackReader:
@@ -672,7 +973,7 @@ class StackReader:
     TODO Maybe make this a subclass of InputFrame, which just is the innermost
     one, with links to the others. Except when it pops, the ref has to change
     """
-    commExpr = r"^--([^-]|-[^-])+--"
+    commExpr = re.compile(r"--([^-]|-[^-])+--")
 
     def __init__(self, encoding:str="utf-8",
         handlers:Dict=None, entDirs:List=None, bufSize:int=1024,
@@ -694,22 +995,21 @@ class StackReader:
             "apos": "'",
         }
 
-        self.spaces = {
-            EntitySpace.GENERAL: {},
-            EntitySpace.PARAMETER: {},
-            EntitySpace.NOTATION: {},
-        }
 
         # IO state
         self.rootFrame = None
         self.totLines = 0  # overall lines processed
-        self.totChars = 0  # overall chars processed
+        self.totChars = 0  # overall chars processed (in closed frames)
         self.totEvents = 0
+        self.totRefills = 0  # Source loads by closed frames
+        self.totRead = 0   # Bytes (or chars) loaded by closed frames
+        self.maxDepth = 0  # Deepest the frame stack has been
 
         self.frames:List[InputFrame] = []
 
     def open(self, frame:InputFrame) -> InputFrame:
         self.frames.append(frame)
+        if len(self.frames) > self.maxDepth: self.maxDepth = len(self.frames)
 
     def isEntityOpen(self, space:EntitySpace, name:NMTOKEN_t) -> bool:
         entDef = self.spaces[space][name]
@@ -722,8 +1022,11 @@ class StackReader:
         """Close the innermost open InputFrame.
         """
         frame = self.curFrame
-        if not frame: return False
+        if frame is None: return False
         lg.info("Closing frame '%s'.", frame.description)
+        self.totChars += frame.offset + frame.bufPos
+        self.totRefills += frame.nRefills
+        self.totRead += frame.nRead
         frame.close()
         self.frames.pop()
         return self.depth
@@ -732,6 +1035,16 @@ class StackReader:
         while (self.frames):
             self.close()
 
+    @property
+    def spaces(self) -> Dict[EntitySpace, Dict]:
+        """The entities (and notations) declared so far, by EntitySpace.
+        """
+        return {
+            EntitySpace.GENERAL: self.doctype.entityDefs,
+            EntitySpace.PARAMETER: self.doctype.pentityDefs,
+            EntitySpace.NOTATION: self.doctype.notationDefs,
+        }
+
     @property
     def curFrame(self) -> InputFrame:
         # TODO Maybe add a null string outer frame if nobody home?
@@ -754,19 +1067,19 @@ class StackReader:
     ###
     @property
     def buf(self) -> str:
-        if not self.curFrame: return None
+        if self.curFrame is None: return None
         return self.curFrame.buf
     @property
     def bufPos(self) -> int:
-        if not self.curFrame: return None
+        if self.curFrame is None: return None
         return self.curFrame.bufPos
     @bufPos.setter
     def bufPos(self, n:int) -> None:
-        if not self.curFrame: return None
+        if self.curFrame is None: return None
         self.curFrame.bufPos = n
     @property
     def bufLeft(self) -> int:
-        if not self.curFrame: return None
+        if self.curFrame is None: return None
         return self.curFrame.bufLeft
     @property
     def bufSample(self) -> str:
@@ -779,17 +1092,20 @@ class StackReader:
         return rc
 
     def peek(self, n:int=1) -> str:
-        if not self.curFrame: return None
+        if self.curFrame is None: return None
         return self.curFrame.peek(n)
     def consume(self, n:int=1) -> str:
-        if not self.curFrame: return None
+        if self.curFrame is None: return None
         return self.curFrame.consume(n)
     def discard(self, n:int=1) -> None:
-        if not self.curFrame: return None
+        if self.curFrame is None: return None
         return self.curFrame.discard(n)
     def pushBack(self, s:str) -> None:
-        if not self.curFrame: return None
+        if self.curFrame is None: return None
         return self.curFrame.pushBack(s)
+    def readTextRun(self, stopper:re.Pattern=None) -> str:
+        if self.curFrame is None: return None
+        return self.curFrame.readTextRun(stopper)
 
     def topOff(self, n:int=None) -> int:
         """Close until not at EOF, then top off first remaining frame.
@@ -824,7 +1140,9 @@ class StackReader:
                     #self.doCB(SaxEvent.COMMENT, com)  # SGML only...
                 nFound += len(com)
             elif entOpener and c in "%&":
+                frame, pos = self.curFrame, self.bufPos
                 entOpener()                 # TODO how switch?
+                if self.curFrame is frame and self.bufPos == pos: break
             else:
                 break
             if self.bufLeft < self.bufSize>>2:
@@ -569,6 +569,20 @@ class testElement(unittest.TestCase):
         #DBG.dumpNode(docEl, msg="docEl")
         #DBG.dumpNode(docEl[-1], msg="docEl[-1]")
 
+    def testSlots(self):
+        """Nodes below Document have no __dict__, so only slots can be set.
+        """
+        doc = self.n.doc
+        for node in [ doc.createElement("p"), doc.createTextNode("t"),
+            doc.createComment("c"), doc.createAttribute("a") ]:
+            self.assertFalse(hasattr(node, "__dict__"))
+            with self.assertRaises(AttributeError):
+                node.someExtra = 1
+            self.assertFalse(hasattr(node, "eid"))
+            node.eid = 7  # (for sleipnir)
+            self.assertEqual(node.eid, 7)
+        doc.someExtra = 1
+
     def test_neighbors(self):
         docEl = self.n.docEl
         assert len(docEl) == 10
@@ -626,6 +640,58 @@ class testElement(unittest.TestCase):
 
         # TODO More....
 
+    def test_orderIndex(self):
+        doc = Document(qualifiedName="doc")
+        docEl = doc.documentElement
+        for _i in range(10):
+            p = doc.createElement("p")
+            p.appendChild(doc.createTextNode("x"))
+            p.appendChild(doc.createElement("i"))
+            p.lastChild.appendChild(doc.createTextNode("y"))
+            docEl.appendChild(p)
+        el5 = docEl.childNodes[5]
+        el8 = docEl.childNodes[8]
+        self.assertFalse(doc.hasOrderIndex)
+        doc.setOrderIndex()
+        self.assertTrue(doc.hasOrderIndex)
+        self.assertEqual(el5.compareDocumentPosition(el8), -1)
+        self.assertEqual(el8.compareDocumentPosition(el5), +1)
+        self.assertEqual(el5.compareDocumentPosition(el5), 0)
+        self.assertTrue(docEl << el5 and el8 >> el5 and el5 < el8)
+
+        # Fill one gap until it has to relabel ancestors
+        for i in range(40):
+            el8.insertBefore(doc.createElement(f"x{i}"), el8.childNodes[1])
+            el8.childNodes[1].appendChild(doc.createTextNode("t"))
+        nodes = list(doc.descendants(includeSelf=True))
+        self.assertEqual(len(nodes), 1 + 1 + 10*4 + 40*2)
+        for i in range(1, len(nodes)):
+            self.assertTrue(nodes[i-1]._ordStart < nodes[i]._ordStart)
+            par = nodes[i].parentNode
+            self.assertTrue(par._ordStart < nodes[i]._ordStart
+                <= nodes[i]._ordEnd < par._ordEnd)
+        last = el8.lastChild.lastChild
+        self.assertEqual(last.compareDocumentPosition(docEl.childNodes[9]), -1)
+
+        removed = el8.removeChild(el8.childNodes[3])
+        self.assertIsNone(removed._ordStart)
+        self.assertIsNone(removed.childNodes[0]._ordStart)
+        with self.assertRaises(HReqE):
+            removed.compareDocumentPosition(el8)
+
+        expected = list(doc.descendants())
+        nl = NodeList(reversed(expected))
+        nl.sortDocumentOrder()
+        self.assertEqual(nl, expected)
+
+        doc.setOrderIndex(False)
+        self.assertFalse(doc.hasOrderIndex)
+        self.assertIsNone(el5._ordStart)
+        self.assertEqual(el5.compareDocumentPosition(el8), -1)
+        nl.reverse()
+        nl.sortDocumentOrder()
+        self.assertEqual(nl, expected)
+
     def test_Element_mutators(self):
         docEl = self.n.docEl
         el0 = docEl.childNodes[0]
@@ -1200,6 +1266,71 @@ class testNamedNodeMap(unittest.TestCase):
         nnm.clear()
         self.assertEqual(nnm.tostring(), "")
 
+    def testLazyAttrs(self):
+        """Attributes set by name/value are stored plain until an Attr is asked for.
+        """
+        el = self.n.doc.createElement("p")
+        el.setAttribute("id", "p1")
+        el.setAttribute("class", "big")
+        raw = dict.values(el.attributes)
+        self.assertFalse(any(isinstance(v, Attr) for v in raw))
+
+        self.assertEqual(el.getAttribute("class"), "big")
+        self.assertTrue(el.hasAttribute("id"))
+        self.assertEqual(el.attributes.getNamedValue("id"), "p1")
+        self.assertIn('class="big"', el.startTag)
+        self.assertIsNone(el.getAttribute("absent"))
+        self.assertFalse(el.hasAttribute("absent"))
+        self.assertFalse(any(isinstance(v, Attr) for v in dict.values(el.attributes)))
+
+        anode = el.getAttributeNode("class")
+        self.assertIsInstance(anode, Attr)
+        self.assertIs(anode.ownerElement, el)
+        self.assertIs(el.getAttributeNode("class"), anode)  # Cached
+        self.assertEqual(list(el.attributes.keys()), [ "id", "class" ])
+        self.assertEqual([ a.nodeValue for a in el.attributes.values() ], [ "p1", "big" ])
+
+        el.setAttribute("class", "small")
+        self.assertEqual(el.getAttribute("class"), "small")
+        self.assertEqual(el.attributes.get("class").nodeValue, "small")
+        self.assertIsNone(el.attributes.get("nope"))
+
+    def testMappingMethods(self):
+        """Whatever mapping method gets at the values, they're Attrs.
+        """
+        el = self.n.doc.createElement("p")
+        for name, value in [ ("a", "1"), ("b", "2"), ("c", "3") ]:
+            el.setAttribute(name, value)
+        nnm = el.attributes
+        vals = nnm.values()
+        self.assertTrue(all(isinstance(v, Attr) for v in dict(nnm).values()))
+        self.assertTrue(all(isinstance(v, Attr) for v in { **nnm }.values()))
+        self.assertTrue(all(isinstance(v, Attr) for v in dict.values(nnm.copy())))
+        name, attrNode = nnm.popitem()
+        self.assertEqual((name, attrNode.nodeValue), ("c", "3"))
+        self.assertEqual(nnm.popitem(last=False)[1].nodeValue, "1")
+        self.assertEqual(len(vals), 1)  # (a live view)
+        self.assertIsInstance(nnm.setdefault("b", "x"), Attr)
+        self.assertEqual(nnm.setdefault("d", "4").nodeValue, "4")
+        self.assertEqual([ (k, v.nodeValue) for k, v in nnm.items() ],
+            [ ("b", "2"), ("d", "4") ])
+
+    def testIdsWhenSet(self):
+        """An ID attribute set by name is in the ID index right away.
+        """
+        doc = self.n.doc
+        doc.idHandler.addAttrChoice(attrName="id")
+        el = doc.createElement("p")
+        doc.documentElement.appendChild(el)
+        el.setAttribute("id", "fresh1")
+        self.assertIs(doc.getElementById("fresh1"), el)
+        self.assertFalse(any(isinstance(v, Attr) for v in dict.values(el.attributes)))
+        el.setAttribute("id", "fresh2")
+        self.assertIsNone(doc.getElementById("fresh1"))
+        self.assertIs(doc.getElementById("fresh2"), el)
+        el.removeAttribute("id")
+        self.assertIsNone(doc.getElementById("fresh2"))
+
 
 ###############################################################################
 #
@@ -4,8 +4,11 @@
 # testDombuilder:
 # 2024-09: Written by Steven J. DeRose.
 #
+import os
 import unittest
 import codecs
+import tempfile
+import threading
 from collections import defaultdict
 
 from xml.dom import minidom
@@ -13,6 +16,7 @@ from xml.parsers import expat
 
 import basedom
 import dombuilder
+import thor
 
 from makeTestDoc import isEqualNode  # packXml
 
@@ -174,5 +178,70 @@ class TestSelectors(unittest.TestCase):
             self.maxDiff = None
             self.assertEqual(dict(cts), dict(expectedCts))
 
+class TestStreaming(unittest.TestCase):
+    def testSubtrees(self):
+        recs = "".join('<rec n="%d"><a>x%d</a></rec>' % (i, i) for i in range(200))
+        x = "<doc>" + recs + "</doc>"
+        di = basedom.getDOMImplementation()
+        for pc in [ expat, thor ]:
+            db = dombuilder.DomBuilder(parserClass=pc, domImpl=di)
+            n = 0
+            for rec in db.iterSubtrees(x, "rec", chunkSize=256):
+                self.assertEqual(rec.getAttribute("n"), str(n))
+                self.assertEqual(rec.childNodes[0].childNodes[0].data, f"x{n}")
+                self.assertLess(len(db.domDoc.documentElement.childNodes), 50)
+                n += 1
+            self.assertEqual(n, 200)
+            self.assertEqual(len(db.domDoc.documentElement.childNodes), 0)
+
+            db = dombuilder.DomBuilder(parserClass=pc, domImpl=di)
+            names = [ e.nodeName for e in db.iterSubtrees("sampleData/sampleHTML.xml",
+                lambda e: e.nodeName in [ "p", "div" ]) ]
+            self.assertEqual(names[:6], [ "p", "p", "p", "p", "p", "div" ])
+
+    def testDclsAndEarlyStop(self):
+        x = ('<!DOCTYPE doc [<!ELEMENT doc (rec*)><!ATTLIST rec n CDATA #IMPLIED>'
+            '<!ENTITY e "ent"><!NOTATION png SYSTEM "png">]>\n<doc>'
+            + "".join('<rec n="%d">&e;</rec>' % (i) for i in range(500)) + "</doc>")
+        di = basedom.getDOMImplementation()
+        nThreads = threading.active_count()
+        for pc in [ expat, thor ]:
+            db = dombuilder.DomBuilder(parserClass=pc, domImpl=di)
+            recs = [ rec.textContent for rec in db.iterSubtrees(x, "rec") ]
+            self.assertEqual(recs, [ "ent" ] * 500)
+            for _i in range(3):
+                db = dombuilder.DomBuilder(parserClass=pc, domImpl=di)
+                for rec in db.iterSubtrees(x, "rec", chunkSize=256):
+                    break
+        self.assertEqual(threading.active_count(), nThreads)
+
+    def testBatch(self):
+        with codecs.open("sampleData/sampleHTML.xml", "rb", encoding="utf-8") as ifh:
+            x = ifh.read()
+        di = basedom.getDOMImplementation()
+        doc1 = dombuilder.DomBuilder(parserClass=thor, domImpl=di).parse_string(x)
+        doc2 = dombuilder.DomBuilder(parserClass=thor, domImpl=di,
+            batch=True).parse_string(x)
+        self.assertTrue(isEqualNode(doc1.documentElement, doc2.documentElement))
+
+class TestParseMany(unittest.TestCase):
+    def testPool(self):
+        with tempfile.TemporaryDirectory() as tdir:
+            paths = []
+            for i in range(6):
+                paths.append(os.path.join(tdir, f"f{i}.xml"))
+                with open(paths[-1], "w", encoding="utf-8") as ofh:
+                    ofh.write(f"<doc n='{i}'><p>Hello</p></doc>" if i != 3 else "<doc>")
+            for parser in [ "thor", "expat" ]:
+                results = dombuilder.parseMany(paths, parser=parser, output="xml",
+                    workers=2, chunkSize=2)
+                self.assertEqual([ r.path for r in results ], paths)
+                self.assertEqual([ bool(r) for r in results ],
+                    [ True, True, True, False, True, True ])
+                self.assertIn("n=\"5\"", results[5].value)
+
+                results = dombuilder.parseMany(paths, parser=parser, workers=0)
+                self.assertEqual(results[4].value.documentElement.getAttribute("n"), "4")
+
 if __name__ == '__main__':
     unittest.main()
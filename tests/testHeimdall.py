@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+#
+import unittest
+from xml.parsers import expat
+
+import basedom
+import dombuilder
+from saxplayer import SaxEvent
+import thor
+from thor import XSParser
+from heimdall import Heimdall, expatModelToString
+
+DTD = """<!DOCTYPE doc [
+<!ELEMENT doc (title, sec+)>
+<!ATTLIST doc id ID #IMPLIED>
+<!ELEMENT title (#PCDATA)>
+<!ELEMENT sec (title, (p | note)*)>
+<!ATTLIST sec id ID #REQUIRED ref IDREF #IMPLIED kind (a|b) "a" ver CDATA #FIXED "1">
+<!ELEMENT p (#PCDATA | i)*>
+<!ELEMENT i (#PCDATA)>
+<!ELEMENT note EMPTY>
+]>
+"""
+
+GOOD = """<doc><title>T</title>
+<sec id="s1" ref="s2"><title>S</title><p>x <i>y</i></p></sec>
+<sec id="s2" kind="b" ver="1"><title>S</title><note/></sec></doc>"""
+
+BAD = """<doc><title>T</title>
+<sec id="s1" ref="s2"><title>S</title><p>x <i>y</i></p></sec>
+<sec id="s2" kind="c" ver="2" ref="nowhere"><note>bad</note><title>S</title><x/></sec>
+<sec id="s1"><title>S</title></sec><sec/></doc>"""
+
+BAD_MSGS = [
+    "Attribute 'kind' value 'c' is not one of ['a', 'b'].",
+    "Attribute 'ver' must be '1', not '2'.",
+    "Element 'note' not allowed here in 'sec' (expected ['title']).",
+    "Text not allowed in element 'note'.",
+    "Element 'x' not allowed here in 'sec' (expected ['note', 'p', '(end)']).",
+    "Undeclared element 'x'.",
+    "Duplicate ID value 's1'.",
+    "Required attribute 'id' missing for element 'sec'.",
+    "Element 'sec' ended too soon (expected ['title']).",
+    "IDREF 'nowhere' does not match any ID.",
+]
+
+def thorHeimdall(body:str, **kwargs) -> Heimdall:
+    hv = Heimdall(**kwargs)
+    xsp = XSParser()
+    hv.attach(xsp)
+    xsp.Parse(DTD + body)
+    return hv
+
+class TestHeimdall(unittest.TestCase):
+    def testThor(self):
+        self.assertTrue(thorHeimdall(GOOD).isValid)
+        hv = thorHeimdall(BAD)
+        self.assertEqual([ e.msg for e in hv.errors ], BAD_MSGS)
+        self.assertEqual(hv.errors[2].path, "/doc/sec")
+        with self.assertRaisesRegex(SyntaxError, "'kind' value 'c'"):
+            thorHeimdall(BAD, raiseErrors=True)
+
+    def testExpat(self):
+        for body, msgs in [ (GOOD, []), (BAD, BAD_MSGS) ]:
+            hv = Heimdall()
+            p = expat.ParserCreate()
+            starts = []
+            p.StartElementHandler = lambda name, attrs: starts.append(name)
+            hv.attach(p)
+            p.Parse(DTD + body, True)
+            hv.finish()
+            self.assertEqual([ e.msg for e in hv.errors ], msgs)
+            if msgs: self.assertEqual(hv.errors[2][1:], (13, 44, "/doc/sec"))
+            self.assertEqual(len(starts), body.count("<") - body.count("</"))
+
+    def testExpatEngine(self):
+        for batch in [ False, True ]:
+            hv = Heimdall()
+            xp = thor.ParserCreate(engine="expat")
+            if batch: xp.BatchHandler = lambda events: None
+            hv.attach(xp)
+            xp.Parse(DTD + BAD)
+            self.assertEqual([ e.msg for e in hv.errors ], BAD_MSGS)
+            self.assertEqual(hv.errors[2][1:],
+                (None, None, "/doc/sec") if batch else (13, 44, "/doc/sec"))
+
+    def testThorLines(self):
+        hv = thorHeimdall(BAD)
+        self.assertEqual([ e.lineNum for e in hv.errors[:3] ], [ 13, 13, 13 ])
+        self.assertEqual(hv.errors[6].lineNum, 14)
+
+    def testDomBuilderAndFilter(self):
+        domImpl = basedom.getDOMImplementation()
+        for batch in [ False, True ]:
+            hv = Heimdall()
+            db = dombuilder.DomBuilder(parserClass=XSParser(), domImpl=domImpl,
+                verbose=0, batch=batch, validator=hv)
+            doc = db.parse_string(DTD + BAD)
+            self.assertEqual(doc.documentElement.nodeName, "doc")
+            self.assertEqual(hv.nErrors, len(BAD_MSGS))
+
+        hv2 = Heimdall(doctype=hv.doctype)
+        events = list(hv2.filter(doc.eachSaxEvent(attrTx="DICT")))
+        self.assertEqual(events[0][0], SaxEvent.DOC)
+        self.assertEqual([ e.msg for e in hv2.errors ], BAD_MSGS)
+
+    def testAttributeShapes(self):
+        doctype = thorHeimdall(GOOD).doctype
+        for start in [
+            [ (SaxEvent.START, "sec", "id", "s1", "kind", "c") ],
+            [ (SaxEvent.START, "sec", [ "id", "s1", "kind", "c" ]) ],
+            [ (SaxEvent.START, "sec", None, False),
+              (SaxEvent.ATTRIBUTE, "id", "s1"), (SaxEvent.ATTRIBUTE, "kind", "c") ],
+        ]:
+            hv = Heimdall(doctype=doctype)
+            list(hv.filter(start + [ (SaxEvent.END, "sec"), (SaxEvent.DOCEND, ) ]))
+            self.assertEqual([ e.msg[:26] for e in hv.errors ],
+                [ "Attribute 'kind' value 'c'", "Element 'sec' ended too so" ])
+
+    def testExpatModels(self):
+        M = expat.model
+        self.assertEqual(expatModelToString((M.XML_CTYPE_EMPTY, 0, None, ())), "EMPTY")
+        self.assertEqual(expatModelToString((M.XML_CTYPE_MIXED, M.XML_CQUANT_REP,
+            None, ((M.XML_CTYPE_NAME, 0, "i", ()), ))), "(#PCDATA | i)*")
+        self.assertEqual(expatModelToString((M.XML_CTYPE_SEQ, 0, None, (
+            (M.XML_CTYPE_NAME, 0, "a", ()), (M.XML_CTYPE_CHOICE, M.XML_CQUANT_PLUS,
+            None, ((M.XML_CTYPE_NAME, M.XML_CQUANT_OPT, "b", ()), ))))), "(a , (b?)+)")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,12 +5,14 @@
 import unittest
 import re
 import datetime
+from typing import List
 
 from runeheim import CaseHandler
-from xsdtypes import facetCheck, XsdFacet, DateTimeFrag, Duration
+from xsdtypes import (facetCheck, XsdFacet, XsdType, XSDDatatypes,
+    deriveXsdType, DateTimeFrag, Duration)
 from schemera import (
-    DocumentType, SimpleType, ComplexType, SeqType,
-    ElementDef, RepType, ModelGroup, ModelItem, Model,
+    DocumentType, SimpleType, ComplexType, SeqType, ContentType,
+    ElementDef, RepType, ModelGroup, ModelItem, Model, ContentAutomaton,
     AttrDef, DftType, EntityDef, EntitySpace, EntityParsing)
 import thor
 #from ragnaroktypes import HierarchyRequestError
@@ -325,10 +327,9 @@ class testAttrDef(unittest.TestCase):
         self.assertFalse(facetCheck("blockquote", "NMTOKEN"))
         self.assertFalse(facetCheck("bull", "ENTITY"))
 
-        #TODO Special facet checks:
-        #self.assertFalse(facetCheck("thing1 thing2", "IDREFS"))
-        #self.assertFalse(facetCheck("ul ol dl", "NMTOKENS"))
-        #self.assertFalse(facetCheck("chap1 chap2 chap3 chap4", "ENTITIES"))
+        self.assertFalse(facetCheck("thing1 thing2", "IDREFS"))
+        self.assertFalse(facetCheck("ul ol dl", "NMTOKENS"))
+        self.assertFalse(facetCheck(" chap1\tchap2  chap3 chap4", "ENTITIES"))
 
 
     def testxsdTypesFail(self):
@@ -418,6 +419,71 @@ class testAttrDef(unittest.TestCase):
         self.assertEqual(facetCheck("ul, ol, dl", "NMTOKENS"), XsdFacet.pattern)
         self.assertEqual(facetCheck("chap1 chap2 @chap4", "ENTITIES"), XsdFacet.pattern)
 
+    def testCheckers(self):
+        byteCheck = XSDDatatypes["byte"].getChecker()
+        self.assertIs(byteCheck, XSDDatatypes["byte"].getChecker())
+        self.assertIsNone(byteCheck("-128"))
+        self.assertEqual(byteCheck("128"), XsdFacet.maxInclusive)
+        self.assertEqual(byteCheck("abc"), XsdFacet.pybase)
+        self.assertEqual(facetCheck("12", XSDDatatypes["byte"]), None)
+
+        cached = XSDDatatypes["NMTOKENS"].getChecker(cacheSize=8)
+        for _i in range(3):
+            self.assertIsNone(cached("ul ol dl"))
+            self.assertEqual(cached("ul, ol"), XsdFacet.pattern)
+        self.assertEqual(cached.cache_info().hits, 4)
+
+        # Changing a facet drops the compiled checkers
+        typ = XsdType(XSDDatatypes["short"])
+        self.assertIsNone(typ.getChecker()("200"))
+        typ["maxInclusive"] = 100
+        self.assertEqual(typ.getChecker()("200"), XsdFacet.maxInclusive)
+
+    def testDerivedTypes(self):
+        sku = deriveXsdType("token", { "pattern": r"\d{3}-[A-Z]{2}" }, name="SKU")
+        self.assertIsNone(facetCheck(" 123-AB ", sku))
+        self.assertEqual(facetCheck("123-ab", sku), XsdFacet.pattern)
+        self.assertEqual(sku["name"], "SKU")
+
+        dozen = deriveXsdType("integer", { "minInclusive": "1", "maxExclusive": "13" })
+        self.assertIsNone(facetCheck("12", dozen))
+        self.assertEqual(facetCheck("13", dozen), XsdFacet.maxExclusive)
+        self.assertEqual(facetCheck("0", dozen), XsdFacet.minInclusive)
+        self.assertEqual(facetCheck("1.5", dozen), XsdFacet.pybase)
+
+        size = deriveXsdType("NMTOKEN", { "enumeration": [ "S", "M", "L" ] })
+        self.assertIsNone(facetCheck("M", size))
+        self.assertEqual(facetCheck("XL", size), XsdFacet.enumeration)
+
+        code = deriveXsdType("string", { "minLength": 2, "maxLength": 4 })
+        self.assertEqual(facetCheck("a", code), XsdFacet.minLength)
+        self.assertEqual(facetCheck("abcde", code), XsdFacet.maxLength)
+
+        st = SimpleType(name="SKU", baseType="token")
+        st.restrictions["pattern"] = r"\d{3}-[A-Z]{2}"
+        self.assertIs(st.getXsdType(), st.getXsdType())
+        self.assertEqual(facetCheck("12-AB", st.getXsdType()), XsdFacet.pattern)
+
+        with self.assertRaises(TypeError):
+            deriveXsdType("notAnXSDType", {})
+
+    def testDerivedItemTypes(self):
+        """A list of schema-defined items checks them via the same types.
+        """
+        types = dict(XSDDatatypes)
+        types["SKU"] = deriveXsdType("token", { "pattern": r"\d{3}-[A-Z]{2}" }, name="SKU")
+        types["SKUs"] = XsdType({ "pybase": str, "base": "SKU",
+            "pattern": r".*", "variety": "list" })
+        pair = deriveXsdType("SKUs", { "maxLength": 2 }, types=types, name="SKUPair")
+        self.assertIs(pair.itemType, types["SKU"])
+        self.assertIsNone(facetCheck("123-AB 456-CD", pair))
+        self.assertEqual(facetCheck("123-AB 45-CD", pair), XsdFacet.pattern)
+        self.assertEqual(facetCheck("123-AB 456-CD 789-EF", pair), XsdFacet.maxLength)
+
+        tokens = deriveXsdType("NMTOKENS", { "minLength": 2 })
+        self.assertIs(tokens.itemType, XSDDatatypes["NMTOKEN"])
+        self.assertEqual(facetCheck("ul", tokens), XsdFacet.minLength)
+
     def testConversions(self):
         dateStr = "1990-02-22"
         timeStr = "15:02:59Z"
@@ -593,6 +659,51 @@ class testModelItem(unittest.TestCase):
         self.assertIsInstance(ModelItem(name="hr", rep=RepType.NOREP), ModelItem)
 
 
+class testContentAutomaton(unittest.TestCase):
+    def check(self, model, good:List[str], bad:List[str]):
+        ca = ContentAutomaton(model)
+        for names in good: self.assertTrue(ca.accepts(names.split()), names)
+        for names in bad: self.assertFalse(ca.accepts(names.split()), names)
+        return ca
+
+    def test_models(self):
+        self.check("(title, p*, sig?)", [ "title", "title p p sig" ],
+            [ "", "p", "title sig p", "title sig sig" ])
+        self.check("((a|b)*, a, (a|b))", [ "a a", "b a b", "a b a a" ],
+            [ "a", "b b", "a b b" ])
+        self.check("((a, b)+, c)+", [ "a b c", "a b a b c a b c" ],
+            [ "a b", "c", "a b c c" ])
+
+    def test_bounds_and_all(self):
+        self.check("(a{2,3}, b)", [ "a a b", "a a a b" ], [ "a b", "a a a a b" ])
+        self.check("(a{2,}, b)", [ "a a b", "a a a a a b" ], [ "a b" ])
+        ca = self.check("(a & b & c)", [ "a b c", "c b a", "b a c" ],
+            [ "a b", "a a b c", "a b c c" ])
+        self.assertEqual(len(ca.transitions), 8)
+        self.check("(x & y?)", [ "x", "y x" ], [ "y", "x y y" ])
+
+    def test_text_and_declared(self):
+        ca = self.check("(#PCDATA | i | b)*", [ "", "i b i" ], [ "p" ])
+        self.assertTrue(ca.allowText)
+        self.assertFalse(ContentAutomaton("(a, b)").allowText)
+        self.assertTrue(ContentAutomaton("(#PCDATA)").allowText)
+        self.check(ContentType.EMPTY, [ "" ], [ "a" ])
+        self.check("EMPTY", [ "" ], [ "a" ])
+        self.check(ContentType.ANY, [ "", "a b a" ], [])
+
+    def test_ast_and_cache(self):
+        self.check(Model(tokens=[ "(", "title", ",", "p", "*", ")" ]),
+            [ "title", "title p p" ], [ "p" ])
+        model = Model(contentType="X_MODEL")
+        model.childItems = [ ModelGroup([ ModelItem("x", RepType.PLUS),
+            ModelItem("y") ], seq=SeqType.ALL) ]
+        self.check(model, [ "x y", "y x x" ], [ "y", "x" ])
+        ed = ElementDef("sec", model="(title, p*)")
+        self.assertIs(ed.getAutomaton(), ed.getAutomaton())
+        ca = ed.getAutomaton()
+        self.assertEqual(ca.step(0, "p"), None)
+        self.assertEqual(ca.expected(ca.step(0, "title")), [ "p", "(end)" ])
+
 class testAttrDef2(unittest.TestCase):
     def setup(self):
         pass
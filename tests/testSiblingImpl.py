@@ -4,6 +4,7 @@
 #
 import unittest
 import logging
+import random
 
 #from ragnaroktypes import HReqE, ICharE, NamespaceError
 
@@ -22,10 +23,9 @@ nsURI = "https://example.com/namespaces/foo"
 #
 class TestCHNUM(unittest.TestCase):
     def setUp(self):
-        basedom._siblingImpl = SiblingImpl.CHNUM
-
         self.impl = getDOMImplementation()
         self.doc = self.impl.createDocument(None, "html", None)
+        self.doc._updateChildSiblingImpl(SiblingImpl.CHNUM)
         self.docEl = self.doc.documentElement
 
     def testBasics(self):
@@ -55,10 +55,9 @@ class TestCHNUM(unittest.TestCase):
 
 class TestLINKS(unittest.TestCase):
     def setUp(self):
-        basedom._siblingImpl = SiblingImpl.LINKS
-
         self.impl = getDOMImplementation()
         self.doc = self.impl.createDocument(None, "html", None)
+        self.doc._updateChildSiblingImpl(SiblingImpl.LINKS)
         self.docEl = self.doc.documentElement
 
     def testBasics(self):
@@ -117,5 +116,84 @@ class TestChanging(unittest.TestCase):
     #def testRemove(self):
     #    doc = self.n.doc
 
+class TestMutating(unittest.TestCase):
+    """Random inserts/removes on a wide element, checking neighbors and
+    positions against the actual child list as we go.
+    """
+    def checkAll(self, docEl):
+        for i, ch in enumerate(docEl.childNodes):
+            self.assertEqual(ch.getChildIndex(), i)
+            self.assertEqual(ch.getRChildIndex(), i - len(docEl))
+            self.assertIs(ch.previousSibling, docEl.childNodes[i-1] if i else None)
+            self.assertIs(ch.nextSibling,
+                docEl.childNodes[i+1] if i+1 < len(docEl) else None)
+
+    def testMutating(self):
+        for impl in (SiblingImpl.COUNT, SiblingImpl.CHNUM, SiblingImpl.LINKS):
+            doc = basedom.Document(qualifiedName="html")
+            doc._updateChildSiblingImpl(impl)
+            docEl = doc.documentElement
+            for i in range(50): docEl.appendChild(doc.createElement("p"))
+            rnd = random.Random(1)
+            for i in range(300):
+                k = rnd.randrange(len(docEl))
+                if i % 3 == 2:
+                    docEl.removeChild(docEl.childNodes[k])
+                else:
+                    docEl.insertBefore(doc.createElement("ins"), docEl.childNodes[k])
+                probe = docEl.childNodes[rnd.randrange(len(docEl))]
+                self.assertIs(docEl.childNodes[probe.getChildIndex()], probe)
+                if i % 50 == 0: self.checkAll(docEl)
+            self.checkAll(docEl)
+            docEl.checkNode(deep=True)
+
+    def testAdaptive(self):
+        doc = basedom.Document(qualifiedName="html")
+        docEl = doc.documentElement
+        for i in range(500): docEl.appendChild(doc.createElement("p"))
+        stats = doc.setAdaptiveSiblings(window=200, patience=1)
+        self.assertEqual(doc._siblingImpl, SiblingImpl.CHNUM)
+
+        # Plain walking favors LINKS
+        for _i in range(2):
+            ch = docEl.childNodes[0]
+            while ch is not None: ch = ch.nextSibling
+        self.assertEqual(stats.switches, [ SiblingImpl.LINKS ])
+        self.assertEqual(doc._siblingImpl, SiblingImpl.LINKS)
+        self.checkAll(docEl)
+        docEl.checkNode(deep=True)
+
+        # Mid-list edits plus position lookups favor CHNUM
+        rnd = random.Random(1)
+        for i in range(300):
+            k = rnd.randrange(len(docEl))
+            docEl.insertBefore(doc.createElement("ins"), docEl.childNodes[k])
+            docEl.childNodes[k].getChildIndex()
+        self.assertEqual(stats.switches, [ SiblingImpl.LINKS, SiblingImpl.CHNUM ])
+        self.checkAll(docEl)
+        docEl.checkNode(deep=True)
+
+        self.assertIsNone(doc.setAdaptiveSiblings(False))
+        for _i in range(1000): docEl.childNodes[5].getChildIndex()
+        self.assertEqual(doc._siblingImpl, SiblingImpl.CHNUM)
+
+    def testAdaptiveWithText(self):
+        doc = basedom.Document(qualifiedName="html")
+        docEl = doc.documentElement
+        for i in range(2000):
+            p = doc.createElement("p")
+            p.appendChild(doc.createTextNode(f"text {i}"))
+            docEl.appendChild(p)
+        stats = doc.setAdaptiveSiblings(window=256)
+        for _i in range(2):
+            ch = docEl.childNodes[0]
+            while ch is not None: ch = ch.nextSibling
+        self.assertEqual(stats.switches, [ SiblingImpl.LINKS ])
+        self.assertIs(doc._sibStats, stats)
+        self.checkAll(docEl)
+        for ch in docEl.childNodes[:10]:
+            self.assertIsNone(ch.childNodes[0].nextSibling)
+        docEl.checkNode(deep=True)
+
 if __name__ == '__main__':
     unittest.main()
@@ -2,12 +2,15 @@
 #
 #pylint: disable=W0201, C2801, W0401, W0614, W0212
 #
+import os
 import unittest
+import tempfile
 from math import isnan
+from types import SimpleNamespace
 
 from ragnaroktypes import *
 
-from stackreader import InputFrame, StackReader
+from stackreader import InputFrame, MMapInputFrame, StackReader, EntityTextCache
 
 xmlDcl = """<?xml version="1.0" encoding="utf-8"?>"""
 docType = """<!DOCTYPE srTest []>"""
@@ -157,12 +160,54 @@ class TestInputFrame(unittest.TestCase):
 
         #self.assertEqual(fr.readRegex(regex[str, re.Pattern], ss=True,fold=True), "")
 
+        fr.pushBack("  ABC123 --a comment--xyz")
+        mat = fr.readRegex(r"^[a-z]+(\d+)", ss=True, fold=True)
+        self.assertEqual(mat.group(), "ABC123")
+        self.assertEqual(mat.group(1), "123")
+        self.assertIsNone(fr.readRegex(r"[A-Z]+", ss=True, fold=False))
+        self.assertEqual(fr.peek(3), "xyz")
+
     def testReaders3(self):
         fr = InputFrame()
         fr.addData(docData)
 
         # TODOself.assertEqual(fr.peekDelimPlus(ss=True), "")
 
+    def testTextRuns(self):
+        fr = InputFrame()
+        fr.addData("Hello, world\nagain&amp;more]]>x")
+        self.assertEqual(fr.readTextRun(), "Hello, world\nagain")
+        self.assertEqual(fr.readTextRun(), "")
+        self.assertEqual(fr.peek(1), "&")
+        fr.discard(1)
+        self.assertEqual(fr.readTextRun(InputFrame.textRunNL_re), "amp;more")
+        fr.discard(3)
+        self.assertEqual(fr.readTextRun(), "x")
+        self.assertEqual(fr.readTextRun(), "")
+
+        fr = InputFrame()
+        fr.addData("a\nb<")
+        self.assertEqual(fr.readTextRun(InputFrame.textRunNL_re), "a")
+        self.assertEqual(fr.peek(1), "\n")
+
+    def testMMapFrame(self):
+        data = ("<p>caf\u00e9 \u2014 na\u00efve</p>\n" * 200) + "<end/>"
+        with tempfile.NamedTemporaryFile("w", encoding="utf-8",
+            suffix=".xml", delete=False) as ofh:
+            ofh.write(data)
+        try:
+            self.assertTrue(MMapInputFrame.canMap(ofh.name))
+            opts = SimpleNamespace(noC0=True, noC1=False, noPrivateUse=False)
+            fr = MMapInputFrame(bufSize=100, options=opts)  # Splits some chars
+            fr.addFile(ofh.name)
+            self.assertEqual(fr.readAll(), data)
+            fr.dropUsedPart(0)
+            self.assertEqual(fr.fullOffset, len(data))
+            self.assertEqual(fr.lineNum, 201)
+            fr.close()
+        finally:
+            os.remove(ofh.name)
+
     # TODO Same but with file and Entity instead of string.
 
 
@@ -211,5 +256,28 @@ class TestSR(unittest.TestCase):
         #self.assertEqual(topOff(n=None))
         #self.assertEqual(skipSpaces(allowComments=False, entOpener=None))None:
 
+class TestEntityTextCache(unittest.TestCase):
+    def testLRU(self):
+        tdir = tempfile.mkdtemp(prefix="testEntityTextCache")
+        paths = []
+        for i in range(3):
+            paths.append(os.path.join(tdir, f"e{i}.xml"))
+            with open(paths[-1], "w", encoding="utf-8") as ofh:
+                ofh.write(f"Entity {i} \u00e9.")
+        etc = EntityTextCache(maxChars=25)  # Room for two
+        self.assertEqual(etc.getText(paths[0]), "Entity 0 \u00e9.")
+        self.assertEqual(etc.getText(paths[1]), "Entity 1 \u00e9.")
+        self.assertEqual(etc.getText(paths[0]), "Entity 0 \u00e9.")
+        self.assertEqual((etc.hits, etc.misses), (1, 2))
+        etc.getText(paths[2])  # Pushes out e1, the least recently used
+        self.assertEqual(sorted(k[0][-6:] for k in etc.texts), [ "e0.xml", "e2.xml" ])
+        self.assertLessEqual(etc.nChars, 25)
+
+        with open(paths[0], "w", encoding="utf-8") as ofh:
+            ofh.write("Changed, longer.")  # New size, so a miss
+        self.assertEqual(etc.getText(paths[0]), "Changed, longer.")
+        for path in paths: os.remove(path)
+        os.rmdir(tdir)
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,19 +1,25 @@
 #!/usr/bin/env python3
 #
 import os
+import shutil
+import tempfile
+import threading
+import json
 #import re
 #import codecs
 import unittest
 import logging
-from typing import Dict, Any
+from typing import Dict, List, Any
 from types import ModuleType
 from collections import defaultdict
 
 from xml.parsers import expat
 
+from ragnaroktypes import NSuppE, ICharE
 from schemera import EntityDef, EntitySpace, EntityParsing
 import thor
 from thor import XSParser
+import stackreader
 from stackreader import InputFrame  #, StackReader
 from runeheim import CaseHandler
 from saxplayer import SaxEvent
@@ -96,7 +102,7 @@ def Default(data:str, *args) -> None:
 
 def ElementDecl(name:str, model:str="") -> None:
     common(SaxEvent.ELEMENTDCL, name, model)
-def AttlistDecl(elname:str, attname, typ="", default="", required=False) -> None:
+def AttlistDecl(elname:str, attname=None, typ="", default="", required=False) -> None:
     common(SaxEvent.ATTLISTDCL, attname, typ)
 def NotationDecl(notationName:str, base="", systemId="", publicId="") -> None:
     common(SaxEvent.NOTATIONDCL, notationName)
@@ -259,10 +265,431 @@ class TestXSPDocs(unittest.TestCase):
 </html>
 """
 
-        with self.assertRaises(ValueError):
-            xsp = XSParser(options={ "curlyQuote":True, "NotAnOption":False })
+        # Options XSParser doesn't define (like Loki's) are kept, but mean
+        # the document isn't plain XML.
+        xsp = XSParser(options={ "curlyQuote":True, "NotAnOption":False })
+        self.assertFalse(xsp.isPlainXml())
         xsp = XSParser()
         xsp.Parse(xml)
 
+###############################################################################
+#
+class TestIncremental(unittest.TestCase):
+    def getEvents(self, feeder) -> List:
+        events = []
+        xsp = XSParser()
+        xsp.StartElementHandler = lambda name, attrs: events.append((name, dict(attrs)))
+        xsp.EndElementHandler = lambda name: events.append(("/", name))
+        xsp.CharacterDataHandler = lambda data: events.append(data)
+        xsp.CommentHandler = lambda data: events.append(("#", data))
+        feeder(xsp)
+        return events
+
+    def testChunks(self):
+        doc = ("<doc>" + "<p n='1'>café &amp; more<!-- c --></p>\n" * 50
+            + "</doc>")
+        whole = self.getEvents(lambda xsp: xsp.Parse(doc))
+        data = doc.encode("utf-8")
+        for size in [ 1, 7, 100 ]:
+            def feeder(xsp):
+                for i in range(0, len(data), size):
+                    xsp.Parse(data[i:i+size], isfinal=False)
+                xsp.Parse(b"", isfinal=True)
+            self.assertEqual(self.getEvents(feeder), whole)
+
+    def testErrors(self):
+        xsp = XSParser()
+        with self.assertRaises(SyntaxError):
+            xsp.Parse("<doc><a></b>", isfinal=False)
+            xsp.Parse("</doc>", isfinal=True)
+        self.assertIsNone(xsp.feedThread)
+
+    def testCallerThread(self):
+        threads = set()
+        xsp = XSParser()
+        xsp.StartElementHandler = lambda name, attrs: threads.add(threading.get_ident())
+        for chunk in [ "<doc><p>", "x</p><p>", "y</p>" ]:
+            xsp.Parse(chunk, isfinal=False)
+        xsp.Parse("</doc>", isfinal=True)
+        self.assertEqual(threads, { threading.get_ident() })
+        self.assertIsNone(xsp.feedThread)
+
+    def testAbandoned(self):
+        nThreads = threading.active_count()
+        def boom(name, attrs):
+            if name == "b": raise ValueError("handler failed")
+        for _i in range(5):
+            xsp = XSParser()
+            xsp.Parse("<doc><a>", isfinal=False)
+            xsp.close()  # Stopped feeding
+            xsp = XSParser()
+            xsp.StartElementHandler = boom
+            with self.assertRaises(ValueError):
+                xsp.Parse("<doc><a/><b/>" + "<c/>" * 500, isfinal=False)
+        self.assertEqual(threading.active_count(), nThreads)
+
+class TestDispatch(unittest.TestCase):
+    def testSubclassHandlers(self):
+        class MyParser(XSParser):
+            def __init__(self):
+                super().__init__()
+                self.seen = []
+            def StartElementHandler(self, name, attrs):
+                self.seen.append(name)
+
+        xsp = MyParser()
+        xsp.Parse("<doc><p/></doc>")
+        self.assertEqual(xsp.seen, [ "doc", "p" ])
+
+        xsp = MyParser()
+        xsp.StartElementHandler = lambda name, attrs: xsp.seen.append(name.upper())
+        xsp.EndElementHandler = lambda name: xsp.seen.append("/" + name)
+        xsp.Parse("<doc><p/></doc>")
+        self.assertEqual(xsp.seen, [ "DOC", "P", "/p", "/doc" ])
+
+        xsp = MyParser()
+        xsp.StartElementHandler = None
+        xsp.Parse("<doc><p/></doc>")
+        self.assertEqual(xsp.seen, [])
+        self.assertIn(SaxEvent.START, MyParser().dispatch)
+
+###############################################################################
+#
+class TestIterparse(unittest.TestCase):
+    doc = '<doc a="1" b="2"><p>Hello</p><!--c--><?pi data?></doc>'
+
+    def testShapes(self):
+        events = list(XSParser().iterparse(self.doc))
+        self.assertEqual(events[0], (SaxEvent.DOC, ))
+        self.assertEqual(events[1], (SaxEvent.START, "doc", "a", "1", "b", "2"))
+        self.assertEqual(events[2:], [
+            (SaxEvent.START, "p"), (SaxEvent.CHAR, "Hello"), (SaxEvent.END, "p"),
+            (SaxEvent.COMMENT, "c"), (SaxEvent.PROC, "pi", " data"),
+            (SaxEvent.END, "doc"), (SaxEvent.DOCEND, ) ])
+
+        events = list(XSParser().iterparse(self.doc, attrTx="DICT"))
+        self.assertEqual(events[1], (SaxEvent.START, "doc", { "a":"1", "b":"2" }))
+        events = list(XSParser().iterparse(self.doc, attrTx="EVENTS"))
+        self.assertEqual(events[1:4], [ (SaxEvent.START, "doc"),
+            (SaxEvent.ATTRIBUTE, "a", "1"), (SaxEvent.ATTRIBUTE, "b", "2") ])
+
+        self.assertEqual(len(list(XSParser().iterparse(sampleDoc))),
+            len(list(XSParser().iterparse(open(sampleDoc, "rb")))))
+
+    def testEarlyStop(self):
+        xsp = XSParser()
+        called = []
+        xsp.StartElementHandler = lambda name, attrs: called.append(name)
+        for se in xsp.iterparse(self.doc):
+            if se[0] == SaxEvent.START: break
+        self.assertEqual(se[1], "doc")
+        self.assertEqual(called, [])
+        self.assertIsNone(xsp.eventSink)
+
+        with self.assertRaises(SyntaxError):
+            list(XSParser().iterparse("<doc><a></b></doc>"))
+
+class TestBatch(unittest.TestCase):
+    def testBatches(self):
+        doc = "<doc>" + '<p n="1">Hi<!--c--></p>' * 100 + "</doc>"
+        single = list(XSParser().iterparse(doc, attrTx="DICT"))
+        xsp = XSParser(options={ "batchSize": 64 })
+        batches = []
+        xsp.StartElementHandler = lambda name, attrs: self.fail("Not batched")
+        xsp.BatchHandler = batches.append
+        xsp.Parse(doc)
+        self.assertTrue(all(len(b) <= 64 for b in batches))
+        self.assertEqual(len(batches), -(-len(single) // 64))
+        events = [ ev for b in batches for ev in b ]
+        self.assertEqual([ ev[:2] for ev in events ], [ ev[:2] for ev in single ])
+        self.assertEqual(events[2], (SaxEvent.START, "p", { "n": "1" }))
+
+class TestParallel(unittest.TestCase):
+    def testSplitAndStitch(self):
+        recs = "".join('<p n="%d" q="a>b">x%d<!-- <q> --><?pi <y>?><e/></p>\n' % (i, i)
+            for i in range(500))
+        doc = '<?xml version="1.0"?><!--x--><doc a="1">\n' + recs + "</doc>\n<!--t-->"
+        rootTag, points = thor.findSplitPoints(doc, 4)
+        self.assertEqual(rootTag, '<doc a="1">')
+        self.assertEqual(len(points), 3)
+        for pt in points: self.assertTrue(doc.startswith("<p n=", pt))
+
+        self.assertEqual(thor.parseEventsParallel(doc, workers=2, minPieceSize=1000),
+            thor.recordParseEvents(doc))
+
+        self.assertEqual(thor.findSplitPoints(
+            '<!DOCTYPE doc [<!ENTITY e "x">]><doc><a/><b/></doc>', 2), (None, []))
+        self.assertEqual(thor.findSplitPoints(
+            '<!DOCTYPE doc SYSTEM "d.dtd"><doc><a/><b/></doc>', 2), (None, []))
+
+    def testExternalDTDEntities(self):
+        """Pieces after the first would lack the DOCTYPE, so this must parse
+        sequentially rather than fail on the entity references.
+        """
+        tdir = tempfile.mkdtemp(prefix="testParallel")
+        with open(os.path.join(tdir, "d.dtd"), "w") as ofh:
+            ofh.write('<!ENTITY e "eee">\n')
+        recs = "".join('<p n="%d">x&e;%d</p>\n' % (i, i) for i in range(500))
+        doc = '<!DOCTYPE doc SYSTEM "d.dtd"><doc>\n' + recs + "</doc>\n"
+        options = { "useDTD": True, "entityDirs": [ tdir ] }
+        events = thor.parseEventsParallel(doc, workers=2, minPieceSize=1000,
+            options=options)
+        self.assertEqual(events, thor.recordParseEvents(doc, options))
+        self.assertIn((SaxEvent.CHAR, "xeee499"), events)
+        shutil.rmtree(tdir)
+
+class TestDTDCache(unittest.TestCase):
+    def testExternalDTD(self):
+        tdir = tempfile.mkdtemp(prefix="testDTDCache")
+        with open(os.path.join(tdir, "s.dtd"), "w") as ofh:
+            ofh.write('<!ELEMENT doc (p*)>\n<!ELEMENT p (#PCDATA)>\n'
+                '<!ATTLIST p kind (a|b) "a">\n<!ENTITY ch "chapter">\n'
+                '<!ENTITY ext "external">\n<!NOTATION png SYSTEM "image/png">\n')
+        docPath = os.path.join(tdir, "d.xml")
+        with open(docPath, "w") as ofh:
+            ofh.write('<!DOCTYPE doc SYSTEM "s.dtd" [<!ENTITY ch "mine">]>\n'
+                '<doc><p>hi</p></doc>\n')
+        cacheDir = os.path.join(tdir, "cache")
+        thor.dtdCache.clear()
+        for i in range(3):
+            if i == 2: thor.dtdCache.doctypes.clear()  # Force a disk read
+            xsp = XSParser(options={ "useDTD": True, "dtdCacheDir": cacheDir })
+            with open(docPath, "rb") as ifh: xsp.ParseFile(ifh)
+            dt = xsp.sr.doctype
+            self.assertEqual(sorted(dt.elementDefs), [ "doc", "p" ])
+            self.assertEqual(list(dt.notationDefs), [ "png" ])
+            self.assertEqual(dt.entityDefs["ch"].source.literal, "mine")
+            self.assertEqual(set(dt.elementDefs["p"].attrDefs["kind"].enumValues),
+                { "a", "b" })
+            cached = next(iter(thor.dtdCache.doctypes.values()))
+            self.assertIsNot(dt.entityDefs["ext"], cached.entityDefs["ext"])
+        self.assertEqual((thor.dtdCache.misses, thor.dtdCache.hits,
+            thor.dtdCache.diskHits), (1, 1, 1))
+        cacheFiles = os.listdir(cacheDir)
+        self.assertEqual(len(cacheFiles), 1)
+        with open(os.path.join(cacheDir, cacheFiles[0]), encoding="utf-8") as ifh:
+            self.assertEqual(json.load(ifh)[0][0], "ELEMENT")  # (data, not pickle)
+        thor.dtdCache.clear()
+        shutil.rmtree(tdir)
+
+    def testMergeElementDefs(self):
+        """An internal ATTLIST mustn't hide the external ELEMENT or its
+        attributes, nor change the cached DTD's definitions.
+        """
+        tdir = tempfile.mkdtemp(prefix="testDTDCache")
+        with open(os.path.join(tdir, "s.dtd"), "w") as ofh:
+            ofh.write('<!ELEMENT doc (p*)>\n<!ELEMENT p (#PCDATA)>\n'
+                '<!ATTLIST p id ID #IMPLIED class CDATA #IMPLIED>\n')
+        docPath = os.path.join(tdir, "d.xml")
+        with open(docPath, "w") as ofh:
+            ofh.write('<!DOCTYPE doc SYSTEM "s.dtd" [\n'
+                '<!ATTLIST p class NMTOKEN #IMPLIED n CDATA #IMPLIED>]>\n'
+                '<doc><p>hi</p></doc>\n')
+        thor.dtdCache.clear()
+        for _i in range(2):
+            xsp = XSParser(options={ "useDTD": True })
+            with open(docPath, "rb") as ifh: xsp.ParseFile(ifh)
+            pDef = xsp.sr.doctype.elementDefs["p"]
+            self.assertIsNotNone(pDef.model)
+            self.assertEqual(sorted(pDef.attrDefs), [ "class", "id", "n" ])
+            self.assertEqual(pDef.attrDefs["class"].attrType, "NMTOKEN")
+        cached = next(iter(thor.dtdCache.doctypes.values()))
+        self.assertEqual(sorted(cached.elementDefs["p"].attrDefs), [ "class", "id" ])
+        self.assertEqual(cached.elementDefs["p"].attrDefs["class"].attrType, "CDATA")
+        thor.dtdCache.clear()
+        shutil.rmtree(tdir)
+
+    def testLRU(self):
+        cache = thor.DTDCache(maxEntries=2)
+        for key in "abc": cache.put(key, key.upper())
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("b"), "B")
+        cache.put("d", "D")  # "b" was just used, so "c" goes
+        self.assertEqual(list(cache.doctypes), [ "b", "d" ])
+
+class TestEntityCache(unittest.TestCase):
+    def testExternalEntities(self):
+        tdir = tempfile.mkdtemp(prefix="testEntityCache")
+        chPath = os.path.join(tdir, "ch1.xml")
+        with open(chPath, "w") as ofh:
+            ofh.write("Chapter <b>one</b>.")
+        doc = ('<!DOCTYPE doc [<!ENTITY lit "literal"><!ENTITY ch1 SYSTEM "%s">]>\n'
+            "<doc><p>&lit;</p><p>&ch1;</p><p>&ch1;</p></doc>" % (chPath))
+        stackreader.entityTextCache.clear()
+        for _ in range(2):
+            events = list(XSParser().iterparse(doc))
+            self.assertEqual([ ev[1] for ev in events if ev[0] == SaxEvent.CHAR ],
+                [ "literal", "Chapter ", "one", ".", "Chapter ", "one", "." ])
+        self.assertEqual((stackreader.entityTextCache.hits,
+            stackreader.entityTextCache.misses), (3, 1))
+        stackreader.entityTextCache.clear()
+        shutil.rmtree(tdir)
+
+    def testCachedCharChecks(self):
+        """Cached entity text must get the same character checks as uncached.
+        """
+        tdir = tempfile.mkdtemp(prefix="testEntityCache")
+        cPath = os.path.join(tdir, "c.xml")
+        with open(cPath, "w", encoding="utf-8") as ofh:
+            ofh.write("bad \x80 char")
+        doc = '<!DOCTYPE doc [<!ENTITY c SYSTEM "%s">]><doc>&c;</doc>' % (cPath)
+        stackreader.entityTextCache.clear()
+        for cache in [ False, True, True ]:
+            with self.assertRaises(ICharE):
+                list(XSParser(options={ "noC1": True, "entityCache": cache
+                    }).iterparse(doc))
+        self.assertEqual(stackreader.entityTextCache.hits, 1)
+        stackreader.entityTextCache.clear()
+        shutil.rmtree(tdir)
+
+class TestIntern(unittest.TestCase):
+    def testSharedNames(self):
+        doc = '<doc>' + '<para class="a">x</para>' * 3 + '</doc>'
+        for intern in [ True, False ]:
+            xsp = XSParser(options={ "internNames": intern })
+            starts = [ ev for ev in xsp.iterparse(doc, attrTx="DICT")
+                if ev[0] == SaxEvent.START and ev[1] == "para" ]
+            self.assertEqual(len(starts), 3)
+            names = [ ev[1] for ev in starts ]
+            attrNames = [ next(iter(ev[2])) for ev in starts ]
+            self.assertEqual(all(n is names[0] for n in names), intern)
+            self.assertEqual(all(n is attrNames[0] for n in attrNames), intern)
+
+class TestFastStartTag(unittest.TestCase):
+    def testSameEvents(self):
+        class SlowParser(XSParser):
+            def readStartTagFast(self):
+                return None
+        doc = ("<doc>" + """<p id="a1" class='x y'\n  n = "3">t</p><br/><q  />"""
+            + """<r a="1&amp;2" b="" c="&lt;"/><ns:s xml:lang="en" ns:k='v"w'/>""" * 2
+            + "</doc>")
+        fast = list(XSParser().iterparse(doc, attrTx="DICT"))
+        slow = list(SlowParser().iterparse(doc, attrTx="DICT"))
+        self.assertEqual(fast, slow)
+        self.assertIn((SaxEvent.START, "p",
+            { "id": "a1", "class": "x y", "n": "3" }), fast)
+
+        mat = XSParser.plainStartTag_re.match('<r a="1&amp;2">')
+        self.assertIsNone(mat)  # Left to the general path
+
+class TestPlainLoop(unittest.TestCase):
+    def testSameEvents(self):
+        class GeneralParser(XSParser):
+            def isPlainXml(self):
+                return False
+        doc = ('<?xml version="1.0"?>\n<!DOCTYPE doc [<!ENTITY e "<i>ent</i>">]>\n'
+            '<doc a="1"><p>x &amp; &#65; &e; y<br/></p><!--c--><?pi d?>'
+            '<![CDATA[<raw>]]><q   >z</q  ></doc>')
+        plain = list(XSParser().iterparse(doc))
+        general = list(GeneralParser().iterparse(doc))
+        self.assertEqual(plain, general)
+        self.assertIn((SaxEvent.START, "i"), plain)
+
+    def testCdataOnce(self):
+        class GeneralParser(XSParser):
+            def isPlainXml(self):
+                return False
+        doc = '<doc><![CDATA[<one>]]>x<![CDATA[two]]></doc>'
+        for parser in [ XSParser(), GeneralParser(), thor.ParserCreate(engine="expat") ]:
+            events = [ ev[0] for ev in parser.iterparse(doc) ]
+            self.assertEqual(events.count(SaxEvent.CDATA), 2)
+            self.assertEqual(events.count(SaxEvent.CDATAEND), 2)
+
+    def testWhenPlain(self):
+        self.assertTrue(XSParser().isPlainXml())
+        self.assertTrue(XSParser(options={ "useDTD": True }).isPlainXml())
+        self.assertFalse(XSParser(options={ "expatBreaks": True }).isPlainXml())
+        self.assertFalse(XSParser(options={ "backslash": True }).isPlainXml())
+        with self.assertRaises(SyntaxError):
+            list(XSParser().iterparse("<doc><a></b></doc>"))
+
+class TestExpatEngine(unittest.TestCase):
+    def testSameEvents(self):
+        doc = ('<?xml version="1.0"?>\n<!DOCTYPE doc [<!ENTITY e "ent">]>\n'
+            '<doc a="1"><p>x<br/></p><!--c--><q id="z">y</q></doc>')
+        thorEvents = list(thor.XSParser().iterparse(doc, attrTx="DICT"))
+        xp = thor.ParserCreate(engine="expat")
+        self.assertIsInstance(xp, thor.ExpatParser)
+        self.assertEqual(list(xp.iterparse(doc, attrTx="DICT")), thorEvents)
+
+    def testCoalescing(self):
+        doc = "<doc>line1\nline2 &amp; &#65; <![CDATA[<c>]]>more</doc>"
+        chars = []
+        xp = thor.ParserCreate(engine="expat")
+        xp.CharacterDataHandler = chars.append
+        xp.Parse(doc)
+        self.assertEqual(chars, [ "line1\nline2 & A ", "<c>", "more" ])
+
+        chars.clear()
+        xp = thor.ParserCreate(engine="expat", options={ "expatBreaks": True })
+        xp.CharacterDataHandler = chars.append
+        for chunk in [ doc[:9], doc[9:] ]: xp.Parse(chunk, False)
+        xp.Parse("", True)
+        self.assertGreater(len(chars), 3)
+        self.assertEqual("".join(chars), "line1\nline2 & A <c>more")
+
+    def testRefusedOptions(self):
+        for opt, val in [ ("useDTD", True), ("saxAttribute", True),
+            ("backslash", True), ("charEntities", True), ("extEntities", True),
+            ("noC0", False), ("MAXEXPANSION", 1000) ]:
+            with self.assertRaises(NSuppE):
+                thor.ParserCreate(engine="expat", options={ opt: val })
+        xp = thor.ParserCreate(engine="expat", options={ "extEntities": False })
+        self.assertFalse(xp.options.charEntities)
+        self.assertFalse(xp.options.extEntities)
+        self.assertIsNone(xp.options.MAXEXPANSION)
+        with self.assertRaises(SyntaxError):
+            thor.ParserCreate(engine="expat").Parse("<doc><a></b></doc>")
+
+class TestProfile(unittest.TestCase):
+    def testStats(self):
+        doc = ('<!DOCTYPE doc [<!ENTITY e "<i>ent</i>">]>\n'
+            '<doc><p>x &e; &#65;</p><!--c--><?pi d?><p/></doc>')
+        self.assertIsNone(XSParser().getStats())
+        xsp = XSParser(options={ "profile": True })
+        xsp.Parse(doc)
+        stats = xsp.getStats()
+        self.assertEqual({ k: stats["counts"][k] for k in [ "document",
+            "startTag", "endTag", "entity", "charRef", "comment", "pi", "entityDcl" ] },
+            { "document": 1, "startTag": 4, "endTag": 3, "entity": 1,
+            "charRef": 1, "comment": 1, "pi": 1, "entityDcl": 1 })
+        self.assertEqual(stats["maxEntityDepth"], 2)
+        self.assertEqual(stats["chars"], len(doc) + len("<i>ent</i>"))
+        self.assertGreater(stats["seconds"]["document"], stats["seconds"]["startTag"])
+        self.assertGreater(stats["charsPerSec"], 0)
+
+class TestValModels(unittest.TestCase):
+    dtd = """<!DOCTYPE doc [
+<!ELEMENT doc (title, sec+)>
+<!ELEMENT title (#PCDATA)>
+<!ELEMENT sec (title, (p | note)*, sig?)>
+<!ELEMENT p (#PCDATA | i)*>
+<!ELEMENT i (#PCDATA)>
+<!ELEMENT note EMPTY>
+<!ELEMENT sig (who & when)>
+<!ELEMENT who (#PCDATA)>
+<!ELEMENT when (#PCDATA)>
+]>
+"""
+    def parse(self, body:str, valModels:bool=True) -> None:
+        XSParser(options={ "valModels": valModels }).Parse(self.dtd + body)
+
+    def testValid(self):
+        self.parse("<doc><title>T</title>\n<sec><title>S</title><p>x <i>y</i></p>"
+            "<note/> <sig><when>1</when><who>me</who></sig></sec></doc>")
+
+    def testInvalid(self):
+        for body, msg in [
+            ("<doc><title>T</title></doc>", "'doc' ended too soon"),
+            ("<doc><sec><title>S</title></sec></doc>", "'sec' not allowed"),
+            ("<doc><title>T</title><sec><title>S</title><note>x</note></sec></doc>",
+                "Text not allowed in element 'note'"),
+            ("<doc><title>T</title><sec><title>S</title><sig><who/></sig></sec></doc>",
+                "'sig' ended too soon"),
+        ]:
+            with self.assertRaisesRegex(SyntaxError, msg):
+                self.parse(body)
+            self.parse(body, valModels=False)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+#
+# timeAttributes: Build a DOM for an attribute-heavy document with expat +
+# DomBuilder, then read every attribute with getAttribute(). Reports build
+# time, traced memory, and the read pass; then how long it takes to make
+# all the Attr nodes (which NamedNodeMap now only does on request).
+#
+import sys
+import time
+import logging
+import tracemalloc
+from xml.parsers import expat
+
+import basedom
+import dombuilder
+
+ATTRS = ("id", "class", "lang", "role", "n", "href")
+
+def gen_doc(nRecs:int) -> str:
+    rec = ('<rec id="r%d" class="c" lang="en" role="item" n="%d"'
+        ' href="#r%d">x</rec>\n')
+    return "<doc>\n" + "".join(rec % (i, i, i) for i in range(nRecs)) + "</doc>\n"
+
+def run(doc:str) -> None:
+    db = dombuilder.DomBuilder(parserClass=expat,
+        domImpl=basedom.getDOMImplementation())
+    tracemalloc.start()
+    start = time.perf_counter()
+    theDom = db.parse_string(doc)
+    buildSecs = time.perf_counter() - start
+    cur, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    recs = theDom.documentElement.childNodes
+    start = time.perf_counter()
+    for rec in recs:
+        if rec.isElement:
+            for name in ATTRS: rec.getAttribute(name)
+    readSecs = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for rec in recs:
+        if rec.isElement:
+            for name in ATTRS: rec.getAttributeNode(name)
+    nodeSecs = time.perf_counter() - start
+
+    print(f"{'Build':<22} {buildSecs:>9.2f}")
+    print(f"{'  traced MB':<22} {cur/(1<<20):>9.1f}")
+    print(f"{'getAttribute pass':<22} {readSecs:>9.2f}")
+    print(f"{'getAttributeNode pass':<22} {nodeSecs:>9.2f}")
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    nRecs = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    print(f"{nRecs} elements x {len(ATTRS)} attributes")
+    print(f"{'Label':<22} {'Seconds':>9}")
+    print("-" * 32)
+    run(gen_doc(nRecs))
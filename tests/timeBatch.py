@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+#
+# timeBatch: Build a DOM with Thor + DomBuilder, with per-event handlers
+# vs. batched events (XSParser.BatchHandler -> DomBuilder.BatchHandler).
+#
+import sys
+import time
+import logging
+import statistics
+
+import basedom
+import dombuilder
+import thor
+
+def gen_doc(nRecs:int) -> str:
+    rec = '<rec n="%d"><a>x%d &amp; y</a> tail<b/></rec>\n'
+    return "<doc>\n" + "".join(rec % (i, i) for i in range(nRecs)) + "</doc>\n"
+
+def time_build(doc:str, batch:bool, repeats:int=3) -> float:
+    times = []
+    for _ in range(repeats):
+        db = dombuilder.DomBuilder(parserClass=thor,
+            domImpl=basedom.getDOMImplementation(), batch=batch)
+        start = time.perf_counter()
+        db.parse_string(doc)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)  # DomBuilder's per-event handlers trace
+    nRecs = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    doc = gen_doc(nRecs)
+    mb = len(doc) / (1 << 20)
+    print(f"{'Mode':>12} {'Seconds':>9} {'MB/s':>8}")
+    print("-" * 31)
+    for batch in [ False, True ]:
+        secs = time_build(doc, batch)
+        print(f"{'batched' if batch else 'per-event':>12} {secs:>9.2f} {mb/secs:>8.2f}")
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+#
+# timeDTDCache: Parse many small documents that share one external DTD,
+# with no DTD cache, the in-memory cache, and the on-disk cache only
+# (as for separate processes).
+#
+import os
+import sys
+import time
+import shutil
+import logging
+import tempfile
+
+import thor
+
+def gen_dtd(nElements:int) -> str:
+    buf = "<!ELEMENT doc (%s)*>\n" % ("|".join("e%d" % i for i in range(nElements)))
+    for i in range(nElements):
+        buf += '<!ELEMENT e%d (#PCDATA)>\n<!ATTLIST e%d id ID #IMPLIED n CDATA "1">\n' % (i, i)
+        buf += '<!ENTITY ent%d "Value %d">\n' % (i, i)
+    return buf
+
+def time_docs(docPath:str, nDocs:int, options:dict, clearMemory:bool=False) -> float:
+    thor.dtdCache.clear()
+    start = time.perf_counter()
+    for _ in range(nDocs):
+        if clearMemory: thor.dtdCache.doctypes.clear()
+        xsp = thor.XSParser(options=options)
+        with open(docPath, "rb") as ifh:
+            xsp.ParseFile(ifh)
+    return time.perf_counter() - start
+
+if __name__ == "__main__":
+    logging.disable(logging.WARNING)
+    nDocs = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    nElements = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    tdir = tempfile.mkdtemp(prefix="timeDTDCache")
+    try:
+        with open(os.path.join(tdir, "big.dtd"), "w") as ofh:
+            ofh.write(gen_dtd(nElements))
+        docPath = os.path.join(tdir, "doc.xml")
+        with open(docPath, "w") as ofh:
+            ofh.write('<!DOCTYPE doc SYSTEM "big.dtd">\n<doc><e1 id="a">x</e1></doc>\n')
+        cacheDir = os.path.join(tdir, "cache")
+
+        print(f"{nDocs} documents, DTD with {nElements} element types.")
+        print(f"{'Mode':>12} {'Seconds':>9} {'ms/doc':>8}")
+        print("-" * 31)
+        for label, options, clearMemory in [
+            ("no cache", { "useDTD": True, "dtdCache": False }, False),
+            ("disk only", { "useDTD": True, "dtdCacheDir": cacheDir }, True),
+            ("memory", { "useDTD": True }, False) ]:
+            secs = time_docs(docPath, nDocs, options, clearMemory)
+            print(f"{label:>12} {secs:>9.2f} {secs/nDocs*1000:>8.2f}")
+    finally:
+        shutil.rmtree(tdir)
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+#
+# timeDispatch: Per-event cost of XSParser.doCB(), comparing the old
+# hasattr/getattr lookup with the precomputed dispatch table.
+#
+import time
+import statistics
+
+from saxplayer import SaxEvent
+import thor
+
+N = 1000000
+
+def oldDoCB(self, typ:SaxEvent, *args) -> None:
+    """doCB() as it was, looking up the handler on every event.
+    """
+    self.totEvents += 1
+    if hasattr(self, typ.value):
+        cb = getattr(self, typ.value)
+    elif hasattr(self, SaxEvent.DEFAULT.value):
+        cb = getattr(self, SaxEvent.DEFAULT.value)
+        if not args: args = (None, )
+    else:
+        cb = None
+    if not cb: return
+    cb(*args)
+
+def time_events(doCB, p:thor.XSParser, typ:SaxEvent, repeats:int=5) -> float:
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(N):
+            doCB(p, typ, "data")
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) / N * 1e9
+
+def time_parse(doc:str, repeats:int=3) -> float:
+    times = []
+    for _ in range(repeats):
+        p = thor.XSParser()
+        p.StartElementHandler = lambda name, attrs: None
+        p.CharacterDataHandler = lambda data: None
+        start = time.perf_counter()
+        p.Parse(doc)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+if __name__ == "__main__":
+    p = thor.XSParser()
+    p.CharacterDataHandler = lambda data: None
+    print(f"{'Event':>22} {'old ns/event':>13} {'new ns/event':>13}")
+    print("-" * 50)
+    for label, typ in [ ("with handler", SaxEvent.CHAR),
+        ("no handler", SaxEvent.COMMENT) ]:
+        tOld = time_events(oldDoCB, p, typ)
+        tNew = time_events(thor.XSParser.doCB, p, typ)
+        print(f"{label:>22} {tOld:>13.1f} {tNew:>13.1f}")
+
+    doc = "<doc>" + "<p>Some text</p><!--c-->\n" * 50000 + "</doc>"
+    secs = time_parse(doc)
+    print(f"\nThor on {len(doc)} chars: {secs:.2f} s, {len(doc)/(1<<20)/secs:.2f} MB/s")
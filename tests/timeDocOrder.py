@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+#
+# timeDocOrder: Build a document of nested sections via the DOM API, then
+# time compareDocumentPosition() on random node pairs and sorting a shuffled
+# NodeList into document order, with and without the Document's order
+# index; and how long scattered inserts take with the index on.
+#
+import sys
+import time
+import random
+
+from basedom import Document, NodeList
+
+def build(nSecs:int, nParas:int) -> Document:
+    doc = Document(qualifiedName="doc")
+    for i in range(nSecs):
+        sec = doc.createElement("sec")
+        doc.documentElement.appendChild(sec)
+        for j in range(nParas):
+            p = doc.createElement("p")
+            sec.appendChild(p)
+            p.appendChild(doc.createTextNode(f"Para {i}.{j}"))
+    return doc
+
+def timeIt(label:str, fn) -> float:
+    start = time.perf_counter()
+    fn()
+    secs = time.perf_counter() - start
+    print(f"{label:<28} {secs:>9.3f}")
+    return secs
+
+def comparePairs(pairs) -> None:
+    for a, b in pairs: a.compareDocumentPosition(b)
+
+def sortNodes(nodes) -> None:
+    NodeList(nodes).sortDocumentOrder()
+
+def scatteredInserts(doc:Document, n:int) -> None:
+    secs = doc.documentElement.childNodes
+    for i in range(n):
+        sec = secs[random.randrange(len(secs))]
+        sec.insertBefore(doc.createElement("ins"),
+            sec.childNodes[random.randrange(len(sec))])
+
+if __name__ == "__main__":
+    nSecs = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    nParas = 100
+    random.seed(1)
+    doc = build(nSecs, nParas)
+    nodes = list(doc.documentElement.descendants())
+    pairs = [ (random.choice(nodes), random.choice(nodes)) for _i in range(50000) ]
+    shuffled = random.sample(nodes, len(nodes))
+    print(f"{len(nodes)} nodes, {len(pairs)} pairs")
+    print(f"{'Label':<28} {'Seconds':>9}")
+    print("-" * 38)
+    cmp0 = timeIt("compare, no index", lambda: comparePairs(pairs))
+    sort0 = timeIt("sort, no index", lambda: sortNodes(shuffled))
+    timeIt("setOrderIndex()", doc.setOrderIndex)
+    cmp1 = timeIt("compare, index", lambda: comparePairs(pairs))
+    sort1 = timeIt("sort, index", lambda: sortNodes(shuffled))
+    timeIt("10000 inserts, index", lambda: scatteredInserts(doc, 10000))
+    print(f"Speedup: compare {cmp0/cmp1:.1f}x, sort {sort0/sort1:.1f}x")
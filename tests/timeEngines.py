@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+#
+# timeEngines: Thor vs. the expat engine behind the same API (ExpatParser)
+# vs. minidom, for bare parsing (events) and for building a DOM.
+#
+import sys
+import time
+import logging
+import statistics
+from xml.dom import minidom
+
+import basedom
+import dombuilder
+import thor
+
+def gen_doc(nRecs:int) -> str:
+    rec = ('<rec id="r%d" type="sample"><title>Record &amp; title</title>'
+        '<p>Some <i>mixed</i> text,\nover two lines.</p><br/></rec>\n')
+    return "<doc>\n" + "".join(rec % i for i in range(nRecs)) + "</doc>\n"
+
+def time_it(fn, repeats:int=3) -> float:
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+def parse_events(engine:str, doc:str) -> None:
+    xsp = thor.ParserCreate(engine=engine)
+    xsp.BatchHandler = lambda events: None
+    xsp.Parse(doc)
+
+def build_dom(engine:str, doc:str) -> None:
+    db = dombuilder.DomBuilder(parserClass=thor.ParserCreate(engine=engine),
+        domImpl=basedom.getDOMImplementation(), batch=True)
+    db.parse_string(doc)
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    nRecs = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    doc = gen_doc(nRecs)
+    mb = len(doc) / (1 << 20)
+    print(f"{nRecs} records, {mb:.1f} MB.")
+    print(f"{'Task':>26} {'Seconds':>9} {'MB/s':>8}")
+    print("-" * 45)
+    for label, fn in [
+        ("Thor events", lambda: parse_events("thor", doc)),
+        ("expat engine events", lambda: parse_events("expat", doc)),
+        ("Thor + basedom", lambda: build_dom("thor", doc)),
+        ("expat engine + basedom", lambda: build_dom("expat", doc)),
+        ("minidom.parseString", lambda: minidom.parseString(doc)),
+        ]:
+        secs = time_it(fn)
+        print(f"{label:>26} {secs:>9.3f} {mb/secs:>8.2f}")
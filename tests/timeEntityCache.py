@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+#
+# timeEntityCache: Parse documents that each reference the same external
+# entities many times, with and without the shared entity text cache.
+#
+import os
+import sys
+import time
+import shutil
+import logging
+import tempfile
+
+import stackreader
+import thor
+
+def gen_files(tdir:str, nEntities:int, nRefs:int) -> str:
+    dcls = ""
+    for i in range(nEntities):
+        path = os.path.join(tdir, f"frag{i}.xml")
+        with open(path, "w", encoding="utf-8") as ofh:
+            ofh.write(f"<note n='{i}'>Shared boilerplate paragraph {i}.</note>\n" * 20)
+        dcls += f'<!ENTITY frag{i} SYSTEM "{path}">\n'
+    refs = "".join(f"<sec>&frag{i % nEntities};</sec>\n" for i in range(nRefs))
+    docPath = os.path.join(tdir, "doc.xml")
+    with open(docPath, "w", encoding="utf-8") as ofh:
+        ofh.write(f"<!DOCTYPE doc [\n{dcls}]>\n<doc>\n{refs}</doc>\n")
+    return docPath
+
+def time_docs(docPath:str, nDocs:int, useCache:bool) -> float:
+    stackreader.entityTextCache.clear()
+    start = time.perf_counter()
+    for _ in range(nDocs):
+        xsp = thor.XSParser(options={ "entityCache": useCache })
+        with open(docPath, "rb") as ifh:
+            xsp.ParseFile(ifh)
+    return time.perf_counter() - start
+
+if __name__ == "__main__":
+    logging.disable(logging.WARNING)
+    nDocs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    nRefs = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    tdir = tempfile.mkdtemp(prefix="timeEntityCache")
+    try:
+        docPath = gen_files(tdir, nEntities=10, nRefs=nRefs)
+        print(f"{nDocs} documents, {nRefs} external entity refs each.")
+        print(f"{'Mode':>10} {'Seconds':>9} {'ms/doc':>8}")
+        print("-" * 29)
+        for useCache in [ False, True ]:
+            secs = time_docs(docPath, nDocs, useCache)
+            print(f"{'cache' if useCache else 'no cache':>10} {secs:>9.2f} {secs/nDocs*1000:>8.2f}")
+        print(f"Cache: {stackreader.entityTextCache.hits} hits, "
+            f"{stackreader.entityTextCache.misses} misses.")
+    finally:
+        shutil.rmtree(tdir)
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+#
+# timeFacetCheck: Check a mix of typical attribute values against their
+# XSD datatypes, the old way (look everything up in the type dict on each
+# call), via facetCheck(), and via checkers fetched once (with and
+# without a small LRU of results).
+#
+import sys
+import time
+import re
+
+from runeheim import WSHandler
+from xsdtypes import XSDDatatypes, XsdFacet, facetCheck
+
+SAMPLES = [
+    ("ID", "sec_2.1"), ("IDREF", "fig12"), ("NMTOKEN", "blockquote"),
+    ("NMTOKENS", "ul ol dl"), ("IDREFS", "n1 n2 n3"), ("token", " a  token "),
+    ("string", "Some text & more."), ("boolean", "true"), ("int", "-31415"),
+    ("unsignedByte", "200"), ("nonNegativeInteger", "42"), ("decimal", "3.14"),
+    ("language", "en-US"), ("date", "2024-02-29"), ("QName", "xlink:href"),
+    ("byte", "300"), ("NCName", "a:b"),  # A couple of failures, too
+]
+
+def dictWalkCheck(val:str, typ:str) -> XsdFacet:
+    """Essentially the per-call logic facetCheck() used to have (minus the
+    list-type handling), as a baseline.
+    """
+    typeSpec = XSDDatatypes[typ]
+    sval = str(val)
+    if "variety" in typeSpec and typeSpec["variety"] == "union":
+        return XsdFacet.variety
+    if "pybase" in typeSpec and typeSpec["pybase"] is not None:
+        try:
+            _castVal = typeSpec["pybase"](sval)
+        except (TypeError, ValueError):
+            return XsdFacet.pybase
+    if "whiteSpace" in typeSpec:
+        if typeSpec["whiteSpace"] == "collapse":
+            sval = WSHandler.xcollapseSpace(sval)
+        elif typeSpec["whiteSpace"] == "replace":
+            sval = WSHandler.xreplaceSpace(sval)
+    if "pattern" in typeSpec:
+        if not re.fullmatch(typeSpec["pattern"], sval, flags=0):
+            return XsdFacet.pattern
+    for facet in ("minInclusive", "maxInclusive"):
+        if facet in typeSpec:
+            if facet == "minInclusive" and int(val) < typeSpec[facet]:
+                return XsdFacet.minInclusive
+            if facet == "maxInclusive" and int(val) > typeSpec[facet]:
+                return XsdFacet.maxInclusive
+    if "fractionDigits" in typeSpec:
+        if len(sval.partition(".")[2]) > typeSpec["fractionDigits"]:
+            return XsdFacet.fractionDigits
+    return None
+
+def timeIt(label:str, check, pairs, nReps:int) -> float:
+    start = time.perf_counter()
+    for _i in range(nReps):
+        for typ, val in pairs:
+            check(typ, val)
+    secs = time.perf_counter() - start
+    n = nReps * len(pairs)
+    print(f"{label:<24} {secs:>9.3f} {n/secs/1000:>11.0f}")
+    return secs
+
+if __name__ == "__main__":
+    nReps = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    checkers = { typ: XSDDatatypes[typ].getChecker() for typ, _v in SAMPLES }
+    lruCheckers = { typ: XSDDatatypes[typ].getChecker(cacheSize=256)
+        for typ, _v in SAMPLES }
+
+    for typ, val in SAMPLES:
+        if typ in ("NMTOKENS", "IDREFS"): continue  # Old list handling broke
+        assert dictWalkCheck(val, typ) == checkers[typ](val), (typ, val)
+
+    print(f"{'Label':<24} {'Seconds':>9} {'K checks/s':>11}")
+    print("-" * 46)
+    base = timeIt("dict walk", lambda t, v: dictWalkCheck(v, t), SAMPLES, nReps)
+    timeIt("facetCheck(name)", lambda t, v: facetCheck(v, t), SAMPLES, nReps)
+    comp = timeIt("compiled checker", lambda t, v: checkers[t](v), SAMPLES, nReps)
+    lru = timeIt("compiled + LRU", lambda t, v: lruCheckers[t](v), SAMPLES, nReps)
+    print(f"Speedup: compiled {base/comp:.1f}x, with LRU {base/lru:.1f}x")
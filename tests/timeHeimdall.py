@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+#
+# timeHeimdall: Validate generated documents of growing size with Heimdall
+# between expat and a do-nothing consumer, feeding the text in chunks.
+# No DOM is built, so peak memory should stay flat as the document grows
+# (apart from the set of ID values, which is kept small here).
+#
+import sys
+import time
+import tracemalloc
+from xml.parsers import expat
+
+from heimdall import Heimdall
+
+DTD = """<!DOCTYPE doc [
+<!ELEMENT doc (rec+)>
+<!ELEMENT rec (title, (p | note)*)>
+<!ATTLIST rec n CDATA #REQUIRED kind (a|b) "a">
+<!ELEMENT title (#PCDATA)>
+<!ELEMENT p (#PCDATA | i)*>
+<!ELEMENT i (#PCDATA)>
+<!ELEMENT note EMPTY>
+]>
+"""
+
+def gen_chunks(nRecs:int, perChunk:int=1000):
+    yield DTD + "<doc>\n"
+    rec = ('<rec n="%d" kind="b"><title>Record</title><p>Some <i>mixed</i>'
+        ' text.</p><note/><p>More.</p></rec>\n')
+    for i in range(0, nRecs, perChunk):
+        yield "".join(rec % j for j in range(i, min(i + perChunk, nRecs)))
+    yield "</doc>\n"
+
+def validate(nRecs:int) -> (float, int, int):
+    hv = Heimdall()
+    p = expat.ParserCreate()
+    p.StartElementHandler = lambda name, attrs: None
+    hv.attach(p)
+    nBytes = 0
+    tracemalloc.start()
+    start = time.perf_counter()
+    for chunk in gen_chunks(nRecs):
+        nBytes += len(chunk)
+        p.Parse(chunk, False)
+    p.Parse("", True)
+    hv.finish()
+    secs = time.perf_counter() - start
+    _cur, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert hv.isValid, hv.errors[:3]
+    return secs, nBytes, peak
+
+if __name__ == "__main__":
+    nRecs = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    print(f"{'Records':>9} {'MB':>7} {'Seconds':>9} {'MB/s':>7} {'Peak KB':>9}")
+    print("-" * 45)
+    for n in [ nRecs, nRecs * 4, nRecs * 16 ]:
+        secs, nBytes, peak = validate(n)
+        mb = nBytes / (1 << 20)
+        print(f"{n:>9} {mb:>7.1f} {secs:>9.2f} {mb/secs:>7.2f} {peak/1024:>9.0f}")
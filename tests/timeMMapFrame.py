@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+#
+# timeMMapFrame: Compare reading a big file through the chunked InputFrame
+# vs. MMapInputFrame.
+#
+# Usage: timeMMapFrame.py [megabytes]    (default 1024, i.e. a 1 GB file)
+#
+import sys
+import os
+import time
+import tempfile
+
+from stackreader import InputFrame, MMapInputFrame
+import thor
+
+class CountingFile:
+    """Wrap a binary file to count read() calls (each one is a syscall).
+    """
+    def __init__(self, path:str):
+        self.fh = open(path, "rb")
+        self.name = path
+        self.nReads = 0
+    def read(self, n:int=-1) -> bytes:
+        self.nReads += 1
+        return self.fh.read(n)
+    def close(self) -> None:
+        self.fh.close()
+
+def gen_file(path:str, megabytes:int) -> int:
+    """Write a flat, mostly-text document of about the given size.
+    """
+    rec = ('<rec id="r%08d" type="sample">Some text with a little '
+        'markup, <i>like this</i>, and an entity &amp; a\nnewline.</rec>\n')
+    target = megabytes << 20
+    written = 0
+    with open(path, "w", encoding="utf-8") as ofh:
+        ofh.write("<doc>\n")
+        i = 0
+        while written < target:
+            chunk = ''.join(rec % (i+j) for j in range(1000))
+            ofh.write(chunk)
+            written += len(chunk)
+            i += 1000
+        ofh.write("</doc>\n")
+    return os.path.getsize(path)
+
+def read_all(fr:InputFrame) -> int:
+    """Walk the whole frame, roughly the way parseDocument() moves through text.
+    """
+    while fr.peek(1) is not None:
+        fr.readTextRun()
+        fr.discard(1)
+    fr.dropUsedPart(0)
+    return fr.fullOffset
+
+def time_frame(fr:InputFrame, theFile) -> (float, int):
+    start = time.perf_counter()
+    fr.addFile(theFile)
+    nChars = read_all(fr)
+    return time.perf_counter() - start, nChars
+
+if __name__ == "__main__":
+    megabytes = int(sys.argv[1]) if len(sys.argv) > 1 else 1024
+    path = os.path.join(tempfile.gettempdir(), "timeMMapFrame.xml")
+    print(f"Generating {megabytes} MB in {path}...")
+    nBytes = gen_file(path, megabytes)
+    mb = nBytes / (1 << 20)
+    try:
+        print(f"{'Frame':>24} {'Seconds':>9} {'MB/s':>8} {'Refills':>9} {'Chars':>12}")
+        print("-" * 66)
+        opts = thor.XSPOptions()
+        for bufSize in [ 1024, 1<<16 ]:
+            cf = CountingFile(path)
+            secs, nChars = time_frame(InputFrame(bufSize=bufSize, options=opts), cf)
+            print(f"{'InputFrame/' + str(bufSize):>24} {secs:>9.2f} {mb/secs:>8.1f} "
+                f"{cf.nReads:>9} {nChars:>12}")
+            cf.close()
+        for bufSize in [ 1<<22, 1<<24 ]:
+            fr = MMapInputFrame(bufSize=bufSize, options=opts)
+            secs, nChars = time_frame(fr, path)
+            nWindows = -(-nBytes // bufSize)
+            print(f"{'MMapInputFrame/' + str(bufSize):>24} {secs:>9.2f} {mb/secs:>8.1f} "
+                f"{nWindows:>9} {nChars:>12}")
+            fr.close()
+    finally:
+        os.remove(path)
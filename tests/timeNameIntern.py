@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+#
+# timeNameIntern: Memory held by a DOM built with Thor + DomBuilder, with
+# and without interning element and attribute names (option internNames).
+#
+# Usage: timeNameIntern.py [nElements]    (default 1M elements)
+#
+import sys
+import gc
+import time
+import logging
+import tracemalloc
+
+import basedom
+import dombuilder
+import thor
+
+def gen_doc(nElements:int) -> str:
+    rec = '<rec id="r%d" type="x"><name lang="en">n</name><val unit="m">1</val></rec>\n'
+    return "<doc>\n" + "".join(rec % i for i in range(nElements // 3)) + "</doc>\n"
+
+def measure(doc:str, intern:bool) -> (float, int, float):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    xsp = thor.XSParser(options={ "internNames": intern })
+    db = dombuilder.DomBuilder(parserClass=xsp,
+        domImpl=basedom.getDOMImplementation(), batch=True)
+    theDoc = db.parse_string(doc)
+    secs = time.perf_counter() - start
+    used, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    recs = theDoc.documentElement.childNodes
+    distinct = len(set(id(n.nodeName) for n in recs if n.nodeType == 1))
+    del theDoc, db, xsp
+    return secs, distinct, used / (1 << 20)
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    nElements = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    doc = gen_doc(nElements)
+    print(f"{nElements} elements, {len(doc)/(1<<20):.1f} MB of XML.")
+    print(f"{'Names':>10} {'Seconds':>9} {'DOM MB':>9} {'distinct <rec> name objects':>28}")
+    print("-" * 59)
+    for intern in [ False, True ]:
+        secs, distinct, mb = measure(doc, intern)
+        print(f"{'interned' if intern else 'copies':>10} {secs:>9.2f} {mb:>9.1f} {distinct:>28}")
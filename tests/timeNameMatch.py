@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+#
+# timeNameMatch: Compare matching names on a slice of the rest of the buffer
+# (as InputFrame.readRegex() used to), against matching in place at bufPos.
+#
+import io
+import re
+import time
+import random
+import statistics
+
+from runeheim import XmlStrings as Rune
+from stackreader import InputFrame
+import thor
+
+def gen_names(n:int) -> str:
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ' '.join(
+        ''.join(random.choice(letters) for _ in range(random.randint(2, 10)))
+        for _ in range(n))
+
+def read_by_slice(fr:InputFrame) -> int:
+    n = 0
+    while True:
+        fr.skipSpaces()
+        fr.topOff()
+        mat = re.match(Rune.QName_re, fr.buf[fr.bufPos:], flags=re.I)
+        if not mat: break
+        fr.bufPos += len(mat.group())
+        n += 1
+    return n
+
+def read_in_place(fr:InputFrame) -> int:
+    n = 0
+    while fr.readName(ss=True):
+        n += 1
+    return n
+
+def time_read(fn, data:str, bufSize:int, repeats:int=5) -> float:
+    """bufSize 0 means a literal string frame, with everything in the buffer
+    (which is what XSParser.Parse() does).
+    """
+    times = []
+    for _ in range(repeats):
+        fr = InputFrame(bufSize=bufSize, options=thor.XSPOptions())
+        if bufSize: fr.addFile(io.BytesIO(data.encode("utf-8")))
+        else: fr.addData(data)
+        start = time.perf_counter()
+        fn(fr)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+if __name__ == "__main__":
+    random.seed(42)
+    nNames = 20000
+    data = gen_names(nNames)
+    print(f"{nNames} names, {len(data)} chars.")
+    print(f"{'bufSize':>10} {'slice ns/name':>14} {'inPlace ns/name':>16} {'Speedup':>8}")
+    print("-" * 52)
+    for bufSize in [ 512, 1024, 4096, 16384, 65536, 0 ]:
+        tSlice = time_read(read_by_slice, data, bufSize)
+        tPlace = time_read(read_in_place, data, bufSize)
+        print(f"{bufSize or 'string':>10} {tSlice*1e9/nNames:>14.0f} "
+            f"{tPlace*1e9/nNames:>16.0f} {tSlice/tPlace:>8.1f}")
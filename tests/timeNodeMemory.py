@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+#
+# timeNodeMemory: Build a document of about N nodes (default 1M) through the
+# DOM API -- each record is an Element with one Attr and one Text child --
+# and report traced bytes per node, plus the fixed size of each node class.
+#
+import sys
+import time
+import tracemalloc
+
+from basedom import getDOMImplementation
+
+def build(nNodes:int) -> (float, int, object):
+    impl = getDOMImplementation()
+    doc = impl.createDocument(None, "doc", None)
+    root = doc.documentElement
+    nRecs = nNodes // 3
+    tracemalloc.start()
+    start = time.perf_counter()
+    for i in range(nRecs):
+        e = doc.createElement("rec")
+        e.setAttribute("n", "v")
+        e.appendChild(doc.createTextNode("Some text."))
+        root.appendChild(e)
+    secs = time.perf_counter() - start
+    cur, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return secs, cur, doc
+
+def shallowSize(node) -> int:
+    """Bytes for the object itself plus its instance __dict__, if it has one.
+    """
+    size = sys.getsizeof(node)
+    if hasattr(node, "__dict__"):
+        size += sys.getsizeof(node.__dict__)
+    return size
+
+if __name__ == "__main__":
+    nNodes = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    secs, nBytes, doc = build(nNodes)
+    rec = doc.documentElement.childNodes[0]
+    n = (nNodes // 3) * 3
+    print(f"{'Nodes':>9} {'Seconds':>9} {'MB':>8} {'Bytes/node':>11}")
+    print("-" * 40)
+    print(f"{n:>9} {secs:>9.2f} {nBytes/(1<<20):>8.1f} {nBytes/n:>11.0f}")
+    print()
+    for label, node in [ ("Element", rec), ("Attr", rec.getAttributeNode("n")),
+        ("Text", rec.childNodes[0]) ]:
+        print(f"{label:<8} {shallowSize(node):>5} bytes (object + any __dict__)")
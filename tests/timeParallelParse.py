@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+#
+# timeParallelParse: Parse one big flat document with Thor, straight through
+# vs. with thor.parseEventsParallel() at various numbers of workers.
+#
+# Usage: timeParallelParse.py [megabytes]    (default 16)
+#
+import sys
+import os
+import time
+
+import thor
+
+def gen_doc(megabytes:float) -> str:
+    rec = ('<rec id="r%d" type="sample">Some text with a little markup, '
+        '<i>like this</i>, and an entity &amp; a\nnewline.</rec>\n')
+    buf = [ "<doc>\n" ]
+    size, i = 0, 0
+    while size < megabytes * (1 << 20):
+        buf.append(rec % i)
+        size += len(buf[-1])
+        i += 1
+    buf.append("</doc>\n")
+    return "".join(buf)
+
+if __name__ == "__main__":
+    megabytes = float(sys.argv[1]) if len(sys.argv) > 1 else 16
+    doc = gen_doc(megabytes)
+    mb = len(doc) / (1 << 20)
+    nCores = os.cpu_count() or 1
+    print(f"{mb:.1f} MB document, {nCores} cores.")
+    print(f"{'Workers':>10} {'Seconds':>9} {'MB/s':>8} {'Speedup':>8}")
+    print("-" * 38)
+
+    start = time.perf_counter()
+    expected = thor.recordParseEvents(doc)
+    base = time.perf_counter() - start
+    print(f"{'(serial)':>10} {base:>9.2f} {mb/base:>8.2f} {1:>8.2f}")
+
+    for workers in sorted(set([ 1, 2, 4, 8, nCores ])):
+        start = time.perf_counter()
+        events = thor.parseEventsParallel(doc, workers=workers, minPieceSize=1<<16)
+        secs = time.perf_counter() - start
+        assert events == expected
+        print(f"{workers:>10} {secs:>9.2f} {mb/secs:>8.2f} {base/secs:>8.2f}")
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+#
+# timeParseMany: Throughput of dombuilder.parseMany() by number of worker
+# processes, on a directory of generated files.
+#
+# Usage: timeParseMany.py [nFiles [recsPerFile]]    (default 400 files of 200)
+#
+import sys
+import os
+import time
+import shutil
+import tempfile
+
+import dombuilder
+
+def gen_files(dirPath:str, nFiles:int, recsPerFile:int) -> (list, int):
+    rec = '<rec id="r%d" type="sample">Text with <i>some</i> markup &amp; more.</rec>\n'
+    doc = "<doc>\n" + "".join(rec % i for i in range(recsPerFile)) + "</doc>\n"
+    paths = []
+    for i in range(nFiles):
+        path = os.path.join(dirPath, f"doc{i:05}.xml")
+        with open(path, "w", encoding="utf-8") as ofh:
+            ofh.write(doc)
+        paths.append(path)
+    return paths, nFiles * len(doc)
+
+if __name__ == "__main__":
+    nFiles = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    recsPerFile = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    dirPath = tempfile.mkdtemp(prefix="timeParseMany")
+    try:
+        paths, nChars = gen_files(dirPath, nFiles, recsPerFile)
+        mb = nChars / (1 << 20)
+        nCores = os.cpu_count() or 1
+        counts = sorted(set([ 1, 2, 4, 8, 16, nCores ]))
+        print(f"{nFiles} files, {mb:.1f} MB, {nCores} cores.")
+        for parser in [ "thor", "expat" ]:
+            print(f"\n{parser:>6} {'Workers':>8} {'Seconds':>9} {'MB/s':>8} {'Speedup':>8}")
+            print("-" * 43)
+            base = None
+            for workers in counts:
+                if workers > nCores * 2: continue
+                start = time.perf_counter()
+                results = dombuilder.parseMany(paths, parser=parser,
+                    output="events", workers=workers)
+                secs = time.perf_counter() - start
+                assert all(results)
+                base = base or secs
+                print(f"{'':>6} {workers:>8} {secs:>9.2f} {mb/secs:>8.2f} "
+                    f"{base/secs:>8.2f}")
+    finally:
+        shutil.rmtree(dirPath)
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+#
+# timePlainLoop: Thor on plain XML, with the option-free main loop
+# (XSParser.parseDocumentPlain) and with the general, option-aware one.
+#
+import sys
+import time
+import statistics
+
+from saxplayer import SaxEvent
+import thor
+
+class GeneralLoopParser(thor.XSParser):
+    def isPlainXml(self) -> bool:
+        return False
+
+def gen_doc(nRecs:int) -> str:
+    rec = ('<rec id="r%d"><title>Record &amp; title</title><!-- note -->'
+        '<p>Some <i>mixed</i> text, &#169; 2025.</p><br/></rec>\n')
+    return "<doc>\n" + "".join(rec % i for i in range(nRecs)) + "</doc>\n"
+
+def time_parse(parserClass:type, doc:str, repeats:int=3) -> (float, list):
+    times = []
+    for _ in range(repeats):
+        events = []
+        xsp = parserClass()
+        xsp.BatchHandler = events.extend
+        start = time.perf_counter()
+        xsp.Parse(doc)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), events
+
+if __name__ == "__main__":
+    nRecs = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    doc = gen_doc(nRecs)
+    mb = len(doc) / (1 << 20)
+    print(f"{nRecs} records, {mb:.1f} MB.")
+    print(f"{'Loop':>10} {'Seconds':>9} {'MB/s':>8}")
+    print("-" * 29)
+    results = {}
+    for label, cls in [ ("general", GeneralLoopParser), ("plain", thor.XSParser) ]:
+        secs, events = time_parse(cls, doc)
+        results[label] = [ ev[:2] for ev in events ]
+        print(f"{label:>10} {secs:>9.2f} {mb/secs:>8.2f}")
+    assert results["general"] == results["plain"], "Events differ!"
+    assert any(ev[0] == SaxEvent.COMMENT for ev in results["plain"])
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+#
+# timeProfile: Thor with and without options.profile, and the per-construct
+# breakdown that getStats() reports. The unprofiled run uses the same general
+# loop, so the difference is the cost of the timing wrappers alone.
+#
+import sys
+import time
+import statistics
+
+import thor
+
+class GeneralLoopParser(thor.XSParser):
+    def isPlainXml(self) -> bool:
+        return False
+
+def gen_doc(nRecs:int) -> str:
+    rec = ('<rec id="r%d"><title>Record &amp; &e; title</title><!-- note -->'
+        '<p>Some <i>mixed</i> text, &#169; 2025.</p><?pi x?><br/></rec>\n')
+    return ('<!DOCTYPE doc [<!ENTITY e "<b>ent</b>">]>\n<doc>\n'
+        + "".join(rec % i for i in range(nRecs)) + "</doc>\n")
+
+def time_parse(options:dict, doc:str, repeats:int=3) -> (float, thor.XSParser):
+    times = []
+    for _ in range(repeats):
+        xsp = GeneralLoopParser(options=options)
+        xsp.BatchHandler = lambda evs: None
+        start = time.perf_counter()
+        xsp.Parse(doc)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), xsp
+
+if __name__ == "__main__":
+    nRecs = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    doc = gen_doc(nRecs)
+    mb = len(doc) / (1 << 20)
+    print(f"{nRecs} records, {mb:.1f} MB.")
+    print(f"{'Profile':>10} {'Seconds':>9} {'MB/s':>8}")
+    print("-" * 29)
+    for label, options in [ ("off", None), ("on", { "profile": True }) ]:
+        secs, xsp = time_parse(options, doc)
+        print(f"{label:>10} {secs:>9.2f} {mb/secs:>8.2f}")
+    stats = xsp.getStats()
+    print(f"\n{'Construct':>12} {'Count':>9} {'Seconds':>9}")
+    print("-" * 32)
+    for name, n in stats["counts"].items():
+        if n: print(f"{name:>12} {n:>9} {stats['seconds'][name]:>9.3f}")
+    print(f"\nchars {stats['chars']}, {stats['charsPerSec']:.0f} chars/s, "
+        f"refills {stats['refills']}, maxEntityDepth {stats['maxEntityDepth']}")
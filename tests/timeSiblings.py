@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+#
+# timeSiblings: Compare the SiblingImpl choices (COUNT, CHNUM, LINKS) on a
+# wide tree (one parent, many children) and a narrow one (fanout 10), for:
+#   build    -- appendChild everything
+#   walk     -- follow nextSibling across every child, then getChildIndex()
+#   edit     -- random insertBefore/removeChild, each followed by a
+#               nextSibling and a getChildIndex() near the change
+# ADAPT starts as CHNUM with Document.setAdaptiveSiblings() on, and also
+# lists the switches it made.
+#
+import sys
+import time
+import random
+
+from basedom import Document, SiblingImpl
+
+def build(impl:SiblingImpl, nNodes:int, fanout:int) -> Document:
+    doc = Document(qualifiedName="doc")
+    if impl is None: doc.setAdaptiveSiblings(window=1024)
+    else: doc._updateChildSiblingImpl(impl)
+    parents = [ doc.documentElement ]
+    made = 0
+    while made < nNodes:
+        nextParents = []
+        for par in parents:
+            for _i in range(fanout):
+                ch = doc.createElement("p")
+                par.appendChild(ch)
+                nextParents.append(ch)
+                made += 1
+                if made >= nNodes: break
+            if made >= nNodes: break
+        parents = nextParents
+    return doc
+
+def walk(doc:Document) -> None:
+    stack = [ doc.documentElement ]
+    while stack:
+        par = stack.pop()
+        if len(par) == 0: continue
+        ch = par.childNodes[0]
+        while ch is not None:
+            stack.append(ch)
+            ch = ch.nextSibling
+        par.childNodes[-1].getChildIndex()
+
+def edit(doc:Document, nEdits:int) -> None:
+    parents = [ doc.documentElement ] + [ ch for ch in doc.documentElement
+        .descendants() if len(ch) > 0 ]
+    rnd = random.Random(2)
+    for i in range(nEdits):
+        par = parents[rnd.randrange(len(parents))]
+        k = rnd.randrange(len(par))
+        if i % 2:
+            par.removeChild(par.childNodes[k])
+            ch = par.childNodes[min(k, len(par) - 1)]
+        else:
+            ch = doc.createElement("ins")
+            par.insertBefore(ch, par.childNodes[k])
+        ch.nextSibling
+        ch.getChildIndex()
+
+def timeIt(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+if __name__ == "__main__":
+    nNodes = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    nEdits = 2000
+    print(f"{nNodes} nodes, {nEdits} edits")
+    print(f"{'Shape':<8} {'Impl':<6} {'build':>8} {'walk':>8} {'edit':>8}")
+    print("-" * 42)
+    for shape, fanout in [ ("wide", nNodes), ("narrow", 10) ]:
+        for impl in (SiblingImpl.COUNT, SiblingImpl.CHNUM, SiblingImpl.LINKS, None):
+            label = impl.name if impl else "ADAPT"
+            try:
+                start = time.perf_counter()
+                doc = build(impl, nNodes, fanout)
+                b = time.perf_counter() - start
+                w = timeIt(lambda: walk(doc))
+                e = timeIt(lambda: edit(doc, nEdits))
+                print(f"{shape:<8} {label:<6} {b:>8.3f} {w:>8.3f} {e:>8.3f}", end="")
+                if impl is None:
+                    print("  " + " ".join(x.name for x in doc._sibStats.switches), end="")
+                print()
+            except Exception as ex:
+                print(f"{shape:<8} {label:<6} failed: {type(ex).__name__}: {ex}")
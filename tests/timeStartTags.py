@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+#
+# timeStartTags: Thor on a start-tag-heavy document, with the one-regex
+# plain start-tag path (XSParser.readStartTagFast) and with it disabled.
+#
+import sys
+import time
+import statistics
+from typing import List
+
+import thor
+
+class GeneralPathParser(thor.XSParser):
+    def readStartTagFast(self):
+        return None
+
+def gen_doc(nRecs:int) -> str:
+    rec = ('<rec id="r%d" type="sample" lang="en"><a href="x.html" class="link"/>'
+        '<b n="1" m=\'2\'/><c/></rec>\n')
+    return "<doc>\n" + "".join(rec % i for i in range(nRecs)) + "</doc>\n"
+
+def time_parse(parserClass:type, doc:str, repeats:int=3) -> (float, List):
+    times = []
+    for _ in range(repeats):
+        starts = []
+        xsp = parserClass()
+        xsp.StartElementHandler = lambda name, attrs: starts.append((name, dict(attrs)))
+        start = time.perf_counter()
+        xsp.Parse(doc)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), starts
+
+if __name__ == "__main__":
+    nRecs = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    doc = gen_doc(nRecs)
+    mb = len(doc) / (1 << 20)
+    print(f"{nRecs * 4} start-tags, {mb:.1f} MB.")
+    print(f"{'Path':>10} {'Seconds':>9} {'MB/s':>8}")
+    print("-" * 29)
+    results = {}
+    for label, cls in [ ("general", GeneralPathParser), ("fast", thor.XSParser) ]:
+        secs, starts = time_parse(cls, doc)
+        results[label] = starts
+        print(f"{label:>10} {secs:>9.2f} {mb/secs:>8.2f}")
+    assert results["general"] == results["fast"], "Start-tag events differ!"
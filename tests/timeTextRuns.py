@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+#
+# timeTextRuns: Compare char-by-char text scanning with InputFrame.readTextRun().
+#
+import io
+import time
+import random
+import statistics
+
+from stackreader import InputFrame
+import thor
+
+WORDS = "lorem ipsum dolor sit amet consectetur adipiscing elit sed do".split()
+
+def gen_text_doc(nParas:int, wordsPerPara:int=120, markupRatio:float=0.02) -> str:
+    """Generate a text-dominated document, with occasional inline markup.
+    """
+    buf = [ "<doc>\n" ]
+    for _ in range(nParas):
+        buf.append("<p>")
+        for _ in range(wordsPerPara):
+            r = random.random()
+            if r < markupRatio: buf.append("<i>%s</i> " % random.choice(WORDS))
+            elif r < markupRatio * 1.5: buf.append("&amp; ")
+            else: buf.append(random.choice(WORDS) + " ")
+            if random.random() < 0.1: buf.append("\n")
+        buf.append("</p>\n")
+    buf.append("</doc>\n")
+    return ''.join(buf)
+
+def scan_by_char(fr:InputFrame) -> int:
+    """The old parseDocument() text loop, minus the parser around it.
+    """
+    n = 0
+    while fr.peek(1) is not None:
+        tBuf = []
+        while True:
+            c = fr.peek(1)
+            if c is None or c in InputFrame.firstDelims: break
+            tBuf.append(c)
+            fr.consume(1)
+        n += len(''.join(tBuf))
+        fr.discard(1)  # Step over the delimiter
+    return n
+
+def scan_by_run(fr:InputFrame) -> int:
+    n = 0
+    while fr.peek(1) is not None:
+        n += len(fr.readTextRun())
+        fr.discard(1)
+    return n
+
+def time_scan(fn, doc:str, repeats:int=5) -> float:
+    times = []
+    for _ in range(repeats):
+        fr = InputFrame(options=thor.XSPOptions())
+        fr.addFile(io.BytesIO(doc.encode("utf-8")))
+        start = time.perf_counter()
+        fn(fr)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+def time_thor(doc:str, repeats:int=3) -> float:
+    times = []
+    for _ in range(repeats):
+        p = thor.XSParser()
+        p.CharacterDataHandler = lambda data: None
+        start = time.perf_counter()
+        p.ParseFile(io.BytesIO(doc.encode("utf-8")))
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+if __name__ == "__main__":
+    random.seed(42)
+    print(f"{'Chars':>10} {'byChar MB/s':>12} {'byRun MB/s':>12} {'Speedup':>8} {'Thor MB/s':>10}")
+    print("-" * 56)
+    for nParas in [ 100, 1000, 5000 ]:
+        doc = gen_text_doc(nParas)
+        mb = len(doc) / (1 << 20)
+        tChar = time_scan(scan_by_char, doc)
+        tRun = time_scan(scan_by_run, doc)
+        tThor = time_thor(doc)
+        print(f"{len(doc):>10} {mb/tChar:>12.2f} {mb/tRun:>12.2f} "
+            f"{tChar/tRun:>8.1f} {mb/tThor:>10.2f}")
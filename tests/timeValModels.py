@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+#
+# timeValModels: Thor with and without options.valModels, which checks each
+# child against its parent's compiled content model (ContentAutomaton) as it
+# is parsed. Both runs use the general loop, so the difference is the cost
+# of validation alone.
+#
+import sys
+import time
+import statistics
+
+import thor
+
+class GeneralLoopParser(thor.XSParser):
+    def isPlainXml(self) -> bool:
+        return False
+
+DTD = """<!DOCTYPE doc [
+<!ELEMENT doc (rec+)>
+<!ELEMENT rec (title, (p | note)*, sig?)>
+<!ELEMENT title (#PCDATA)>
+<!ELEMENT p (#PCDATA | i | b)*>
+<!ELEMENT i (#PCDATA)>
+<!ELEMENT b (#PCDATA)>
+<!ELEMENT note EMPTY>
+<!ELEMENT sig (who & when)>
+<!ELEMENT who (#PCDATA)>
+<!ELEMENT when (#PCDATA)>
+]>
+"""
+
+def gen_doc(nRecs:int) -> str:
+    rec = ('<rec><title>Record %d</title><p>Some <i>mixed</i> and <b>bold</b>'
+        ' text.</p><note/><p>More.</p><sig><when>2025</when><who>me</who></sig></rec>\n')
+    return DTD + "<doc>\n" + "".join(rec % i for i in range(nRecs)) + "</doc>\n"
+
+def time_parse(options:dict, doc:str, repeats:int=3) -> float:
+    times = []
+    for _ in range(repeats):
+        xsp = GeneralLoopParser(options=options)
+        xsp.BatchHandler = lambda evs: None
+        start = time.perf_counter()
+        xsp.Parse(doc)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+if __name__ == "__main__":
+    nRecs = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    doc = gen_doc(nRecs)
+    mb = len(doc) / (1 << 20)
+    print(f"{nRecs} records, {mb:.1f} MB.")
+    print(f"{'valModels':>10} {'Seconds':>9} {'MB/s':>8}")
+    print("-" * 29)
+    for label, options in [ ("off", None), ("on", { "valModels": True }) ]:
+        secs = time_parse(options, doc)
+        print(f"{label:>10} {secs:>9.2f} {mb/secs:>8.2f}")
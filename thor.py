@@ -10,11 +10,18 @@
 #
 import os
 import codecs
+import copy
 import re
+import json
+import hashlib
+import threading
+import time
 import logging
-from typing import Union, List, Dict, Tuple, IO, Any
+from xml.parsers import expat
+from typing import Union, List, Dict, Tuple, IO, Any, Iterator, Callable
 from types import SimpleNamespace
 from collections import OrderedDict  #, namedtuple
+from concurrent.futures import ProcessPoolExecutor
 import inspect
 
 #import html
@@ -25,14 +32,16 @@ from saxplayer import SaxEvent
 from ragnaroktypes import NSuppE, DOMException, NMTOKEN_t, QName_t
 from schemera import (
     # (DocumentType is owned by StackReader)
-    ElementDef, Model,  RepType, ContentType,  # ModelGroup
-    AttrDef,  AttlistDef, EntitySpace, EntityDef, EntityParsing, NotationDef
+    ElementDef, Model,  ContentType, UNLIMITED,  # ModelGroup
+    AttrDef,  AttlistDef, EntitySpace, EntityDef, EntityParsing, NotationDef,
+    attrDefFromExpat, expatModelToString
     )
 import xsdtypes
 from xsdtypes import sgmlAttrDefaults, fixedKeyword, anyAttributeKeyword
 from xsdtypes import getSgmlAttrTypes  # , XSDDatatypes
 from basedom import Document
-from stackreader import InputFrame, StackReader, uname2codepoint
+from stackreader import (InputFrame, MMapInputFrame, FeedInputFrame,
+    FeedAborted, StackReader, uname2codepoint)
 
 lg = logging.getLogger("EntityManager")
 logging.basicConfig(level=logging.INFO, format='%(message)s')
@@ -71,6 +80,8 @@ class TagStackEntry:
         self.isSuspended = False    # Is it suspended?
         self.childTypes = []        # List of child types for validation
         self.attrs = {}              # To check against COID
+        self.automaton = None       # Compiled content model (valModels)
+        self.state = 0              # Current state in it
 
 class TagStack(list):
     """Mainly keeps the stack of open element type names, but has room for
@@ -101,7 +112,8 @@ class TagStack(list):
 
     def rindex(self, elemName:NMTOKEN_t) -> int:
         for i in reversed(range(len(self))):
-            if self[i].elemName == elemName: return i
+            name = self[i].elemName  # Interned, so usually the same object
+            if name is elemName or name == elemName: return i
         return None
 
     @property
@@ -147,6 +159,171 @@ class ErrorRecord:
             self.lineNumber, self.columnNumber, self.byteIndex)
 
 
+###############################################################################
+#
+class DTDCache:
+    """Keep external DTDs once parsed, so documents that use the same one
+    don't each re-read and re-parse it. Entries are keyed by public and
+    system ID, resolved path, and the file's mtime and size (so an edited
+    DTD is just a miss), and the least-recently used are dropped once more
+    than maxEntries are held.
+
+    In memory, this holds the finished schemera.DocumentType; mergeDoctype()
+    copies its definitions rather than changing them. On disk (if a cacheDir
+    is given) it keeps the list of parsed declarations instead, as JSON, which
+    just need re-adding to a new DocumentType. Loading that runs no code, but
+    the declarations are used as found, so cacheDir should be no more
+    writable by others than the DTDs themselves.
+    """
+    def __init__(self, maxEntries:int=64):
+        self.maxEntries = maxEntries
+        self.doctypes:OrderedDict = OrderedDict()
+        self.hits = 0
+        self.diskHits = 0
+        self.misses = 0
+        self.lock = threading.Lock()  # iterparse() et al. parse on threads
+
+    @staticmethod
+    def makeKey(publicId:str, systemId:str, path:str) -> Tuple:
+        st = os.stat(path)
+        return (publicId or "", systemId or "", os.path.realpath(path),
+            st.st_mtime_ns, st.st_size)
+
+    @staticmethod
+    def diskPath(key:Tuple, cacheDir:str) -> str:
+        return os.path.join(cacheDir,
+            hashlib.sha1(repr(key).encode("utf-8")).hexdigest() + ".json")
+
+    def get(self, key:Tuple) -> 'DocumentType':
+        with self.lock:
+            doctype = self.doctypes.get(key)
+            if doctype is not None: self.doctypes.move_to_end(key)
+            return doctype
+
+    def put(self, key:Tuple, doctype:'DocumentType') -> None:
+        with self.lock:
+            self.doctypes[key] = doctype
+            self.doctypes.move_to_end(key)
+            while len(self.doctypes) > self.maxEntries:
+                self.doctypes.popitem(last=False)
+
+    def getDcls(self, key:Tuple, cacheDir:str) -> List:
+        path = DTDCache.diskPath(key, cacheDir)
+        if not os.path.isfile(path): return None
+        try:
+            with open(path, "r", encoding="utf-8") as ifh:
+                return DTDCache.dclsFromJson(json.load(ifh))
+        except (OSError, ValueError, TypeError, KeyError, IndexError) as e:
+            lg.warning("Ignoring bad DTD cache file %s: %s", path, e)
+            return None
+
+    def putDcls(self, key:Tuple, cacheDir:str, dcls:List) -> None:
+        try:
+            data = DTDCache.dclsToJson(dcls)
+        except TypeError as e:
+            lg.warning("Not caching DTD on disk: %s", e)
+            return
+        os.makedirs(cacheDir, exist_ok=True)
+        path = DTDCache.diskPath(key, cacheDir)
+        tmpPath = f"{path}.{os.getpid()}.{threading.get_ident()}"
+        with open(tmpPath, "w", encoding="utf-8") as ofh:
+            json.dump(data, ofh)
+        os.replace(tmpPath, path)  # So concurrent parsers never see half a file
+
+    @staticmethod
+    def dclsToJson(dcls:List) -> List:
+        """Turn declarations as parsed (see XSParser.dclLog) into plain
+        lists, strings, and such. Raises TypeError for anything else.
+        """
+        items = []
+        for kind, e in dcls:
+            if kind == "ELEMENT":
+                e = list(e)
+                if isinstance(e[1], ContentType): e[1] = { "contentType": e[1].name }
+            elif kind == "ATTLIST":
+                e = [ e[0], [ {
+                    "elemName": ad.elemName, "attrName": ad.attrName,
+                    "attrType": list(ad.enumValues) if ad.enumValues else ad.attrType,
+                    "attrDft": ad.attrDft, "literal": ad.literal
+                    } for ad in e[1] ] ]
+            items.append([ kind, e ])
+        json.dumps(items)  # Fail here (not half-way through a file)
+        return items
+
+    @staticmethod
+    def dclsFromJson(items:List) -> List:
+        """Undo dclsToJson().
+        """
+        dcls = []
+        for kind, e in items:
+            if kind == "ELEMENT":
+                if isinstance(e[1], dict): e[1] = ContentType[e[1]["contentType"]]
+            elif kind == "ATTLIST":
+                e = [ e[0], [ AttrDef(elemNS=None, elemName=ad["elemName"],
+                    attrNS=None, attrName=ad["attrName"], attrType=ad["attrType"],
+                    attrDft=ad["attrDft"], literal=ad["literal"],
+                    ownerSchema=None, readOrder=None) for ad in e[1] ] ]
+            dcls.append((kind, tuple(e)))
+        return dcls
+
+    def clear(self) -> None:
+        with self.lock:
+            self.doctypes.clear()
+            self.hits = self.diskHits = self.misses = 0
+
+dtdCache = DTDCache()
+
+
+###############################################################################
+#
+class ParseStats:
+    """Counts and cumulative times per kind of construct, for one parser
+    (see options.profile and XSParser.getStats()). It works by replacing the
+    parser's reader methods (listed in 'constructs') with timed wrappers on
+    the instance, so there's no cost at all when profiling is off.
+    Nested constructs (such as a start-tag inside an entity) each count
+    their own time; "document" is the whole parse.
+    """
+    constructs = {  # name: (XSParser method, count only calls that found one)
+        "document":     ("parseTop",        False),
+        "xmlDcl":       ("readXmlDcl",      True),
+        "startTag":     ("readStartTag",    True),
+        "endTag":       ("readEndTag",      True),
+        "text":         ("readText",        False),
+        "charRef":      ("readNumericChar", True),
+        "entity":       ("openEntity",      False),
+        "comment":      ("readComment",     True),
+        "pi":           ("readPI",          True),
+        "cdata":        ("readMSOpening",   True),
+        "elementDcl":   ("readElementDcl",  True),
+        "attlistDcl":   ("readAttlistDcl",  True),
+        "entityDcl":    ("readEntityDcl",   True),
+        "notationDcl":  ("readNotationDcl", True),
+    }
+
+    def __init__(self):
+        self.counts:Dict[str, int] = {}
+        self.times:Dict[str, float] = {}
+
+    def instrument(self, parser:'XSParser') -> None:
+        for name, (methodName, hitsOnly) in ParseStats.constructs.items():
+            self.counts[name] = 0
+            self.times[name] = 0.0
+            setattr(parser, methodName,
+                self.timed(name, getattr(parser, methodName), hitsOnly))
+
+    def timed(self, name:str, fn:Callable, hitsOnly:bool) -> Callable:
+        counts, times, clock = self.counts, self.times, time.perf_counter
+        def wrapper(*args, **kwargs) -> Any:
+            start = clock()
+            rc = fn(*args, **kwargs)
+            times[name] += clock() - start
+            if rc or not hitsOnly: counts[name] += 1
+            return rc
+        return wrapper
+
+
+
 ###############################################################################
 #
 XSParserOptionDefs = {
@@ -173,13 +350,20 @@ XSParserOptionDefs = {
 
     ### Validation (beyond WF!),
     "useDTD":           (bool, False ),  # Use external DTD if available
+    "dtdCache":         (bool, True  ),  # Reuse parsed external DTDs
+    "dtdCacheDir":      (str,  None  ),  # Also keep parsed DTDs on disk here
+    "entityCache":      (bool, True  ),  # Share external entity text (LRU)
+    "internNames":      (bool, True  ),  # One str object per distinct name
+    "profile":          (bool, False ),  # Count and time constructs (getStats)
     "valElemNames":  (bool, False ),  # Element must be declared
-    "valModels":        (bool, False ),  # Check child sequences        TODO
+    "valModels":        (bool, False ),  # Check child sequences
     "valAttributeNames":(bool, False ),  # Attributes must be declared
     "valAttributeTypes":(bool, False ),  # Attribute values must match datatype
 
     ### Other
     "expatBreaks":      (bool, False ),  # Break at \n and entities like expat
+    "mmapFiles":        (bool, False ),  # mmap local files, not chunked reads
+    "batchSize":        (int,  1024  ),  # Max events per BatchHandler call
     "nsUsage":          (bool, None  ),  # one/global/noredef/regular    TODO
 }
 
@@ -245,11 +429,45 @@ class XSPOptions(SimpleNamespace):
 #
 def ParserCreate(
     encoding="utf-8",
-    namespace_separator=None  # Leaves xmlns as attrs, and prefixes as-is.
+    namespace_separator=None,  # Leaves xmlns as attrs, and prefixes as-is.
+    engine:str="thor",
+    options:Dict=None
     ) -> 'XSParser':
-    return XSParser(encoding=encoding, namespace_separator=namespace_separator)
+    """Make a parser. 'engine' can be "thor", or "expat" to have pyexpat do
+    the parsing, behind the same API (see ExpatParser).
+    """
+    if engine == "thor": parserClass = XSParser
+    elif engine == "expat": parserClass = ExpatParser
+    else: raise ValueError(f"Unknown parser engine '{engine}'.")
+    return parserClass(encoding=encoding,
+        namespace_separator=namespace_separator, options=options)
+
+def handlerProperty(typ:SaxEvent, default:Callable=None) -> property:
+    """Make the handler attribute for a SaxEvent (such as StartElementHandler),
+    so that assigning it rebuilds the parser's dispatch table. 'default' is a
+    handler method a subclass defined, used until something is assigned.
+    """
+    def getter(self) -> Callable:
+        if typ in self._handlers: return self._handlers[typ]
+        if default is not None: return default.__get__(self, type(self))
+        return None
+    def setter(self, cb:Callable) -> None:
+        self._handlers[typ] = cb
+        self.buildDispatch()
+    return property(getter, setter, doc=f"Handler for SaxEvent.{typ.name}.")
 
 class XSParser():  # StackReader?? TODO Check
+    def __init_subclass__(cls, **kwargs) -> None:
+        """Handler methods defined in a subclass would hide the handler
+        properties, so instance assignments would never reach buildDispatch().
+        Wrap them in properties of their own.
+        """
+        super().__init_subclass__(**kwargs)
+        for typ in SaxEvent:
+            meth = cls.__dict__.get(typ.value)
+            if callable(meth):
+                setattr(cls, typ.value, handlerProperty(typ, default=meth))
+
     def __init__(self,
         encoding:str="utf-8",
         namespace_separator:str=None,
@@ -257,6 +475,7 @@ class XSParser():  # StackReader?? TODO Check
         #super().__init__(encoding, namespace_separator, options)  # TODO Check
         self.encoding = encoding
         self.namespace_separator = namespace_separator
+        self._handlers = {}                 # Assigned XxxHandler attributes
 
         self.sr = StackReader(options=options)
         self.errors:List[ErrorRecord] = []
@@ -275,6 +494,21 @@ class XSParser():  # StackReader?? TODO Check
         self.sawSubsetOpen:bool = False     # Pending lsqb?
         self.totEvents = 1                  # Callback count
         self.dclCount = 0                   # For markup dcl ordering
+        self.dclLog = None                  # Parsed dcls, if keeping them
+        self.intern = {} if self.options.internNames else None  # (like expat)
+        self.stats = None                   # ParseStats, if options.profile
+        if self.options.profile:
+            self.stats = ParseStats()
+            self.stats.instrument(self)
+        self.feedFrame = None               # For incremental Parse()
+        self.feedThread = None              # Runs the parser for it
+        self.feedError = None               # Exception from feed thread
+        self.feedEvents = []                # Events for Parse() to deliver
+        self.eventSink = None               # Takes over doCB() for iterparse()
+        self.dispatch = {}                  # SaxEvent -> resolved handler
+        self._batchHandler = None           # Takes lists of events, if set
+        self.batch = []                     # Events not yet given to it
+        self.buildDispatch()
 
     def SynErr(self, msg:str) -> None:
         """Deal with a syntax error.
@@ -288,12 +522,12 @@ class XSParser():  # StackReader?? TODO Check
         """
         raise SyntaxError(
             "Validation error: %s at %s:\n    %s\n" %
-            (msg, self.sr.wholeLoc, self.sr.bufSample))
+            (msg, self.sr.wholeLoc(), self.sr.bufSample))
 
     def EntErr(self, msg:str) -> None:
         raise SyntaxError(
             "Entity error: %s at %s:\n    %s\n" %
-            (msg, self.sr.wholeLoc, self.sr.bufSample))
+            (msg, self.sr.wholeLoc(), self.sr.bufSample))
 
     def setOption(self, optName:str, optValue) -> None:
         self.options.setOption(optName, optValue)
@@ -310,7 +544,7 @@ class XSParser():  # StackReader?? TODO Check
 
     @property
     def CurrentLineNumber(self) -> int:
-        return self.sr.curFrame.lineNum
+        return self.sr.curFrame.fullLineNum
 
     @property
     def CurrentColumnNumber(self) -> int:  # TODO
@@ -364,13 +598,89 @@ class XSParser():  # StackReader?? TODO Check
 
     ### Top-level parser methods
     ###
-    def Parse(self, s:str) -> None:
-        if not isinstance(s, str) or not s.startswith("<"):
-            raise SyntaxError("Parser not given a '<'-initial string.")
-        iframe = InputFrame(options=self.options)
-        iframe.addData(s)
-        self.sr.open(iframe)
-        self.parseTop()
+    def Parse(self, s:Union[str, bytes], isfinal:bool=True) -> None:
+        """Parse a complete document from a string. Or, like expat, parse one
+        incrementally: call this with each chunk as it arrives (str or bytes)
+        and isfinal=False, then once with isfinal=True (that chunk may be
+        empty). State carries over between calls, so chunks can split tags,
+        references, or characters anywhere.
+
+        Incremental parsing runs the parser on its own thread, reading from a
+        FeedInputFrame. But it only runs while Parse() is waiting, and its
+        events are queued and then delivered by Parse() itself, so handlers
+        are called on the caller's thread, before the Parse() call that
+        supplied their data (or a later one) returns. If a handler raises, or
+        the caller stops feeding before isfinal, call close() (a handler
+        exception or syntax error from Parse() already does).
+        """
+        if self.feedFrame is None and isfinal:
+            if not isinstance(s, str) or not s.startswith("<"):
+                raise SyntaxError("Parser not given a '<'-initial string.")
+            iframe = InputFrame(options=self.options)
+            iframe.addData(s)
+            self.sr.open(iframe)
+            self.parseTop()
+            return
+
+        if self.feedFrame is None: self.startFeed()
+        self.feedFrame.feed(s, isFinal=isfinal)
+        events = self.feedEvents
+        self.feedEvents = []
+        deliver = type(self).doCB
+        try:
+            for typ, args in events: deliver(self, typ, *args)
+        except BaseException:
+            self.close()
+            raise
+        if self.feedError is not None:
+            e = self.feedError
+            self.close()
+            raise e
+        if self.feedFrame.isDone: self.finishFeed()
+
+    def startFeed(self) -> None:
+        """Set up for incremental Parse() calls, and start the parser thread
+        (which immediately waits for the first chunk). While it runs, doCB()
+        on this instance just queues events for Parse() to deliver.
+        """
+        self.feedFrame = FeedInputFrame(options=self.options)
+        self.sr.open(self.feedFrame)
+        self.doCB = lambda typ, *args: self.feedEvents.append((typ, args))
+
+        def runParser() -> None:
+            try:
+                self.feedFrame.waitForFeed()
+                self.parseTop()
+            except FeedAborted:
+                pass
+            except Exception as e:  # Re-raised by Parse() in the caller
+                self.feedError = e
+            finally:
+                self.feedFrame.parserDone()
+
+        self.feedThread = threading.Thread(target=runParser,
+            name="XSParser.Parse", daemon=True)
+        self.feedThread.start()
+
+    def finishFeed(self) -> None:
+        """The parser thread is done: join it and stop queueing events.
+        The FeedInputFrame stays, so more Parse() calls are an error.
+        """
+        if self.feedThread is not None:
+            self.feedThread.join()
+            self.feedThread = None
+        self.__dict__.pop("doCB", None)
+
+    def close(self) -> None:
+        """Abandon any unfinished incremental parse: wake the parser thread
+        so it quits, and wait for it. Queued events are dropped. Harmless if
+        there's no incremental parse going.
+        """
+        if self.feedFrame is None: return
+        self.feedFrame.abort()
+        self.finishFeed()
+        self.feedEvents = []
+        self.feedError = None
 
     parse_string = ParseString = Parse
 
@@ -399,13 +709,101 @@ class XSParser():  # StackReader?? TODO Check
 #             # Double-check that the encoding is known (else LookupError)
 #             codecs.lookup(encoding)
 
-        iframe = InputFrame(options=self.options)
+        if self.options.mmapFiles and MMapInputFrame.canMap(ifh):
+            iframe = MMapInputFrame(options=self.options)
+        else:
+            iframe = InputFrame(options=self.options)
         iframe.addFile(ifh)
         self.sr.open(iframe)
         self.parseTop()
 
     parse_file = ParseFile
 
+    def iterparse(self, source:Union[str, IO], attrTx:str="PAIRS") -> Iterator[Tuple]:
+        """Parse a document from a '<'-initial string, a path, or an open file,
+        as a generator of SAX events. Each is a tuple of a SaxEvent plus args,
+        in the same shape as Node.eachSaxEvent() produces, including how
+        attributes come back per 'attrTx' ("PAIRS", "DICT", or "EVENTS").
+        Handlers set on the parser are not called.
+
+        Nothing is buffered: the parser runs on its own thread, but only while
+        the consumer is waiting for the next event. So the consumer can stop
+        early (the parse is then abandoned), or do other work between events.
+        """
+        if attrTx not in [ "PAIRS", "DICT", "EVENTS" ]: raise ValueError(
+            f"Unknown attrTx value '{attrTx}'.")
+
+        toParser = threading.Semaphore(0)
+        toConsumer = threading.Semaphore(0)
+        slot = [ None ]                     # The event being handed over
+        state = SimpleNamespace(abandoned=False, error=None)
+
+        class IterAbandoned(Exception):
+            pass
+
+        def handOver(event:Tuple) -> None:
+            slot[0] = event
+            toConsumer.release()
+            toParser.acquire()
+            if state.abandoned: raise IterAbandoned
+
+        def sink(typ:SaxEvent, args:Tuple) -> None:
+            if typ != SaxEvent.START:
+                handOver((typ, *args))
+                return
+            elemName, attrs = args[0], args[1]
+            if not attrs:  # Including saxAttribute, which sends its own
+                handOver((SaxEvent.START, elemName))
+            elif attrTx == "PAIRS":
+                vals = [ SaxEvent.START, elemName ]
+                for k, v in attrs.items():
+                    vals.append(k)
+                    vals.append(v)
+                handOver(tuple(vals))
+            elif attrTx == "DICT":
+                handOver((SaxEvent.START, elemName, dict(attrs)))
+            else:
+                handOver((SaxEvent.START, elemName))
+                for k, v in attrs.items():
+                    handOver((SaxEvent.ATTRIBUTE, k, v))
+
+        def runParser() -> None:
+            toParser.acquire()
+            ifh = None
+            try:
+                if isinstance(source, str) and source.startswith("<"):
+                    self.Parse(source)
+                else:
+                    if isinstance(source, str): source2 = ifh = open(source, "rb")
+                    else: source2 = source
+                    self.ParseFile(source2)
+            except IterAbandoned:
+                pass
+            except Exception as e:  # Re-raised by the generator
+                state.error = e
+            finally:
+                if ifh: ifh.close()
+                slot[0] = None
+                toConsumer.release()
+
+        priorSink = self.eventSink
+        self.eventSink = sink
+        threading.Thread(target=runParser, name="XSParser.iterparse",
+            daemon=True).start()
+        try:
+            while True:
+                toParser.release()
+                toConsumer.acquire()
+                if slot[0] is None: break
+                yield slot[0]
+        finally:
+            if slot[0] is not None:  # Stopped early
+                state.abandoned = True
+                toParser.release()
+                toConsumer.acquire()
+            self.eventSink = priorSink
+        if state.error is not None: raise state.error
+
     @staticmethod
     def sniffXmlDcl(ifh: IO) -> tuple[bytes, str | None]:
         """Sneak a look at the file. Returns (bytes_read, encoding).
@@ -493,14 +891,13 @@ class XSParser():  # StackReader?? TODO Check
             if not self.readConst(">", ss=True):                # MDC
                 self.SynErr("Expected '>' to end DOCTYPE")
 
-            if (self.options.useDTD and
-                (self.sr.doctype.publicId or self.sr.doctype.systemId)):
-                # TODO Find and open the DTD, then call parseDTD on it.
-                pass
+            if self.options.useDTD and systemId:
+                self.useExternalDTD(publicId, systemId)
 
             self.doCB(SaxEvent.DOCTYPEEND)
 
-        self.parseDocument()                                    # DOCUMENT
+        if self.isPlainXml(): self.parseDocumentPlain()         # DOCUMENT
+        else: self.parseDocument()
 
     def parseDTD(self) -> None:
         """This can parse either an internal subset or an external DTD.
@@ -508,7 +905,7 @@ class XSParser():  # StackReader?? TODO Check
         while True:
             #lg.info("** subset at: %s", self.sr.bufSample)
             self.sr.skipSpaces(entOpener=True)  # TODO add to buf? Not for subset
-            if self.sr.bufLeft <= 0: break
+            if not self.sr.bufLeft: break  # (None once all frames close)
             delim, _nextChar = self.peekDelimPlus()
             #lg.info("Delim: '%s'.", delim)
             if not delim:
@@ -530,18 +927,22 @@ class XSParser():  # StackReader?? TODO Check
                     if e := self.readElementDcl():
                         # -> (names, Model, omit1, omit2, includes, excludes)
                         self.addElementToDoctype(e)
+                        if self.dclLog is not None: self.dclLog.append(("ELEMENT", e))
                         self.doCB(SaxEvent.ELEMENTDCL, e)
                     elif e := self.readAttlistDcl():
                         # -> ( [elemName+], [AttrDef+] )
                         self.addAttlistToDoctype(elemNames=e[0], attrDefs=e[1])
+                        if self.dclLog is not None: self.dclLog.append(("ATTLIST", e))
                         self.doCB(SaxEvent.ATTLISTDCL, e)
                     elif e := self.readEntityDcl():
                         lg.warning("EntityDcl: %s" % (repr(e)))
                         self.addEntityToDoctype(e)
+                        if self.dclLog is not None: self.dclLog.append(("ENTITY", e))
                         self.doCB(SaxEvent.ENTITYDCL, e)
                     elif e := self.readNotationDcl():
                         (name, publicId, systemId) = e
                         self.addNotationToDoctype(name, publicId, systemId)
+                        if self.dclLog is not None: self.dclLog.append(("NOTATION", e))
                         self.doCB(SaxEvent.NOTATIONDCL, e)
                     else:
                         self.SynErr("Unrecognized dcl.")
@@ -566,6 +967,107 @@ class XSParser():  # StackReader?? TODO Check
                     self.SynErr("Unexpected EOF in DOCTYPE, no more input frames.")
         self.doCB(SaxEvent.DOCEND)
 
+    def useExternalDTD(self, publicId:str, systemId:str) -> None:
+        """Find, parse, and add the declarations from the external DTD
+        (after those from the internal subset, which take precedence).
+        With options.dtdCache, a DTD already parsed (and unchanged) is just
+        attached from the DTDCache.
+        """
+        path = self.findDTDPath(systemId)
+        if not self.options.dtdCache:
+            self.mergeDoctype(self.readExternalDTD(path)[0])
+            return
+
+        key = DTDCache.makeKey(publicId, systemId, path)
+        cacheDir = self.options.dtdCacheDir
+        if (doctype := dtdCache.get(key)) is not None:
+            dtdCache.hits += 1
+        elif cacheDir and (dcls := dtdCache.getDcls(key, cacheDir)) is not None:
+            dtdCache.diskHits += 1
+            doctype = self.doctypeFromDcls(dcls)
+            dtdCache.put(key, doctype)
+        else:
+            dtdCache.misses += 1
+            doctype, dcls = self.readExternalDTD(path)
+            dtdCache.put(key, doctype)
+            if cacheDir: dtdCache.putDcls(key, cacheDir, dcls)
+        self.mergeDoctype(doctype)
+
+    def docDirs(self) -> List[str]:
+        """The directory of the document being parsed (if it came from a
+        file), for resolving relative system IDs.
+        """
+        if self.sr.frames and self.sr.frames[0].path:
+            return [ os.path.dirname(self.sr.frames[0].path) ]
+        return []
+
+    def findDTDPath(self, systemId:str) -> str:
+        """Resolve a DTD's system ID to a local file: as given, then relative
+        to the document, then in options.entityDirs.
+        """
+        cands = [ systemId ]
+        for adir in self.docDirs() + (self.options.entityDirs or []):
+            cands.append(os.path.join(adir, systemId))
+        for cand in cands:
+            if os.path.isfile(cand): return cand
+        self.EntErr(f"Cannot find DTD '{systemId}' (tried {cands}).")
+
+    def readExternalDTD(self, path:str) -> ('DocumentType', List):
+        """Parse a DTD file, using a separate parser (with no handlers).
+        Returns its DocumentType, and the list of declarations as parsed.
+        """
+        dtdParser = XSParser(options=vars(self.options))
+        dtdParser.dclLog = []
+        with open(path, "rb") as ifh:
+            iframe = InputFrame(options=dtdParser.options)
+            iframe.addFile(ifh)
+            dtdParser.sr.open(iframe)
+            dtdParser.parseDTD()
+        return dtdParser.sr.doctype, dtdParser.dclLog
+
+    def doctypeFromDcls(self, dcls:List) -> 'DocumentType':
+        """Build a DocumentType from declarations as parsed (see dclLog),
+        without any of the parsing.
+        """
+        dtdParser = XSParser(options=vars(self.options))
+        for kind, e in dcls:
+            if kind == "ELEMENT": dtdParser.addElementToDoctype(e)
+            elif kind == "ATTLIST": dtdParser.addAttlistToDoctype(e[0], e[1])
+            elif kind == "ENTITY": dtdParser.addEntityToDoctype(e)
+            elif kind == "NOTATION": dtdParser.addNotationToDoctype(*e)
+            else: raise ValueError(f"Unknown cached dcl kind '{kind}'.")
+        return dtdParser.sr.doctype
+
+    def mergeDoctype(self, other:'DocumentType') -> None:
+        """Add definitions from another DocumentType, except where already
+        defined (the internal subset comes first and wins).
+        Elements merge per ElementDef: an internal ATTLIST doesn't hide the
+        external ELEMENT's model or its other attributes. The other DocumentType
+        may be shared (see DTDCache), so its definitions are copied, not changed.
+        """
+        dt = self.sr.doctype
+        for which in [ "entityDefs", "pentityDefs", "notationDefs" ]:
+            mine = getattr(dt, which)
+            for k, v in getattr(other, which).items():
+                if k in mine: continue
+                mine[k] = copy.copy(v)  # (EntityDefs get their localPath set)
+                mine[k].ownerSchema = dt
+
+        for name, theirs in other.elementDefs.items():
+            eDef = dt.elementDefs.get(name)
+            if eDef is None:
+                eDef = dt.elementDefs[name] = copy.copy(theirs)
+                eDef.ownerSchema = dt
+                if theirs.attrDefs: eDef.attrDefs = dict(theirs.attrDefs)
+                continue
+            if eDef.model is None and theirs.model is not None:
+                eDef.model = theirs.model
+                eDef.automaton = None
+            if theirs.attrDefs:
+                merged = dict(theirs.attrDefs)
+                merged.update(eDef.attrDefs or {})
+                eDef.attrDefs = merged
+
     def addElementToDoctype(self, e:List) -> bool:
         """Take the parsed info from a markup declaration, and add to the doctype.
         TODO: Duplicate dcls need not be fatal.
@@ -575,8 +1077,12 @@ class XSParser():  # StackReader?? TODO Check
         dt = self.sr.doctype
         self.dclCount += 1
         for name in list(e[0]):  # Allow for multiDcl
-            if name in dt.elementDefs: self.SynErr(
-                f"Duplicate declaration for element '{name}'.")
+            if name in dt.elementDefs:
+                theDef = dt.elementDefs[name]
+                if theDef.model is not None: self.SynErr(
+                    f"Duplicate declaration for element '{name}'.")
+                theDef.model = e[1]  # (made by an earlier ATTLIST)
+                continue
             theDef = ElementDef(name=name, model=e[1],
                 ownerSchema=dt, readOrder=self.dclCount)
             dt.elementDefs[name] = theDef
@@ -599,12 +1105,12 @@ class XSParser():  # StackReader?? TODO Check
             if elemName in dt.elementDefs:
                 eDef = dt.elementDefs[elemName]
             else:
-                eDef = dt.elementDefs[elemName] = ElementDefs(name=elemName,
+                eDef = dt.elementDefs[elemName] = ElementDef(name=elemName,
                     model=None, ownerSchema=dt, readOrder=self.dclCount)
             if not eDef.attrDefs: eDef.attrDefs = {}
             for attrDef in attrDefs:
                 if attrDef.attrName in eDef.attrDefs:
-                    dupFail.append( (elemName, attrDef.attrName) )
+                    dupFails.append( (elemName, attrDef.attrName) )
                 else:
                     eDef.attrDefs[attrDef.attrName] = attrDef
 
@@ -613,31 +1119,35 @@ class XSParser():  # StackReader?? TODO Check
         return True
 
     def addEntityToDoctype(self, e:List) -> bool:
+        """Takes the tuple from readEntityDcl():
+            (entName, isParam, publicId, systemId, lit, notn)
+        """
         dt = self.sr.doctype
         self.dclCount += 1
-        for entName in list(e[0]):
-            if entName in dt.entityDefs: self.SynErr(
-                f"Duplicate declaration for entity '{entName}'.")
-            theDef = EntityDef(
-                entName=entName,
-                entSpace=EntitySpace.GENERAL,       # TODO Finish ent space cases
-                entParsing=EntityParsing.PCDATA,
-                publicId=None,                      # TODO ent loc stuff
-                systemId=None,
-                data=None,
-                notationName=None,
-                encoding="utf-8",
-                ownerSchema=dt,
-                readOrder=self.dclCount
-            )
-            dt.entityDefs[entName] = theDef
+        entName, isParam, publicId, systemId, lit, _notn = e
+        defs = dt.pentityDefs if isParam else dt.entityDefs
+        if entName in defs: self.SynErr(
+            f"Duplicate declaration for entity '{entName}'.")
+        theDef = EntityDef(
+            entName=entName,
+            entSpace=EntitySpace.PARAMETER if isParam else EntitySpace.GENERAL,
+            entParsing=EntityParsing.PCDATA,    # TODO Finish parsing cases
+            publicId=publicId,
+            systemId=systemId,
+            data=lit or None,
+            notationName=None,                  # TODO NDATA
+            encoding="utf-8",
+            ownerSchema=dt,
+            readOrder=self.dclCount
+        )
+        defs[entName] = theDef
         return True
 
     def addNotationToDoctype(self,
         name:Union[QName_t, List], publicId:str, systemId:str) -> bool:
         dt = self.sr.doctype
         self.dclCount += 1
-        for notationName in list(name):
+        for notationName in ([ name ] if isinstance(name, str) else name):
             if notationName in dt.notationDefs: self.SynErr(
                 f"Duplicate declaration for notation '{notationName}'.")
             theDef = NotationDef(name=notationName, publicId=publicId,
@@ -651,16 +1161,15 @@ class XSParser():  # StackReader?? TODO Check
         """Starts after doctype if any.
         """
         tBuf = []  # Use List for performance
-        while c := self.sr.peek(1) is not None:
+        while True:
+            if self.sr.peek(1) is None:
+                if self.sr.depth <= 1: break
+                self.sr.close()                                 # End of entity
+                continue
             delim, _nextChar = self.peekDelimPlus()
             #lg.info("delim '%s', then '%s'.", delim, nextChar)
-            if not delim:
-                while True:
-                    c = self.sr.peek(1)
-                    if c is None or c in InputFrame.firstDelims: break
-                    if c == "\n" and self.options.expatBreaks: self.issueText(tBuf)
-                    if not self.ignoring: tBuf.append(c)
-                    self.sr.consume(1)
+            if not delim:                                       # TEXT
+                self.readText(tBuf)
                 continue
 
             c = delim[0]
@@ -706,7 +1215,9 @@ class XSParser():  # StackReader?? TODO Check
                         self.doCB(SaxEvent.START, elemName, attrs)
 
                     self.tagStack.append(elemName, self.sr.curFrame.lineNum)
+                    if self.options.valModels: self.valStart()
                     if emptySyntax:  # <x/>
+                        if self.options.valModels: self.valEnd()
                         self.doCB(SaxEvent.END, elemName)
                         self.tagStack.pop()
 
@@ -725,9 +1236,11 @@ class XSParser():  # StackReader?? TODO Check
                         del self.tagStack[foundAt]
                     elif self.options.omitEnd:
                         while len(self.tagStack) > foundAt:
+                            if self.options.valModels: self.valEnd()
                             self.doCB(SaxEvent.END, self.tagStack.topName)
                             self.tagStack.pop()
                     elif foundAt == len(self.tagStack) - 1:
+                        if self.options.valModels: self.valEnd()
                         self.doCB(SaxEvent.END, self.tagStack.topName)
                         self.tagStack.pop()
                     else: self.SynErr(
@@ -752,10 +1265,8 @@ class XSParser():  # StackReader?? TODO Check
                         self.SynErr("Invalid marked section opening.")
                     # Unlike most constructs, this stays open (see below for ]]>).
                     # For CDATA is doesn't need to, but consider SGML types.
-                    if e := self.readMSOpening():
-                        self.doCB(SaxEvent.CDATA)
-                        self.doCB(SaxEvent.CHAR, e or "")
-                        self.doCB(SaxEvent.CDATAEND)
+                    if e := self.readMSOpening():  # (which issues the events)
+                        if self.options.valModels: self.valText(e)
                     else:
                         self.SynErr("Invalid marked section.")
 
@@ -838,17 +1349,159 @@ class XSParser():  # StackReader?? TODO Check
                 lg.info("Inactive delimiter? '%s'.", delim)
                 tBuf.append(delim)
 
-        # Should be at EOF
+        self.finishDocument(tBuf)
+
+    def getStats(self) -> Dict:
+        """With options.profile, return counts and times by construct, plus
+        input loading, entity nesting, and speed figures. Else None.
+        """
+        if self.stats is None: return None
+        sr = self.sr
+        frames = sr.frames
+        nChars = sr.totChars + sum(fr.offset + fr.bufPos for fr in frames)
+        secs = self.stats.times["document"]
+        return {
+            "counts": dict(self.stats.counts),
+            "seconds": dict(self.stats.times),
+            "events": self.totEvents,
+            "refills": sr.totRefills + sum(fr.nRefills for fr in frames),
+            "bytesRead": sr.totRead + sum(fr.nRead for fr in frames),
+            "maxEntityDepth": sr.maxDepth,
+            "chars": nChars,
+            "charsPerSec": nChars / secs if secs else None,
+        }
+
+    def finishDocument(self, tBuf:List) -> None:
+        """At EOF, issue any pending text, check (or with omitAtEOF, close)
+        any open elements, and end the document.
+        """
         if tBuf: self.issueText(tBuf)
         if self.tagStack:
             if not self.options.omitAtEOF:
                 self.SynErr(f"Unclosed elements at EOF: {self.tagStack}.")
-            while len(self.tagStack) > foundAt:
+            while len(self.tagStack) > 0:
+                if self.options.valModels: self.valEnd()
                 self.doCB(SaxEvent.END, self.tagStack.topName)
                 self.tagStack.pop()
         self.doCB(SaxEvent.DOCEND)
         return
 
+    def isPlainXml(self) -> bool:
+        """Do the options describe plain XML, so parseDocumentPlain() can be
+        used? That means no Loki options set (those aren't in
+        XSParserOptionDefs), and none of the XSParser options that change
+        events from within the main loop.
+        """
+        opts = vars(self.options)
+        if (opts.get("utgard") or opts.get("expatBreaks")
+            or opts.get("saxAttribute") or opts.get("profile")
+            or opts.get("valModels")):
+            return False  # (the general loop reads everything via methods)
+        for k, v in opts.items():
+            if v and k not in XSParserOptionDefs: return False
+        return True
+
+    def parseDocumentPlain(self) -> None:
+        """The same as parseDocument(), but for plain XML (see isPlainXml()),
+        so without per-delimiter checks of options and marked-section state.
+        Loki-only delimiters such as "<|" are just errors here.
+        """
+        sr = self.sr
+        doCB = self.doCB
+        tagStack = self.tagStack
+        issueText = self.issueText
+        textRun_re = InputFrame.textRun_re
+        intern = self.intern
+        plainEndTag_re = XSParser.plainEndTag_re
+        START, END = SaxEvent.START, SaxEvent.END
+        sdataDefs = sr.sdataDefs
+        tBuf = []  # Use List for performance
+        while True:
+            frame = sr.curFrame
+            if frame is None or frame.peek(1) is None:
+                if sr.depth <= 1: break
+                sr.close()                                      # End of entity
+                continue
+            delim, _nextChar = frame.peekDelimPlus()
+            if not delim:                                       # TEXT
+                if run := frame.readTextRun(textRun_re): tBuf.append(run)
+                continue
+
+            if delim == "<":                                    # STARTTAG
+                issueText(tBuf)
+                elemName, attrs, emptySyntax = self.readStartTag()
+                if not (elemName): self.SynErr("Unexpected characters after '<'.")
+                doCB(START, elemName, attrs)
+                tagStack.append(elemName, sr.curFrame.lineNum)
+                if emptySyntax:  # <x/>
+                    doCB(END, elemName)
+                    tagStack.pop()
+
+            elif delim == "</":                                 # ENDTAG
+                issueText(tBuf)
+                if mat := plainEndTag_re.match(frame.buf, frame.bufPos):
+                    frame.bufPos = mat.end()
+                    elemName = mat.group(1)
+                    if intern is not None:
+                        elemName = intern.setdefault(elemName, elemName)
+                else:
+                    elemName = self.readEndTag()
+                if not elemName: self.SynErr("Expected name after '</'.")
+                topName = tagStack.topName
+                if topName is elemName or topName == elemName:
+                    doCB(END, topName)
+                    tagStack.pop()
+                elif tagStack.rindex(elemName) is None: self.SynErr(
+                    f"End-tag for non-open type '{elemName}'. [ {tagStack} ].")
+                else: self.SynErr(
+                    f"End-tag for {elemName}, but open are: {tagStack}.")
+
+            elif delim[0] == "&":                               # ENTREF
+                if delim == "&#":
+                    tBuf.append(self.readNumericChar())
+                    continue
+                sr.consume(1)
+                if not (entName := self.readName(ss=False)):
+                    self.SynErr("Expected '#' or entity name after '&'.")
+                if not self.readConst(";"):
+                    self.SynErr("Expected ';' after entity name '%s'"
+                        ", but found '%s'." % (entName, sr.peek(1)))
+                if entName in sdataDefs:
+                    tBuf.append(sdataDefs[entName])
+                else:
+                    self.openEntity(space=EntitySpace.GENERAL, entName=entName)
+
+            elif delim == "<!--":                               # COMMENT
+                issueText(tBuf)
+                if comData := self.readComment(endAt="-->"):
+                    doCB(SaxEvent.COMMENT, comData)
+                else: self.SynErr("Invalid comment.")
+
+            elif delim == "<?":                                 # PI
+                issueText(tBuf)
+                if not (piItems := self.readPI()):
+                    self.SynErr("Expected target and data after '<?'.")
+                doCB(SaxEvent.PROC, *piItems)
+
+            elif delim == "<![":                                # CDATA
+                issueText(tBuf)
+                if sr.peek(9) != "<![CDATA[":
+                    self.SynErr("Invalid marked section opening.")
+                if not self.readMSOpening():  # (which issues the events)
+                    self.SynErr("Invalid marked section.")
+
+            elif delim == "]]>":                                # MSC
+                issueText(tBuf)
+                self.SynErr("']]>' found outside MS.")
+            elif delim == "<!":                                 # Dcl
+                self.SynErr("Unexpected markup declaration.")
+            elif delim[0] == "<":                               # Fail
+                self.SynErr("Unrecognized markup after '<'")
+            else:                                               # Inactive delim
+                tBuf.append(delim)
+
+        self.finishDocument(tBuf)
+
     def trySpecialAttributes(self, name:NMTOKEN_t) -> Dict:
         """Parse any attrs found in non-start tags. Only ID/COID attributes are
         allowed there (and only when enabled, for Loki), to co-index suspends,
@@ -879,52 +1532,105 @@ class XSParser():  # StackReader?? TODO Check
 #             lg.info("doCB for %s: %s", typ.name, args)
 
         self.totEvents += 1
-        if hasattr(self, typ.value):
-            cb = getattr(self, typ.value)
-        elif hasattr(self, SaxEvent.DEFAULT.value):
-            cb = getattr(self, SaxEvent.DEFAULT.value)
-        else:
-            cb = None
-        if not cb: return
-        if args:
-            data = args[0]
-            args = args[1:]
-        else:
-            data = None
-        cb(data, *args)
+        if self.eventSink is not None:
+            self.eventSink(typ, args)
+            return
+        cb = self.dispatch.get(typ)
+        if cb is not None: cb(*args)
+
+    @property
+    def BatchHandler(self) -> Callable:
+        """If set, this gets all the events instead of the per-event handlers,
+        as lists of up to options.batchSize (SaxEvent, *args) tuples, with the
+        args as the per-event handler would get them (so attributes come as a
+        dict on START). The last list is sent at DOCEND. This saves a Python
+        call per event for consumers such as DomBuilder.BatchHandler.
+        """
+        return self._batchHandler
+
+    @BatchHandler.setter
+    def BatchHandler(self, cb:Callable) -> None:
+        self._batchHandler = cb
+        self.batch = []
+        self.eventSink = self.batchEvent if cb else None
+
+    def batchEvent(self, typ:SaxEvent, args:Tuple) -> None:
+        self.batch.append((typ, *args))
+        if len(self.batch) >= self.options.batchSize or typ == SaxEvent.DOCEND:
+            self.flushBatch()
+
+    def flushBatch(self) -> None:
+        if not self.batch: return
+        events = self.batch
+        self.batch = []  # New list, so the handler may keep the old one
+        self._batchHandler(events)
+
+    def buildDispatch(self) -> None:
+        """Resolve the handler for each SaxEvent once, so doCB() is just a
+        dict lookup. Events with no handler and no DefaultHandler are left out.
+        Called again whenever a handler attribute is assigned (see
+        handlerProperty()).
+        """
+        dflt = getattr(self, SaxEvent.DEFAULT.value, None)
+        if dflt:  # DefaultHandler always gets data
+            dfltCB = lambda *args: dflt(*(args or (None, )))
+        self.dispatch = {}
+        for typ in SaxEvent:
+            cb = getattr(self, typ.value, None)
+            if cb: self.dispatch[typ] = cb  # No-arg events get none, like expat
+            elif dflt: self.dispatch[typ] = dfltCB
 
     def issueText(self, tBuf:List) -> None:
         """Called whenever we hit markup, to issue buffered text as a SAX event.
         Not called at \\n or entity refs, unless options.expatBreaks.
         """
         if tBuf is None or len(tBuf) == 0: return
-        self.doCB(SaxEvent.CHAR, ''.join(tBuf))
+        text = ''.join(tBuf)
+        if self.options.valModels: self.valText(text)
+        self.doCB(SaxEvent.CHAR, text)
         tBuf.clear()
 
+    def readText(self, tBuf:List) -> None:
+        """Add text up to the next delimiter to 'tBuf', a whole run at a time
+        (see InputFrame.readTextRun()), rather than char by char.
+        With options.expatBreaks, each \\n starts a new text event.
+        """
+        if not self.options.expatBreaks:
+            run = self.sr.readTextRun(InputFrame.textRun_re)
+            if run and not self.ignoring: tBuf.append(run)
+            return
+        while True:
+            run = self.sr.readTextRun(InputFrame.textRunNL_re)
+            if run and not self.ignoring: tBuf.append(run)
+            if self.sr.peek(1) != "\n": return
+            self.issueText(tBuf)
+            if not self.ignoring: tBuf.append("\n")
+            self.sr.discard(1)
+
     # Forward small constructs to entity-frame-limited readers
     #
     def readConst(self, const:str, ss:bool=True, thenSp:bool=False) -> str:
-        if not self.sr.curFrame: return None
+        if self.sr.curFrame is None: return None
         return self.sr.curFrame.readConst(const, ss=ss, thenSp=thenSp)
     def peekDelimPlus(self, ss:bool=True) -> (str, str):
-        if not self.sr.curFrame: return None
+        if self.sr.curFrame is None: return None
         return self.sr.curFrame.peekDelimPlus(ss=ss)
     def readBackslashChar(self) -> str:
-        if not self.sr.curFrame: return None
+        if self.sr.curFrame is None: return None
         return self.sr.curFrame.readBackslashChar()
     def readNumericChar(self, ss:bool=True) -> str:
-        if not self.sr.curFrame: return None
+        if self.sr.curFrame is None: return None
         return self.sr.curFrame.readNumericChar(ss=ss)
     def readInt(self,  ss:bool=True, signed:bool=True) -> int:
-        if not self.sr.curFrame: return None
+        if self.sr.curFrame is None: return None
         return self.sr.curFrame.readInt(ss, signed)
     def readFloat(self,  ss:bool=True, signed:bool=True,
         specialFloats:bool=False) -> float:
-        if not self.sr.curFrame: return None
+        if self.sr.curFrame is None: return None
         return self.sr.curFrame.readFloat(
             ss=ss, signed=signed, specialFloats=specialFloats)
     def readName(self, ss:bool=True) -> str:
-        if not self.sr.curFrame: return None
+        if self.sr.curFrame is None: return None
         return self.sr.curFrame.readName(ss)
 
     def readQGI(self, ss:bool=True) -> (str, NMTOKEN_t):
@@ -932,7 +1638,7 @@ class XSParser():  # StackReader?? TODO Check
         Watch out for empty element syntax.
         Caller should check context then strip.
         """
-        if not self.sr.curFrame: return None
+        if self.sr.curFrame is None: return None
         qgi = self.sr.curFrame.readName(ss)
         while self.sr.peek(1) == "/" and self.sr.peek(2) != "/>":
             self.sr.consume(1)
@@ -944,10 +1650,10 @@ class XSParser():  # StackReader?? TODO Check
 
     def readRegex(self, regex:Union[str, re.Pattern],
         ss:bool=True, ignoreCase:bool=True) -> re.Match:
-        if not self.sr.curFrame: return None
+        if self.sr.curFrame is None: return None
         return self.sr.curFrame.readRegex(regex, ss, ignoreCase)
     def readToString(self, ender:str, consumeEnder:bool=True) -> str:
-        if not self.sr.curFrame: return None
+        if self.sr.curFrame is None: return None
         return self.sr.curFrame.readToString(ender, consumeEnder)
 
     def readQLit(self, ss:bool=True, keepPunc:bool=False, expandPE:bool=False) -> str:
@@ -968,7 +1674,11 @@ class XSParser():  # StackReader?? TODO Check
             self.SynErr(f"Expected quoted string but found '{lQuote}' (U+{ord(lQuote):04x}).")
 
         self.sr.discard()
-        dat = self.readToString(rQuote, consumeEnder=True)
+        if self.sr.peek() == rQuote:  # (readToString() can't return "")
+            self.sr.discard()
+            dat = ""
+        else:
+            dat = self.readToString(rQuote, consumeEnder=True)
         if dat is None:
             self.SynErr("Unclosed quoted string.")
         if expandPE: dat = self.expandPEntities(dat)
@@ -1219,27 +1929,26 @@ class XSParser():  # StackReader?? TODO Check
             tokens.append(rep)
         return tokens
 
-    def readRepIndicator(self, ss:bool=True) -> RepType:        # *|+|?|{}
-        """The repetition operator (including the {}-form extension).
+    def readRepIndicator(self, ss:bool=True) -> str:            # *|+|?|{}
+        """The repetition operator (including the {}-form extension), as a
+        model token: "*", "+", "?", or "{min,max}" (max -1 for unlimited).
         """
         if ss: self.sr.skipSpaces()
         c = self.sr.peek()
         if c not in "*?+{":
             return None
         self.sr.discard()
-        lims = [ 1, 1 ]
-        if c == "*": lims = [ 0, -1 ]
-        elif self.readConst("?"): lims = [ 0, 1 ]
-        elif self.readConst("+"): lims = [ 0, -1 ]
-        elif c == "{":
-            if not self.options.repBrace:
-                raise SyntaxError("repBraces extension is not enabled.")
-            minO = self.readInt(ss=True)
-            self.readConst(":", ss=True)
-            maxO = self.readInt(ss=True)
-            self.readConst("}", ss=True)
-            lims = [ minO, maxO ]
-        return RepType(*lims)
+        if c != "{": return c
+        if not self.options.repBrace:
+            raise SyntaxError("repBraces extension is not enabled.")
+        minO = self.readInt(ss=True)
+        if self.readConst(",", ss=True) is None: self.readConst(":", ss=True)
+        maxO = self.readInt(ss=True)
+        if not self.readConst("}", ss=True): self.SynErr(
+            "Expected '}' to end repetition bounds.")
+        if minO is None: minO = 0
+        if maxO is None: maxO = UNLIMITED
+        return "{%d,%d}" % (minO, maxO)
 
     def readAttlistDcl(self) -> (List, List):                   # <!ATTLIST>
         """This reads an entire ATTLIST, which may declare multiple
@@ -1357,6 +2066,42 @@ class XSParser():  # StackReader?? TODO Check
     ###########################################################################
     # Readers for main document content
     #
+    # A whole plain XML start-tag, and then each of its attributes. Values
+    # with '&' or '<', non-XML spaces, and any extended syntax
+    # just don't match, and go the long way through readStartTag().
+    _qn = re.sub(r"\((?!\?)", "(?:", Rune.QName_re)  # (no capturing groups)
+    _val = r""""[^"<&]*"|'[^'<&]*'"""
+    plainStartTag_re = re.compile(
+        r"<(%s)((?:[ \t\r\n]+%s[ \t\r\n]*=[ \t\r\n]*(?:%s))*)[ \t\r\n]*(/?)>"
+        % (_qn, _qn, _val))
+    plainAttr_re = re.compile(
+        r"""(%s)[ \t\r\n]*=[ \t\r\n]*(?:"([^"]*)"|'([^']*)')""" % (_qn))
+    plainEndTag_re = re.compile(r"</(%s)[ \t\r\n]*>" % (_qn))
+    del _qn, _val
+
+    def readStartTagFast(self) -> (str, Dict, bool):
+        """Try to read a plain XML start-tag with one regex match, rather than
+        token by token. Returns None (having read nothing) if the tag is not
+        entirely in the buffer, uses any extended syntax, or might need
+        name folding.
+        """
+        if self.options.elementFold or self.options.attributeFold: return None
+        frame = self.sr.curFrame
+        if frame is None: return None
+        mat = XSParser.plainStartTag_re.match(frame.buf, frame.bufPos)
+        if mat is None: return None
+        frame.bufPos = mat.end()
+        elemName, attrText, slash = mat.group(1, 2, 3)
+        intern = self.intern
+        if intern is not None: elemName = intern.setdefault(elemName, elemName)
+        attrs = OrderedDict()
+        if attrText:
+            for amat in XSParser.plainAttr_re.finditer(attrText):
+                attrName, dq, sq = amat.group(1, 2, 3)
+                if intern is not None: attrName = intern.setdefault(attrName, attrName)
+                attrs[attrName] = sq if dq is None else dq
+        return elemName, attrs, bool(slash)
+
     def readStartTag(self, ss:bool=True) -> (Union[str, List], Dict, bool):
         """Calll while still pointing at '<'.
         Returns a 3-tuple of:
@@ -1365,6 +2110,11 @@ class XSParser():  # StackReader?? TODO Check
             whether it used empty-element syntax
         """
         #lg.info("*** %s, buf '%s'.", callerNames(), self.sr.bufSample)
+        if (fast := self.readStartTagFast()) is not None:
+            elemName, attrs, empty = fast
+            attrs = self.normalizeAttributeValues(elemName, attrs)
+            return self.checkStartTag(elemName, attrs, empty)
+
         if not self.readConst("<", ss): return None, None, None
         if self.options.qgi: elemName = self.readQGI(ss)
         else: elemName = self.readName(ss)
@@ -1377,6 +2127,8 @@ class XSParser():  # StackReader?? TODO Check
             self.SynErr("Expected elemName in start-tag.")
         elif self.options.elementFold:
             elemName[i] = self.options.elementFold.normalize(elemName)
+        if self.intern is not None and isinstance(elemName, str):
+            elemName = self.intern.setdefault(elemName, elemName)
 
         # Attributes
         attrs = self.readAttributes(ss=ss)
@@ -1387,8 +2139,13 @@ class XSParser():  # StackReader?? TODO Check
         if self.readConst("/>", ss): empty = True
         elif self.readConst(">", ss): empty = False
         else: self.SynErr(f"Unclosed start-tag for '{elemName}'.")
+        return self.checkStartTag(elemName, attrs, empty)
 
-        # Validation (content model checked later, once element is complete)
+    def checkStartTag(self, elemName:Union[str, List], attrs:Dict, empty:bool
+        ) -> (Union[str, List], Dict, bool):
+        """Apply defaults and validate a start-tag as read by readStartTag()
+        (content model checked later, once element is complete).
+        """
         elDcl = None
         if self.sr.doctype and elemName in self.sr.doctype.elementDefs:
             elDcl = self.sr.doctype.elementDefs[elemName]
@@ -1397,14 +2154,16 @@ class XSParser():  # StackReader?? TODO Check
                 self.ValErr(f"Undeclared element '{elemName}'.")
         else:
             self.sr.doctype.applyDefaults(elDcl=elDcl, attrs=attrs)
-            if self.options.valAttributeTypes:
+            if self.options.valAttributeTypes and elDcl.attrDefs:
                 for k, v in attrs.items():
-                    if k not in elDcl.attributes: continue
-                    if not elDcl.attributes.type: continue
-                    badFacet = xsdtypes.facetCheck(v, elDcl.attributes.type)
+                    if k not in elDcl.attrDefs: continue
+                    attrType = elDcl.attrDefs[k].attrType
+                    if not isinstance(attrType, str): continue
+                    if attrType not in xsdtypes.XSDDatatypes: continue
+                    badFacet = xsdtypes.XSDDatatypes[attrType].getChecker()(v)
                     if badFacet: self.ValErr(
                         f"Attribute {k}=\"{v}\" of element type '{elemName}' violates "
-                        f"facet {badFacet} of XSD type {elDcl.attributes.type}.")
+                        f"facet {badFacet} of XSD type {attrType}.")
             elif self.options.valAttributeNames:
                 if not elDcl.attributes:
                     self.ValErr(f"No ATTLIST for element '{elemName}'.")
@@ -1423,6 +2182,42 @@ class XSParser():  # StackReader?? TODO Check
 
         return elemName, attrs, empty
 
+    def valStart(self) -> None:
+        """With options.valModels, check the element just pushed onto
+        tagStack against its parent's content model, and set up its own.
+        Each ElementDef compiles its model just once (see ContentAutomaton).
+        """
+        tagStack = self.tagStack
+        tse = tagStack[-1]
+        if len(tagStack) > 1 and (parent := tagStack[-2]).automaton is not None:
+            nxt = parent.automaton.step(parent.state, tse.elemName)
+            if nxt is None: self.ValErr(
+                f"Element '{tse.elemName}' not allowed here in '{parent.elemName}'"
+                f" (expected {parent.automaton.expected(parent.state)}).")
+            parent.state = nxt
+        doctype = self.sr.doctype  # (a Node, so falsy when empty)
+        elementDefs = doctype.elementDefs if doctype is not None else {}
+        if tse.elemName in elementDefs:
+            tse.automaton = elementDefs[tse.elemName].getAutomaton()
+
+    def valEnd(self) -> None:
+        """With options.valModels, check that the current element's content
+        is complete before it is popped.
+        """
+        tse = self.tagStack[-1]
+        if tse.automaton is not None and not tse.automaton.isFinal(tse.state):
+            self.ValErr(f"Element '{tse.elemName}' ended too soon"
+                f" (expected {tse.automaton.expected(tse.state)}).")
+
+    def valText(self, text:str) -> None:
+        """With options.valModels, check that the current element allows
+        (non-whitespace) text.
+        """
+        if not self.tagStack or text.isspace(): return
+        tse = self.tagStack[-1]
+        if tse.automaton is not None and not tse.automaton.allowText:
+            self.ValErr(f"Text not allowed in element '{tse.elemName}'.")
+
     def readAttributes(self, ss:bool=True, elemName:NMTOKEN_t=None) -> OrderedDict:
         """This is purely a syntax read, so it can be used for start-tags,
         but also for quasi-attribute lists such as the XML declaration,
@@ -1435,6 +2230,8 @@ class XSParser():  # StackReader?? TODO Check
             if attrName is None: break
             if self.options.attributeFold:
                 attrName = self.options.attributeFold.normalize(attrName)
+            if self.intern is not None:
+                attrName = self.intern.setdefault(attrName, attrName)
             # TODO Fold and normalize and cast value per schema
             attrs[attrName] = attrValue  # Move to caller or pass in elem name?
             if bang:
@@ -1482,7 +2279,7 @@ class XSParser():  # StackReader?? TODO Check
             self.SynErr("Expected '=' after attribute name.")
 
         attrValue = self.readQLit(ss, keepPunc)
-        if attrValue:
+        if attrValue is not None:
             #lg.warning(f"Attribute value is qlit '{attrValue}' ({type(attrValue)}).")
             return (attrName, attrValue, bang)
         if self.options.unQuotedAttribute and (attrValue := self.readName(ss)):
@@ -1559,6 +2356,8 @@ class XSParser():  # StackReader?? TODO Check
             else:
                 for i in range(len(name)):
                     name[i] = self.options.elementFold.normalize(name[i])
+        if self.intern is not None and isinstance(name, str):
+            name = self.intern.setdefault(name, name)
 
         if not self.readConst(">", ss):
             self.SynErr(f"Unclosed end-tag for '{name}'.")
@@ -1635,7 +2434,7 @@ class XSParser():  # StackReader?? TODO Check
             self.EntErr("Unknown entity '%s'. Known: %s." % (entName))
         # TODO Who checks isEntRefPermitted?
         frame = InputFrame(options=self.options)
-        frame.addEntity(entDef)
+        frame.addEntity(entDef, baseDirs=self.docDirs())
         return
 
     def readPEntRef(self) -> None:
@@ -1656,7 +2455,7 @@ class XSParser():  # StackReader?? TODO Check
             self.EntErr("Unknown parameter entity '%s'. Known: %s." % (entName))
         # TODO Who checks isEntRefPermitted?
         frame = InputFrame(options=self.options)
-        frame.addEntity(entDef)
+        frame.addEntity(entDef, baseDirs=self.docDirs())
         return
 
     def openEntity(self, space:EntitySpace, entName:NMTOKEN_t) -> None:
@@ -1670,7 +2469,7 @@ class XSParser():  # StackReader?? TODO Check
             return None
         lg.info("Opening {space.name} entity '%s'.", entName)
         frame = InputFrame(options=self.options)
-        frame.addEntity(entDef)
+        frame.addEntity(entDef, baseDirs=self.docDirs())
         self.sr.open(frame)
 
     def expandPEntities(self, s:List, depth:int=0) -> str:
@@ -1697,9 +2496,10 @@ class XSParser():  # StackReader?? TODO Check
             entDef = self.sr.spaces[space][entName]
             if not self.isEntRefPermitted(entName):
                 return f"<?rejected SPACE='{entDef.entSpace.name}' ENTITY='{entName}'?>"
-            if entDef.literal is not None:
-                return entDef.literal
-            frame = InputFrame(entDef, options=self.options)
+            if entDef.source.literal is not None:
+                return entDef.source.literal
+            frame = InputFrame(encoding=entDef.encoding, options=self.options)
+            frame.addEntity(entDef, baseDirs=self.docDirs())
             text = frame.readAll()
             frame.close()
         except KeyError as e:
@@ -1720,7 +2520,7 @@ class XSParser():  # StackReader?? TODO Check
             if fatal: self.EntErr("Character entities are disabled.")
             return True
 
-        if not (entDef.publicId or entDef.systemId):
+        if not entDef.source.hasId:
             return True
 
         # Rest is just for external entities
@@ -1729,19 +2529,258 @@ class XSParser():  # StackReader?? TODO Check
                 "External (PUBLIC and SYSTEM) entities are disabled.")
             return False
         if (not self.options.netEntities):
-            sid = entDef.systemId
+            sid = entDef.source.systemId
             if "://" in sid and not sid.startswith("file://"):
                 self.EntErr("Non-file URIs for SYSTEM identifiers are disabled.")
         if (self.options.entityDirs):
-            if "../" in entDef.systemId:  # TODO Resolve realpath first?
+            if "../" in entDef.source.systemId:  # TODO Resolve realpath first?
                 if fatal: self.EntErr(
-                    "'../' but entityDirs option is set: " + entDef.systemId)
+                    "'../' but entityDirs option is set: " + entDef.source.systemId)
                 return False
             found = False
             for okDir in self.options.entityDirs:
-                if entDef.systemId.startswith(okDir):
+                if entDef.source.systemId.startswith(okDir):
                     found = okDir
                     break
             if (not found): self.EntErr(
                 f"systemId for '{entDef.entName}' not in an allowed entDir.")
         return True
+
+for _typ in SaxEvent:
+    setattr(XSParser, _typ.value, handlerProperty(_typ))
+
+
+###############################################################################
+#
+class ExpatParser(XSParser):
+    """An XSParser that has pyexpat do the actual parsing, for documents that
+    need none of Thor's extensions. Handlers, BatchHandler, iterparse(), and
+    DomBuilder work the same, and events have Thor's argument shapes.
+    As in Thor, consecutive character data is issued as one CHAR event
+    (expat splits it at newlines, references, and buffer boundaries),
+    unless options.expatBreaks is set.
+
+    Options set to something expat doesn't do are refused (NSuppE) when the
+    parser is made; those left at Thor's defaults are changed to what expat
+    does, so self.options says how the document is really parsed. expat
+    doesn't fetch external entities or DTDs, and applies its own limits on
+    entity expansion rather than MAXEXPANSION and MAXENTITYDEPTH.
+
+    Of the declarations, only those in the internal subset are seen. DOCTYPE
+    and DOCTYPEEND, ELEMENTDCL, ATTLISTDCL, ENTITYDCL (internal, external,
+    and unparsed, general or parameter), and NOTATIONDCL events are issued.
+    ELEMENTDCL gives the model as a DTD-syntax string rather than a Model,
+    and ATTLISTDCL has one AttrDef per event (as expat reports them).
+    """
+    expatActsAs = {  # Option: the value that matches what expat does
+        "utgard":           False,
+        "MAXEXPANSION":     None,
+        "MAXENTITYDEPTH":   None,
+        "charEntities":     False,
+        "extEntities":      False,
+        "netEntities":      False,
+        "entityDirs":       None,
+        "extSchema":        False,
+        "noC0":             True,
+        "noC1":             False,
+        "noPrivateUse":     False,
+        "langChecking":     False,
+        "saxAttribute":     False,
+        "attributeCast":    False,
+        "useDTD":           False,
+        "profile":          False,
+        "valElemNames":     False,
+        "valModels":        False,
+        "valAttributeNames":False,
+        "valAttributeTypes":False,
+        "nsUsage":          None,
+    }
+
+    def __init__(self,
+        encoding:str="utf-8",
+        namespace_separator:str=None,
+        options:Dict=None):
+        super().__init__(encoding=encoding,
+            namespace_separator=namespace_separator, options=options)
+        for k, v in (options or {}).items():
+            if k in ExpatParser.expatActsAs:
+                if v != ExpatParser.expatActsAs[k]: raise NSuppE(
+                    f"Option '{k}' can't be {v!r} with the expat engine.")
+            elif v and k not in XSParserOptionDefs:
+                raise NSuppE(f"Option '{k}' is not available with the expat engine.")
+        for k, v in ExpatParser.expatActsAs.items():
+            setattr(self.options, k, v)
+        self.expatParser = None
+        self.tBuf = []                      # Character data not yet issued
+
+    def startExpat(self) -> None:
+        """Make the pyexpat parser and hook up all its handlers, so that
+        pending text is issued before any other event (as in Thor).
+        """
+        ep = expat.ParserCreate(encoding=None,
+            namespace_separator=self.namespace_separator)
+        if self.intern is not None: self.intern = ep.intern
+        if self.options.expatBreaks:
+            ep.CharacterDataHandler = lambda data: self.doCB(SaxEvent.CHAR, data)
+        else:
+            ep.buffer_text = True
+            ep.buffer_size = 1 << 16
+            ep.CharacterDataHandler = self.tBuf.append
+        doCB, issue = self.doCB, self.issueText
+
+        def onStart(name:str, attrs:Dict) -> None:
+            if self.tBuf: issue(self.tBuf)
+            doCB(SaxEvent.START, name, attrs)
+        def onEnd(name:str) -> None:
+            if self.tBuf: issue(self.tBuf)
+            doCB(SaxEvent.END, name)
+        def issuing(typ:SaxEvent, argMap:Callable=None) -> Callable:
+            def handler(*args) -> None:
+                if self.tBuf: issue(self.tBuf)
+                doCB(typ, *(argMap(*args) if argMap else args))
+            return handler
+
+        ep.StartElementHandler = onStart
+        ep.EndElementHandler = onEnd
+        ep.CommentHandler = issuing(SaxEvent.COMMENT)
+        ep.ProcessingInstructionHandler = issuing(SaxEvent.PROC)
+        ep.StartCdataSectionHandler = issuing(SaxEvent.CDATA)
+        ep.EndCdataSectionHandler = issuing(SaxEvent.CDATAEND)
+        ep.XmlDeclHandler = issuing(SaxEvent.XMLDCL,  # (Thor's defaults)
+            lambda version, encoding, standalone:
+            (version, encoding or "utf-8", "no" if standalone == 0 else "yes"))
+        ep.StartDoctypeDeclHandler = issuing(SaxEvent.DOCTYPE,
+            lambda name, systemId, publicId, _hasSubset: (name, publicId, systemId))
+        ep.EndDoctypeDeclHandler = issuing(SaxEvent.DOCTYPEEND)
+        ep.EntityDeclHandler = issuing(SaxEvent.ENTITYDCL,
+            lambda name, isParam, value, _base, systemId, publicId, notation:
+            ((name, bool(isParam), publicId, systemId, value, notation), ))
+        ep.NotationDeclHandler = issuing(SaxEvent.NOTATIONDCL,
+            lambda name, _base, systemId, publicId: ((name, publicId, systemId), ))
+        ep.ElementDeclHandler = issuing(SaxEvent.ELEMENTDCL,
+            lambda name, model: (([ name ], expatModelToString(model),
+            None, None, None, None), ))
+        ep.AttlistDeclHandler = issuing(SaxEvent.ATTLISTDCL,
+            lambda elemName, attrName, attrType, default, required: (([ elemName ],
+            [ attrDefFromExpat(elemName, attrName, attrType, default, required) ]), ))
+        self.expatParser = ep
+        self.doCB(SaxEvent.DOC)
+
+    def runExpat(self, fn:Callable, *args) -> None:
+        try:
+            fn(*args)
+        except expat.ExpatError as e:
+            raise SyntaxError(f"Syntax error: {expat.ErrorString(e.code)} at "
+                f"line {e.lineno}, column {e.offset}.") from e
+
+    def finishExpat(self) -> None:
+        if self.tBuf: self.issueText(self.tBuf)
+        self.expatParser = None
+        self.doCB(SaxEvent.DOCEND)
+
+    def Parse(self, s:Union[str, bytes], isfinal:bool=True) -> None:
+        """Like XSParser.Parse(), including incremental use with isfinal=False.
+        """
+        if self.expatParser is None: self.startExpat()
+        self.runExpat(self.expatParser.Parse, s, isfinal)
+        if isfinal: self.finishExpat()
+
+    parse_string = ParseString = Parse
+
+    def ParseFile(self, ifh:IO) -> None:
+        if isinstance(ifh, str):
+            with open(ifh, "rb") as realIfh:
+                return self.ParseFile(realIfh)
+        self.startExpat()
+        self.runExpat(self.expatParser.ParseFile, ifh)
+        self.finishExpat()
+
+    parse_file = ParseFile
+
+    @property
+    def CurrentLineNumber(self) -> int:
+        return self.expatParser.CurrentLineNumber if self.expatParser else None
+    @property
+    def CurrentColumnNumber(self) -> int:
+        return self.expatParser.CurrentColumnNumber if self.expatParser else None
+
+
+###############################################################################
+# Parallel parsing of one big, flat document: split it between children of
+# the document element, parse the pieces in worker processes, and stitch the
+# events back together.
+#
+splitScan_re = re.compile(r"""<!--.*?-->|<!\[CDATA\[.*?\]\]>|<\?.*?\?>"""
+    r"""|<!DOCTYPE(?:[^>\["']|"[^"]*"|'[^']*')*\[?"""
+    r"""|</[^>]*>|<(?:[^>"']|"[^"]*"|'[^']*')*>""", re.S)
+
+def findSplitPoints(s:str, nPieces:int) -> (str, List[int]):
+    """Find up to nPieces-1 offsets in 's', spread about evenly, each at the
+    '<' of a child of the document element (so never inside a comment, PI,
+    CDATA section, or tag). Returns the document element's start-tag (for
+    wrapping the pieces) and the offsets. There are no offsets if there's a
+    DOCTYPE at all: only the first piece would get it, but the declarations
+    (internal or external) affect how the rest parse -- entities, attribute
+    defaults, and validation of the document element's content and IDs.
+    """
+    step = max(1, len(s) // nPieces)
+    nextTarget = step
+    depth = 0
+    rootTag = None
+    points = []
+    for mat in splitScan_re.finditer(s):
+        tok = mat.group()
+        if tok[1] in "!?":
+            if tok.startswith("<!DOCTYPE"): return None, []
+            continue
+        if tok[1] == "/":
+            depth -= 1
+            if depth == 0: break
+            continue
+        if depth == 0: rootTag = tok
+        elif depth == 1 and mat.start() >= nextTarget:
+            points.append(mat.start())
+            if len(points) >= nPieces - 1: break
+            nextTarget = mat.start() + step
+        if not tok.endswith("/>"): depth += 1
+    return rootTag, points
+
+def recordParseEvents(s:str, options:Dict=None) -> List[Tuple]:
+    """Parse a string, returning all its (SaxEvent, *args) events in a list.
+    """
+    events = []
+    p = XSParser(options=options)
+    p.BatchHandler = events.extend
+    p.Parse(s)
+    return events
+
+def parseEventsParallel(s:str, workers:int=None, minPieceSize:int=1<<20,
+    options:Dict=None) -> List[Tuple]:
+    """Parse a document from a string, the same as recordParseEvents(), but
+    with the children of the document element spread over worker processes.
+    Each piece is wrapped in a copy of the document element's start- and
+    end-tags to parse it, and those events are dropped again when stitching.
+    Falls back to parsing in this process if the document is too small (per
+    'minPieceSize'), or can't be split (see findSplitPoints()).
+    """
+    workers = workers or os.cpu_count() or 1
+    nPieces = min(workers * 4, len(s) // minPieceSize)
+    rootTag, points = findSplitPoints(s, nPieces) if nPieces > 1 else (None, [])
+    if not points:
+        return recordParseEvents(s, options)
+
+    rootEnd = "</%s>" % (re.match(r"<([^\s/>]+)", rootTag).group(1))
+    texts = [ s[:points[0]] + rootEnd ]
+    for i in range(1, len(points)):
+        texts.append(rootTag + s[points[i-1]:points[i]] + rootEnd)
+    texts.append(rootTag + s[points[-1]:])
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pieces = list(executor.map(recordParseEvents, texts,
+            [ options ] * len(texts)))
+
+    events = pieces[0][:-2]  # Through the first piece; drop wrapper END, DOCEND
+    for piece in pieces[1:-1]:
+        events.extend(piece[2:-2])  # Drop DOC, wrapper START, END, DOCEND
+    events.extend(pieces[-1][2:])
+    return events
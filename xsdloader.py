@@ -13,7 +13,7 @@ from schemera import (
     DftType, AttrKey #, SourceThing
 )
 #from ragnaroktypes import NMTOKEN_t, QName_t
-#from xsdtypes import XSDDatatypes
+from xsdtypes import XSDDatatypes, XsdType
 
 lg = logging.getLogger("xsdloader")
 
@@ -59,6 +59,7 @@ class XSDLoader:
         self.defined_types: Dict[str, Union[SimpleType, ComplexType]] = {}
         self.global_elements: Dict[str, ElementDef] = {}
         self.global_attributes: Dict[str, AttrDef] = {}
+        self.xsd_types: Dict[str, XsdType] = {}
 
     def load_from_file(self, filepath: str) -> DocumentType:
         """Load an XSD file and return populated DocumentType"""
@@ -80,6 +81,7 @@ class XSDLoader:
         try:
             self.parser.Parse(xsd_content, True)
             self._resolve_pending_references()
+            self._compile_simple_types()
             return self.document_type
         except expat.ExpatError as e:
             lg.error("XML parsing error: %s", e)
@@ -517,6 +519,26 @@ class XSDLoader:
                         )
                         target.attrDefs[attr_key] = attr
 
+    def _compile_simple_types(self) -> None:
+        """Derive an XsdType for each named simple type, so attribute values
+        can be checked by compiled checkers. Base types may be built-in or
+        other simple types from this schema (in any order).
+        """
+        types = dict(XSDDatatypes)
+        pending = [ st for st in self.defined_types.values()
+            if not isinstance(st, ComplexType) and st.baseType ]
+        while pending:
+            ready = [ st for st in pending if st.baseType in types ]
+            if not ready:
+                for st in pending:
+                    lg.warning("Could not resolve base type %s of simple type %s",
+                        st.baseType, st.name)
+                break
+            for st in ready:
+                types[st.name] = st.getXsdType(types)
+                self.xsd_types[st.name] = st.xsdType
+                pending.remove(st)
+
 
 def load_xsd_file(filepath: str, document_type: Optional[DocumentType] = None) -> DocumentType:
     """Convenience function to load an XSD file"""
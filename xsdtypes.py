@@ -5,12 +5,13 @@ import re
 import datetime
 from datetime import timedelta
 from enum import Enum
-from typing import List, Dict, Any, Union, Iterable
+from typing import List, Dict, Any, Union, Callable
+from functools import lru_cache
 import base64
 
 from ragnaroktypes import FlexibleEnum, DOMException
 #from domenums import RWord
-from runeheim import XmlStrings as Rune, WSHandler
+from runeheim import XmlStrings as Rune
 #from basedom import Node
 
 
@@ -578,11 +579,31 @@ class XsdType(dict):
         # TODO fetch up the inheritance chain?
         return super().get(key, None)
 
+    def __setitem__(self, key, value) -> None:
+        super().__setitem__(key, value)
+        self.__dict__.pop("checkers", None)  # Facets changed, recompile
+
+    def __delitem__(self, key) -> None:
+        super().__delitem__(key)
+        self.__dict__.pop("checkers", None)
+
     def isOkValue(self, val:Any) -> bool:
         if isinstance(val, self["pybase"]): return True
         problem = facetCheck(val, self)
         return (problem is None)
 
+    def getChecker(self, cacheSize:int=0) -> Callable[[str], XsdFacet]:
+        """Return a callable that does facetCheck() for just this type,
+        compiling it on first use (see compileChecker()). If 'cacheSize'
+        is set, results for that many recent values are remembered, too.
+        """
+        checkers = self.__dict__.setdefault("checkers", {})
+        if cacheSize not in checkers:
+            checker = compileChecker(self)
+            if cacheSize > 0: checker = lru_cache(maxsize=cacheSize)(checker)
+            checkers[cacheSize] = checker
+        return checkers[cacheSize]
+
 XSDDatatypes = {
     "string": XsdType({
         "pybase": str,
@@ -985,6 +1006,8 @@ for typ0, facet in XSDDatatypes.items():
 def facetCheck(val:str, typ:Union[str, XsdType]) -> XsdFacet:
     """Return the first XsdFacet that the value violates (if any),
     or None if all its facet constraints are satisfied.
+    This just dispatches to the type's compiled checker; callers checking
+    many values should get it once via XsdType.getChecker().
     TODO: facetCheck issues:
         Do a recursive check for the chain of base types (except string).
         Should this return all violated facets? Positions in lists?
@@ -997,68 +1020,161 @@ def facetCheck(val:str, typ:Union[str, XsdType]) -> XsdFacet:
         What about case and unorm?
         What about None and ""?
     """
-    try:
-        typ = XSDDatatypes[typ]
-    except KeyError as e:
-        raise TypeError(
-            f"Unrecognized XSD type name '{typ}' for value '{val}'.") from e
+    if not isinstance(typ, XsdType):
+        try:
+            typ = XSDDatatypes[typ]
+        except (KeyError, TypeError) as e:
+            raise TypeError(
+                f"Unrecognized XSD type name '{typ}' for value '{val}'.") from e
 
     if not isinstance(val, str): raise TypeError(
         "Value to check against XSD datatype '%s' is a Python '%s', not str."
-        % (typ, type(val).__name__))
-
-    typeSpec = typ
-    sval = str(val)
-
-    if "variety" in typeSpec:
-        if typeSpec["variety"] == "list":  # TODO list or just space-sep str?
-            if not isinstance(val, Iterable): return XsdFacet.variety
-            for v in val:
-                fc = facetCheck(v, typeSpec["base"])
-                if fc: return fc
-        elif typeSpec["variety"] == "union":
-            # TODO  How best to represent union types?
-            return XsdFacet.variety  # TODO Finish variety=union
-
-    if "pybase" in typeSpec and typeSpec["pybase"] is not None:
-        try:
-            # TODO Figure out what to do with base64 types
-            _castVal = typeSpec["pybase"](sval)
-        except (TypeError, ValueError):
-            return XsdFacet.pybase
-    if "whiteSpace" in typeSpec:
-        if typeSpec["whiteSpace"] == "collapse":
-            sval = WSHandler.xcollapseSpace(sval)
-        elif typeSpec["whiteSpace"] == "replace":
-            sval = WSHandler.xreplaceSpace(sval)
-    if "pattern" in typeSpec:
-        caseFlag = re.I if ("caseIgnore" in typeSpec["name"] and
-            typeSpec["name"]["caseIgnore"]) else 0
-        if not re.fullmatch(typeSpec["pattern"], sval, flags=caseFlag):
-            #if typ["pybase"] == DateTimeFrag: print(
-            #    f"""\nPattern fail: '{sval}' vs. r'{typeSpec["pattern"]}'.""")
-            return XsdFacet.pattern
-    if "minLength" in typeSpec:
-        if len(sval) < typeSpec["minLength"]: return XsdFacet.minLength
-    if "maxLength" in typeSpec:
-        if len(sval) > typeSpec["minLength"]: return XsdFacet.maxLength
-    if "minInclusive" in typeSpec:
-        if int(val) <  typeSpec["minInclusive"]: return XsdFacet.minInclusive
-    if "minExclusive" in typeSpec:
-        if int(val) <= typeSpec["minExclusive"]: return XsdFacet.minExclusive
-    if "maxExclusive" in typeSpec:
-        if int(val) >= typeSpec["maxExclusive"]: return XsdFacet.maxExclusive
-    if "maxInclusive" in typeSpec:
-        if int(val) >  typeSpec["maxInclusive"]: return XsdFacet.maxInclusive
-    if "enumeration" in typeSpec and typeSpec["enumeration"]:
-        if sval not in typeSpec["enumeration"]: return XsdFacet.enumeration
-    if "totalDigits" in typeSpec or "fractionDigits" in typeSpec:
-        pre, _dot, post = sval.partition(".")
-        if "totalDigits" in typeSpec and len(pre) > typeSpec["totalDigits"]:
-            return XsdFacet.totalDigits
-        if "fractionDigits" in typeSpec and len(post) > typeSpec["fractionDigits"]:
-            return XsdFacet.fractionDigits
-    return None  # Passes all facet checks
+        % (typ["name"], type(val).__name__))
+
+    return typ.getChecker()(val)
+
+_xreplace_re = re.compile(r"[ \t\r\n]")
+_xcollapse_re = re.compile(r"[ \t\r\n]+")
+
+def _xreplaceSpace(s:str) -> str:
+    return _xreplace_re.sub(" ", s)
+
+def _xcollapseSpace(s:str) -> str:
+    return _xcollapse_re.sub(" ", s).strip(" ")
+
+def compileChecker(typeSpec:XsdType) -> Callable[[str], XsdFacet]:
+    """Turn an XsdType into a function that takes a str value and returns
+    the first violated XsdFacet, or None. The tests are the same and in the
+    same order as facetCheck() always made, but the pattern is compiled
+    once, and only facets the type actually has become steps.
+    List types check each whitespace-separated item against their item
+    type (see deriveXsdType(); else the built-in named by their base),
+    then the whole value against their own facets (lengths count items).
+    Union types are not supported yet, and always fail on variety.
+    """
+    variety = typeSpec["variety"]
+    if variety == "union":
+        # TODO  How best to represent union types?
+        return lambda val: XsdFacet.variety
+
+    if typeSpec["whiteSpace"] == "collapse": normalize = _xcollapseSpace
+    elif typeSpec["whiteSpace"] == "replace": normalize = _xreplaceSpace
+    else: normalize = None
+
+    steps = []  # (test(val, sval) -> True if bad, facet)
+    isList = (variety == "list")
+    if isList:
+        itemType = getattr(typeSpec, "itemType", None)
+        if itemType is None and typeSpec["base"]:
+            itemType = XSDDatatypes.get(typeSpec["base"])
+        if itemType is not None:
+            itemCheck = itemType.getChecker()
+            def badItems(val:str, sval:str) -> XsdFacet:
+                for item in _xcollapseSpace(val).split(" "):
+                    fc = itemCheck(item)
+                    if fc: return fc
+                return None
+            steps.append((badItems, None))
+
+    pybase = typeSpec["pybase"]
+    if not isList and pybase is not None and pybase not in (str, bool):
+        def badCast(val:str, sval:str) -> bool:
+            try:
+                # TODO Figure out what to do with base64 types
+                pybase(val)
+            except (TypeError, ValueError):
+                return True
+            return False
+        steps.append((badCast, XsdFacet.pybase))
+
+    matcher = None
+    if typeSpec["pattern"] is not None:
+        caseFlag = re.I if typeSpec["caseIgnore"] else 0
+        matcher = re.compile(typeSpec["pattern"], flags=caseFlag).fullmatch
+        steps.append((lambda val, sval: matcher(sval) is None, XsdFacet.pattern))
+
+    size = (lambda sval: len(sval.split(" ")) if sval else 0) if isList else len
+    if typeSpec["length"] is not None:
+        n = typeSpec["length"]
+        steps.append((lambda val, sval: size(sval) != n, XsdFacet.length))
+    if typeSpec["minLength"] is not None:
+        nMin = typeSpec["minLength"]
+        steps.append((lambda val, sval: size(sval) < nMin, XsdFacet.minLength))
+    if typeSpec["maxLength"] is not None:
+        nMax = typeSpec["maxLength"]
+        steps.append((lambda val, sval: size(sval) > nMax, XsdFacet.maxLength))
+
+    num = pybase if pybase in (int, float) else int
+    for facetName, fail in (
+        ("minInclusive", lambda v, b: v <  b),
+        ("minExclusive", lambda v, b: v <= b),
+        ("maxExclusive", lambda v, b: v >= b),
+        ("maxInclusive", lambda v, b: v >  b)):
+        if typeSpec[facetName] is None: continue
+        steps.append(((lambda bound, fail: lambda val, sval: fail(num(val), bound))(
+            typeSpec[facetName], fail), XsdFacet[facetName]))
+
+    if typeSpec["enumeration"]:
+        enumValues = frozenset(typeSpec["enumeration"])
+        steps.append((lambda val, sval: sval not in enumValues, XsdFacet.enumeration))
+
+    totalDigits = typeSpec["totalDigits"]
+    fractionDigits = typeSpec["fractionDigits"]
+    if totalDigits is not None:
+        steps.append((lambda val, sval: len(sval.partition(".")[0]) > totalDigits,
+            XsdFacet.totalDigits))
+    if fractionDigits is not None:
+        steps.append((lambda val, sval: len(sval.partition(".")[2]) > fractionDigits,
+            XsdFacet.fractionDigits))
+
+    # The common cases get a checker with no loop at all.
+    if not steps:
+        return lambda val: None
+    if len(steps) == 1 and matcher is not None:
+        if normalize is None:
+            return lambda val: None if matcher(val) else XsdFacet.pattern
+        return lambda val: None if matcher(normalize(val)) else XsdFacet.pattern
+
+    def checker(val:str) -> XsdFacet:
+        sval = normalize(val) if normalize else val
+        for test, facet in steps:
+            bad = test(val, sval)
+            if bad: return facet or bad
+        return None
+    return checker
+
+def deriveXsdType(baseName:str, restrictions:Dict[str, Any],
+    types:Dict[str, XsdType]=None, name:str=None) -> XsdType:
+    """Make a new XsdType by restricting an existing one (say, for an
+    xs:simpleType from a schema). 'types' maps names to XsdTypes, and
+    defaults to XSDDatatypes. A restriction pattern must match in
+    addition to the base type's, so the two are combined into one regex.
+    Restricting a list type keeps its item type, found via 'types' too.
+    """
+    if types is None: types = XSDDatatypes
+    try:
+        base = types[baseName]
+    except KeyError as e:
+        raise TypeError(f"Unrecognized XSD base type '{baseName}'.") from e
+
+    derived = XsdType(base)
+    derived["name"] = name
+    derived["base"] = baseName
+    if base["variety"] == "list":
+        derived.itemType = getattr(base, "itemType", None)
+        if derived.itemType is None and base["base"]:
+            derived.itemType = types.get(base["base"])
+    num = base["pybase"] if base["pybase"] in (int, float) else int
+    for facetName, value in restrictions.items():
+        if facetName not in XsdFacet.__members__: raise DOMException(
+            f"Restriction '{facetName}' on XSD type '{baseName}' is not a facet.")
+        if facetName == "pattern" and base["pattern"] not in (None, r".*"):
+            value = r"(?=(?:%s)\Z)(?:%s)" % (base["pattern"], value)
+        elif facetName in ("minInclusive", "minExclusive",
+            "maxInclusive", "maxExclusive") and isinstance(value, str):
+            value = num(value)
+        derived[facetName] = value
+    return derived
 
 
 ###############################################################################